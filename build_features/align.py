@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Align the ss samples and iperf3 intervals of catalog runs on one time axis
+(feature_pipeline/align.py) and write the aligned table: one row per run and
+iperf3 interval end (or per --step s window) with the ss columns, the ss
+goodput over the window and the iperf3 interval columns side by side.
+
+The clock offset of every run is estimated first (wall clock vs iperf3
+timesecs, then refined on cwnd/rtt); --offsets writes them per run.
+
+Example:
+  python3 align.py --log_root ../collect_data/logs --out aligned.csv
+  python3 align.py --log_root ../collect_data/logs --where algo=bbr "rtt>=100" --step 0.1 --how interp
+"""
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from feature_pipeline.align import ALIGNED_COLS, KEY_COLS, align_archive
+from feature_pipeline.catalog import Catalog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log_root", default=os.path.join(HERE, "..", "collect_data", "logs"),
+                        help="directory with ss/ and iperf/")
+    parser.add_argument("--where", nargs="+", default=[], help="run catalog conditions, e.g. algo=bbr rtt>=100")
+    parser.add_argument("--step", type=float, default=None,
+                        help="uniform grid step (s); default: the iperf3 interval ends")
+    parser.add_argument("--how", choices=["asof", "interp"], default="asof",
+                        help="ss columns: last sample at or before t, or linear interpolation")
+    parser.add_argument("--out", default=None, help="aligned table (CSV)")
+    parser.add_argument("--offsets", default=None, help="per-run clock offsets (CSV)")
+    args = parser.parse_args()
+
+    cat = Catalog.open(args.log_root)
+    cat.refresh()
+    rows = cat.query(*args.where, order="seq")
+    cat.close()
+
+    t0 = time.perf_counter()
+    table, offsets = align_archive(rows, args.step, args.how)
+    dt = time.perf_counter() - t0
+    n = len(table["t"])
+    refined = sum(off["refined"] for _, off in offsets)
+    shift = np.array([abs(off["t0_mono"] - off["coarse_mono"]) for _, off in offsets if off["refined"]])
+    print(f"[OK] {len(offsets)} runs aligned, {n} rows in {dt:.2f} s; "
+          f"{refined} refined on cwnd/rtt (median shift {np.median(shift) if len(shift) else 0:.3f} s), "
+          f"zones {sorted({off['zone_s'] for _, off in offsets})}")
+
+    if args.out:
+        cols = KEY_COLS + ALIGNED_COLS
+        with open(args.out, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(cols)
+            w.writerows(zip(*(table[c].tolist() for c in cols)))
+        print(f"[OK] saved: {args.out}")
+    if args.offsets:
+        fields = ["t0_mono", "coarse_mono", "zone_s", "lag_s", "cost", "refined"]
+        with open(args.offsets, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(KEY_COLS + fields)
+            for key, off in offsets:
+                w.writerow(list(key) + [off[k] for k in fields])
+        print(f"[OK] saved: {args.offsets}")
+
+
+if __name__ == "__main__":
+    main()
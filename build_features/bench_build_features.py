@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Timing benchmark for build_features.py on a synthetically scaled archive.
+
+The real logs under collect_data/logs are symlinked under new run indices
+until the archive holds --runs flows, then we time:
+  - legacy : the old serial loop (full read of every ss log + json.load)
+  - cold   : build() from scratch (tail reads, process pool)
+  - warm   : build() again with nothing changed (manifest hits only)
+  - touch  : build() after 1% of the runs were modified
+
+Example:
+  python3 bench_build_features.py --runs 100000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from feature_pipeline import NAME_RE, build, parse_name
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--ss_dir", default=os.path.join(HERE, "..", "collect_data", "logs", "ss"))
+parser.add_argument("--json_dir", default=os.path.join(HERE, "..", "collect_data", "logs", "iperf"))
+parser.add_argument("--runs", type=int, default=100000, help="size of the synthetic archive")
+parser.add_argument("--jobs", type=int, default=None)
+parser.add_argument("--skip_legacy", action="store_true")
+args = parser.parse_args()
+
+
+def make_archive(root):
+    """Symlink the real runs under fresh run numbers until we have args.runs."""
+    ss_out = os.path.join(root, "ss")
+    js_out = os.path.join(root, "iperf")
+    os.makedirs(ss_out)
+    os.makedirs(js_out)
+
+    src = sorted(f for f in os.listdir(args.ss_dir) if f.endswith(".log") and parse_name(f))
+    n = 0
+    rep = 0
+    while n < args.runs:
+        for fname in src:
+            if n >= args.runs:
+                break
+            algo, rtt, bw, run = parse_name(fname)
+            stem = f"{algo}_rtt{rtt}_bw{bw}_run{run + rep * 10}"
+            os.symlink(os.path.abspath(os.path.join(args.ss_dir, fname)),
+                       os.path.join(ss_out, stem + ".log"))
+            os.symlink(os.path.abspath(os.path.join(args.json_dir, fname[:-4] + ".json")),
+                       os.path.join(js_out, stem + ".json"))
+            n += 1
+        rep += 1
+    return ss_out, js_out
+
+
+def legacy_build(ss_dir, json_dir):
+    """The original build_features.py loop, kept here as the baseline."""
+    rows = []
+    for fname in os.listdir(ss_dir):
+        if not fname.endswith(".log") or not NAME_RE.search(fname):
+            continue
+        json_path = os.path.join(json_dir, fname.replace(".log", ".json"))
+        with open(os.path.join(ss_dir, fname)) as f:
+            last = f.read().strip().splitlines()[-1].split()
+        with open(json_path) as f:
+            sender = json.load(f)["end"]["streams"][0]["sender"]
+        rows.append((float(last[3]), float(last[4]), int(last[5]) * int(last[6]),
+                     float(last[7]), sender["bits_per_second"] / 1e6,
+                     sender.get("mean_rtt", 0) / 1000.0))
+    return rows
+
+
+def build_prefix(ss_dir, json_dir, prefix, jobs, full=False):
+    """build() with the output layout of build_features.py."""
+    return build(ss_dir, json_dir, out_with=prefix + "_with_cond.csv", out_no=prefix + "_no_cond.csv",
+                 manifest=prefix + "_manifest.json", jobs=jobs, full=full)
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    n = len(out[0]) if isinstance(out, tuple) else len(out)
+    print(f"{label:8s} {dt:9.2f} s {n / dt:12.0f} runs/s")
+    return out
+
+
+root = tempfile.mkdtemp(prefix="bench_features_")
+try:
+    print(f"building synthetic archive with {args.runs} runs in {root} ...")
+    ss_dir, json_dir = make_archive(root)
+    prefix = os.path.join(root, "features")
+
+    if not args.skip_legacy:
+        timed("legacy", lambda: legacy_build(ss_dir, json_dir))
+    timed("cold", lambda: build_prefix(ss_dir, json_dir, prefix, args.jobs, full=True))
+    timed("warm", lambda: build_prefix(ss_dir, json_dir, prefix, args.jobs))
+
+    # Modify 1% of the runs: replace the symlink so (mtime, size) changes
+    names = sorted(os.listdir(ss_dir))[:: 100]
+    for fname in names:
+        path = os.path.join(ss_dir, fname)
+        target = os.readlink(path)
+        os.unlink(path)
+        shutil.copyfile(target, path)
+    rows, n = timed("touch", lambda: build_prefix(ss_dir, json_dir, prefix, args.jobs))
+    print(f"(touch recomputed {n} of {len(rows)} runs)")
+finally:
+    shutil.rmtree(root)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Parse throughput of the iperf3 interval series (feature_pipeline/intervals.py)
+over a directory of iperf3 JSONs:
+
+  - json.load : the whole document, then the interval arrays from it
+  - stream    : iter_intervals() / parse_intervals(), one interval at a time
+  - cached    : load_intervals() once the arrays are in the dataset cache
+
+Both parsers must give the same arrays for every file. Peak Python memory
+(tracemalloc) is reported on the largest file and on one synthetic long
+test (--long intervals, the real intervals repeated), where json.load keeps
+the whole document and the streaming parser one chunk plus the arrays.
+
+Example:
+  python3 bench_iperf_parse.py --json_dir ../collect_data/logs/iperf
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from feature_pipeline import dataset, intervals
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--json_dir", default=os.path.join(HERE, "..", "collect_data", "logs", "iperf"))
+parser.add_argument("--repeat", type=int, default=3, help="best of N passes")
+parser.add_argument("--long", type=int, default=200000, help="intervals of the synthetic long test (0: skip)")
+args = parser.parse_args()
+
+
+def parse_full(path):
+    """Reference: json.load of the whole document."""
+    with open(path) as f:
+        doc = json.load(f)
+    rows = []
+    for iv in doc.get("intervals", []):
+        s = (iv.get("streams") or [iv.get("sum", {})])[0]
+        rows.append((s.get("start", np.nan), s.get("end", np.nan), s.get("bytes", np.nan),
+                     s.get("bits_per_second", np.nan) / 1e6, s.get("retransmits", np.nan),
+                     s.get("snd_cwnd", np.nan), s.get("rtt", np.nan) / 1e3, s.get("rttvar", np.nan) / 1e3,
+                     s.get("pmtu", np.nan), float(bool(s.get("omitted", False)))))
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(intervals.INTERVAL_COLS))
+
+
+def best(fn, paths):
+    times = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        for p in paths:
+            fn(p)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def peak(fn, path):
+    tracemalloc.start()
+    fn(path)
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / 1e6
+
+
+def write_long(path, src, n):
+    """An iperf3 JSON with n intervals: src's intervals repeated, times shifted."""
+    with open(src) as f:
+        doc = json.load(f)
+    ivs = doc["intervals"]
+    span = ivs[-1]["sum"]["end"]
+    with open(path, "w") as f:
+        f.write('{"start":' + json.dumps(doc["start"]) + ',"intervals":[')
+        for i in range(n):
+            iv = json.loads(json.dumps(ivs[i % len(ivs)]))
+            shift = (i // len(ivs)) * span
+            for s in iv["streams"] + [iv["sum"]]:
+                s["start"] += shift
+                s["end"] += shift
+            f.write(("," if i else "") + json.dumps(iv))
+        f.write('],"end":' + json.dumps(doc["end"]) + "}")
+
+
+paths = sorted(glob.glob(os.path.join(args.json_dir, "*.json")))
+if not paths:
+    raise SystemExit(f"no iperf3 JSON in {args.json_dir}")
+mb = sum(os.path.getsize(p) for p in paths) / 1e6
+n_iv = 0
+for p in paths:
+    cols, meta = intervals.parse_intervals(p)
+    ref = parse_full(p)
+    got = np.column_stack([cols[c] for c in intervals.INTERVAL_COLS]) if meta["rows"] else ref
+    assert np.array_equal(ref, got, equal_nan=True), p
+    n_iv += meta["rows"]
+print(f"[OK] {len(paths)} files, {mb:.1f} MB, {n_iv} intervals: streaming arrays == json.load arrays")
+
+tmp = tempfile.mkdtemp(prefix="bench_iperf_")
+try:
+    cache = os.path.join(tmp, "cache")
+    for label, fn in [("json.load", parse_full), ("stream", intervals.parse_intervals),
+                      ("cached", lambda p: intervals.load_intervals(p, cache))]:
+        if label == "cached":
+            for p in paths:
+                fn(p)
+            dataset.flush()
+        dt = best(fn, paths)
+        print(f"{label:10s} {dt:7.3f} s  {mb / dt:8.1f} MB/s  {len(paths) / dt:8.0f} files/s  "
+              f"{n_iv / dt / 1e3:8.0f} k intervals/s")
+
+    biggest = max(paths, key=os.path.getsize)
+    print(f"peak memory, {os.path.basename(biggest)} ({os.path.getsize(biggest) / 1e3:.0f} kB): "
+          f"json.load {peak(parse_full, biggest):.2f} MB, stream {peak(intervals.parse_intervals, biggest):.2f} MB")
+
+    if args.long:
+        path = os.path.join(tmp, "long.json")
+        write_long(path, biggest, args.long)
+        size = os.path.getsize(path) / 1e6
+        for label, fn in [("json.load", parse_full), ("stream", intervals.parse_intervals)]:
+            t0 = time.perf_counter()
+            fn(path)
+            dt = time.perf_counter() - t0
+            top = peak(fn, path)
+            print(f"long test ({args.long} intervals, {size:.0f} MB) {label:10s} {dt:6.2f} s  "
+                  f"{size / dt:6.1f} MB/s  peak {top:7.1f} MB")
+finally:
+    shutil.rmtree(tmp)
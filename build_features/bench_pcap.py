@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Check and time the capture reader (feature_pipeline/pcap.py) on traffic
+generated over loopback. Needs root (AF_PACKET socket on lo).
+
+  - loopback : one TCP flow per congestion control (plus one over IPv6),
+               throttled with SO_MAX_PACING_RATE, captured with an AF_PACKET
+               socket (SO_TIMESTAMPNS, --snaplen bytes per frame). Just before
+               closing, each sender reads its own TCP_INFO; the flow
+               reconstructed from the capture must report the same acked
+               bytes and retransmits at that instant, and its srtt / cwnd
+               are shown next to the kernel's
+  - formats  : the same frames as pcap (µs, both byte orders), pcap with
+               ns timestamps and pcapng (ns if_tsresol) read back into the
+               same packets, also with a chunk size that splits records
+  - speed    : MB/s and packets/s of Capture.read() on a --size MB capture
+               tiled from the loopback frames, for each --tile_snap, against
+               a plain read of the same file
+
+Example:
+  sudo python3 bench_pcap.py --duration 5 --rate 20 --size 512
+  sudo python3 bench_pcap.py --size 0 --save lo.pcap && python3 ../train_model/classify_pcap.py lo.pcap
+"""
+import argparse
+import os
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from feature_pipeline import pcap
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "collect_data"))
+import ss_sampler  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--duration", type=float, default=5.0, help="seconds of traffic per flow")
+parser.add_argument("--rate", type=float, default=20.0, help="SO_MAX_PACING_RATE per flow (Mbit/s)")
+parser.add_argument("--snaplen", type=int, default=128)
+parser.add_argument("--size", type=int, default=512, help="MB of the tiled capture for the speed test (0: skip)")
+parser.add_argument("--tile_snap", nargs="+", type=int, default=[128, 1514],
+                    help="record sizes of the tiled capture (frames padded or cut to it)")
+parser.add_argument("--repeat", type=int, default=3, help="best of N passes")
+parser.add_argument("--save", default=None, help="also keep the loopback capture here (pcap)")
+args = parser.parse_args()
+
+SO_TIMESTAMPNS = 35
+SO_MAX_PACING_RATE = 47
+SOL_PACKET, PACKET_STATISTICS = 263, 6
+PACKET_OUTGOING = 4
+ETH_P_ALL = 0x0003
+
+
+# ====== Loopback traffic and capture ======
+def capture(sock, frames, stop):
+    """Frames of lo as seen on receive (each packet once): (ns, frame, wire length)."""
+    cmsg = socket.CMSG_SPACE(16)
+    while not stop.is_set():
+        try:
+            data, anc, _, addr = sock.recvmsg(args.snaplen, cmsg)
+        except socket.timeout:
+            continue
+        if addr[2] == PACKET_OUTGOING:
+            continue
+        ns = time.time_ns()
+        for level, kind, val in anc:
+            if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                sec, nsec = struct.unpack("qq", val[:16])
+                ns = sec * 1_000_000_000 + nsec
+        # Wire length from the IP header (frames are cut at the snap length)
+        if data[12:14] == b"\x08\x00":
+            wire = 14 + struct.unpack_from("!H", data, 16)[0]
+        else:
+            wire = 14 + 40 + struct.unpack_from("!H", data, 18)[0]
+        frames.append((ns, data, wire))
+
+
+def sink(server):
+    conn, _ = server.accept()
+    while conn.recv(1 << 16):
+        pass
+    conn.close()
+
+
+def sender(family, addr, algo, info):
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_CONGESTION, algo.encode())
+    s.setsockopt(socket.SOL_SOCKET, SO_MAX_PACING_RATE, int(args.rate * 1e6 / 8))
+    s.connect(addr)
+    chunk = b"\0" * (1 << 16)
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        s.sendall(chunk)
+    time.sleep(0.5)   # let the last acks arrive
+    raw = s.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, ss_sampler.TCP_INFO.size)
+    t = time.time_ns()
+    ti = dict(zip(ss_sampler.TCP_INFO_NAMES, ss_sampler.TCP_INFO.unpack_from(raw)))
+    info[s.getsockname()[1]] = (algo, t * 1e-9, ti, ss_sampler.decode_tcp_info(raw, algo))
+    time.sleep(0.2)   # keep the instant of TCP_INFO clear of the FIN
+    s.close()
+
+
+def run_loopback():
+    with open("/proc/sys/net/ipv4/tcp_available_congestion_control") as f:
+        have = f.read().split()
+    flows = [(socket.AF_INET, a) for a in ("cubic", "reno", "bbr") if a in have] + [(socket.AF_INET6, "cubic")]
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    sock.bind(("lo", 0))
+    sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 26)
+    sock.settimeout(0.2)
+    frames, info, stop = [], {}, threading.Event()
+    cap = threading.Thread(target=capture, args=(sock, frames, stop))
+    cap.start()
+    threads = []
+    for family, algo in flows:
+        server = socket.socket(family, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1" if family == socket.AF_INET else "::1", 0))
+        server.listen(1)
+        threads.append(threading.Thread(target=sink, args=(server,)))
+        threads.append(threading.Thread(target=sender, args=(family, server.getsockname()[:2], algo, info)))
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    time.sleep(0.2)
+    stop.set()
+    cap.join()
+    _, drops = struct.unpack("II", sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+    sock.close()
+    return frames, info, drops
+
+
+# ====== Capture files ======
+def write_pcap(path, frames, order="<", nano=False):
+    with open(path, "wb") as f:
+        magic = 0xA1B23C4D if nano else 0xA1B2C3D4
+        f.write(struct.pack(order + "IHHiIII", magic, 2, 4, 0, 0, 1 << 16, pcap.LINK_ETHERNET))
+        rec = struct.Struct(order + "IIII")
+        div = 1 if nano else 1000
+        for ns, data, wire in frames:
+            f.write(rec.pack(ns // 1_000_000_000, ns % 1_000_000_000 // div, len(data), wire))
+            f.write(data)
+
+
+def write_pcapng(path, frames):
+    def block(btype, body):
+        body += b"\0" * (-len(body) % 4)
+        n = len(body) + 12
+        return struct.pack("<II", btype, n) + body + struct.pack("<I", n)
+
+    with open(path, "wb") as f:
+        f.write(block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+        tsresol = struct.pack("<HHB3x", 9, 1, 9) + struct.pack("<HH", 0, 0)
+        f.write(block(pcap.PCAPNG_IDB, struct.pack("<HHI", pcap.LINK_ETHERNET, 0, 1 << 16) + tsresol))
+        for ns, data, wire in frames:
+            body = struct.pack("<IIIII", 0, ns >> 32, ns & 0xFFFFFFFF, len(data), wire) + data
+            f.write(block(pcap.PCAPNG_EPB, body))
+
+
+def write_tiled(path, frames, snap, size):
+    """pcap of `size` MB: the frames padded / cut to snap bytes, repeated."""
+    rec = struct.Struct("<IIII")
+    one = b"".join(rec.pack(ns // 10 ** 9, ns % 10 ** 9 // 1000, snap, wire) + data[:snap].ljust(snap, b"\0")
+                   for ns, data, wire in frames)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 1 << 16, pcap.LINK_ETHERNET))
+        for _ in range(max(1, (size << 20) // len(one))):
+            f.write(one)
+
+
+def read_packets(path, chunk):
+    """Packets with endpoint ids resolved (ids depend on the order endpoints are met)."""
+    cap = pcap.Capture(path, chunk=chunk)
+    pk = cap.read()
+    ep = np.array(cap.endpoints, dtype=np.uint64).reshape(-1, 3)
+    return [pk["t"], ep[pk["src"]], ep[pk["dst"]]] + [pk[c] for c in pk.dtype.names if c not in ("t", "src", "dst")]
+
+
+def best(fn):
+    times = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def raw_read(path):
+    n = 0
+    buf = bytearray(1 << 24)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            k = f.readinto(buf)
+            if not k:
+                return n
+            n += k
+
+
+frames, info, drops = run_loopback()
+mb = sum(w for _, _, w in frames) / 1e6
+print(f"captured {len(frames)} frames ({mb:.0f} MB on the wire) of {len(info)} flows, {drops} dropped by the socket")
+assert drops == 0, "capture dropped frames: lower --rate"
+
+tmp = tempfile.mkdtemp(prefix="bench_pcap_")
+try:
+    base = os.path.join(tmp, "lo.pcap")
+    write_pcap(base, frames)
+    if args.save:
+        shutil.copyfile(base, args.save)
+    ref = read_packets(base, 1 << 24)
+    for name, write in [("pcap be", lambda p: write_pcap(p, frames, ">")),
+                        ("pcap ns", lambda p: write_pcap(p, frames, nano=True)),
+                        ("pcapng", lambda p: write_pcapng(p, frames))]:
+        path = os.path.join(tmp, name.replace(" ", "_"))
+        write(path)
+        for chunk in (1 << 24, 4093):
+            other = read_packets(path, chunk)
+            same = len(other[0]) == len(ref[0]) and all(np.array_equal(x, y) for x, y in zip(other[1:], ref[1:]))
+            # µs against ns stamps: within 1 µs plus the float64 resolution of epoch seconds
+            assert same and np.abs(other[0] - ref[0]).max() < 2e-6, f"{name} (chunk {chunk}) differs from pcap"
+    print(f"[OK] pcap (both byte orders, µs/ns) and pcapng read the same {len(ref[0])} TCP packets, also in 4093-byte chunks")
+
+    cap = pcap.Capture(base)
+    pk = cap.read()
+    print(f"{'flow':>28s} {'algo':6s} {'acked':>10s} {'kernel':>10s} {'retr':>4s} {'kern':>4s} "
+          f"{'srtt us':>8s} {'kernel':>7s} {'cwnd':>5s} {'kernel':>6s}")
+    bad = 0
+    for a, b, idx in pcap.split_flows(pk):
+        rec = pcap.reconstruct(pk[idx])
+        if rec is None:
+            continue
+        port = cap.endpoints[rec["sender"]][2] & 0xFFFF
+        algo, t_info, ti, sample = info[port]
+        j = np.searchsorted(rec["t_a"], t_info, side="right") - 1
+        acked = int(rec["cum"][j] - rec["start"])
+        retrans = int(rec["retrans"][rec["t_d"] <= t_info].sum())
+        k = np.searchsorted(rec["t_rtt"], t_info, side="right") - 1
+        tr = pcap.flow_trace(rec)
+        feats = pcap.flow_features(tr, rec)
+        bad += acked != ti["bytes_acked"] or retrans != ti["total_retrans"] or feats is None
+        print(f"{cap.endpoint_str(rec['sender']):>28s} {algo:6s} {acked:10d} {ti['bytes_acked']:10d} "
+              f"{retrans:4d} {ti['total_retrans']:4d} {rec['srtt'][k] * 1e6:8.0f} {ti['rtt']:7d} "
+              f"{tr['cwnd'][-1]:5.0f} {sample['cwnd']:6d}")
+    assert bad == 0, f"{bad} flows differ from the kernel's TCP_INFO"
+    print(f"[OK] {len(info)} flows: acked bytes and retransmits match TCP_INFO, features computed")
+
+    if args.size:
+        for snap in args.tile_snap:
+            path = os.path.join(tmp, f"tiled_{snap}.pcap")
+            write_tiled(path, frames, snap, args.size)
+            size = os.path.getsize(path)
+            t_raw, _ = best(lambda: raw_read(path))
+            t_cap, n = best(lambda: len(pcap.Capture(path).read()))
+            print(f"record {snap:5d} B: {size / 1e6:.0f} MB, {n} packets: read {size / t_raw / 1e6:.0f} MB/s, "
+                  f"Capture.read {size / t_cap / 1e6:.0f} MB/s ({n / t_cap / 1e6:.2f} M packets/s)")
+            os.remove(path)
+finally:
+    shutil.rmtree(tmp)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Query the run catalog (feature_pipeline/catalog.py) of a log root. The
+catalog is refreshed (a stat pass) and new runs are summarized first.
+
+Conditions are <column><op><value> with op one of = != < <= > >=, and a
+comma list for = / != (algo=bbr,reno). Columns: algo rtt bw run format,
+the file columns, and the summary stats (samples, duration_s, rtt_mean_ms,
+cwnd_max_bytes, pacing_mean_mbps, retrans_total, ip_tp_mbps, ...).
+
+Example:
+  python3 catalog.py --log_root ../collect_data/logs algo=cubic "rtt>=100" bw=500
+  python3 catalog.py --log_root ../collect_data/logs "ip_tp_mbps<5" --paths
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from feature_pipeline.catalog import Catalog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHOW = ["algo", "rtt", "bw", "run", "format", "samples", "duration_s", "ip_tp_mbps", "ip_mean_rtt_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("conds", nargs="*", help="conditions, e.g. algo=cubic rtt>=100")
+    parser.add_argument("--log_root", default=os.path.join(HERE, "..", "collect_data", "logs"),
+                        help="directory with ss/ and iperf/")
+    parser.add_argument("--db", default=None,
+                        help="catalog database (default: one per log root in ~/.cache/congctrl/catalog)")
+    parser.add_argument("--no_refresh", action="store_true", help="query the catalog as is, no directory stat")
+    parser.add_argument("--paths", action="store_true", help="print only the ss log paths")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per run")
+    args = parser.parse_args()
+
+    cat = Catalog.open(args.log_root, db_path=args.db)
+    if not args.no_refresh:
+        t0 = time.perf_counter()
+        n, changed = cat.refresh()
+        print(f"[catalog] refresh: {n} runs, {changed} changed ({(time.perf_counter() - t0) * 1e3:.1f} ms)",
+              file=sys.stderr)
+    # Only runs that are new or changed since the last call
+    t0 = time.perf_counter()
+    n = cat.summarize()
+    if n:
+        print(f"[catalog] summarized {n} runs ({time.perf_counter() - t0:.2f} s)", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    rows = cat.query(*args.conds)
+    dt = time.perf_counter() - t0
+    cat.close()
+
+    for r in rows:
+        if args.paths:
+            print(r["ss_path"])
+        elif args.json:
+            print(json.dumps({k: v for k, v in r.items() if k != "key"}))
+        else:
+            print("  ".join(f"{k}={r[k]:.3g}" if isinstance(r[k], float) else f"{k}={r[k]}" for k in SHOW))
+    if not args.paths and not args.json:
+        print(f"[OK] {len(rows)} runs in {dt * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
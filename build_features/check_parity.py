@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Parity check: rebuild the committed feature CSVs with feature_pipeline and
+compare them row by row (order-independent, exact string match).
+
+  features_with_cond.csv / features_no_cond.csv  <- collect_data/logs
+  features_no_cond_test.csv                       <- collect_data_test
+
+It also checks that the lazy path (only the model bundle's feature_cols)
+gives the same values and never loads the full ss trace.
+
+Exits non-zero on any mismatch.
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+
+import feature_pipeline
+from feature_pipeline import BASE_FEATURES, SOURCES_LOADED, build
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bundle", default=os.path.join(ROOT, "train_model", "rf_congctrl.pkl"))
+parser.add_argument("--jobs", type=int, default=1)
+args = parser.parse_args()
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return header, sorted(tuple(r) for r in reader)
+
+
+def compare(label, expected, got):
+    h_exp, r_exp = read_rows(expected)
+    h_got, r_got = read_rows(got)
+    if h_exp != h_got:
+        print(f"[FAIL] {label}: header {h_got} != {h_exp}")
+        return False
+    if r_exp != r_got:
+        missing = set(r_exp) - set(r_got)
+        extra = set(r_got) - set(r_exp)
+        print(f"[FAIL] {label}: {len(missing)} rows missing, {len(extra)} unexpected")
+        for r in list(missing)[:3]:
+            print(f"  - {','.join(r)}")
+        for r in list(extra)[:3]:
+            print(f"  + {','.join(r)}")
+        return False
+    print(f"[OK] {label}: {len(r_exp)} rows identical")
+    return True
+
+
+tmp = tempfile.mkdtemp(prefix="feature_parity_")
+ok = True
+try:
+    out = os.path.join(tmp, "features")
+    build(os.path.join(ROOT, "collect_data", "logs", "ss"), os.path.join(ROOT, "collect_data", "logs", "iperf"),
+          out_with=out + "_with_cond.csv", out_no=out + "_no_cond.csv", jobs=args.jobs, full=True)
+    ok &= compare("features_with_cond.csv", os.path.join(HERE, "features_with_cond.csv"), out + "_with_cond.csv")
+    ok &= compare("features_no_cond.csv", os.path.join(HERE, "features_no_cond.csv"), out + "_no_cond.csv")
+
+    test_out = os.path.join(tmp, "features_no_cond_test.csv")
+    build(os.path.join(ROOT, "collect_data_test", "ss"), os.path.join(ROOT, "collect_data_test", "iperf"),
+          out_no=test_out, jobs=args.jobs, full=True, exts=(".log",))
+    ok &= compare("features_no_cond_test.csv", os.path.join(HERE, "features_no_cond_test.csv"), test_out)
+
+    # Lazy path: the bundle's columns only, serially so the source counter is ours
+    if os.path.exists(args.bundle):
+        names = feature_pipeline.features_for_bundle(args.bundle)
+        SOURCES_LOADED.clear()
+        lazy_out = os.path.join(tmp, "lazy_no_cond.csv")
+        build(os.path.join(ROOT, "collect_data_test", "ss"), os.path.join(ROOT, "collect_data_test", "iperf"),
+              out_no=lazy_out, features=names, jobs=1, full=True, exts=(".log",))
+        if names == BASE_FEATURES:
+            ok &= compare("bundle feature_cols", os.path.join(HERE, "features_no_cond_test.csv"), lazy_out)
+        if SOURCES_LOADED.get("ss_trace"):
+            print(f"[FAIL] bundle features loaded the full trace {SOURCES_LOADED['ss_trace']} times")
+            ok = False
+        else:
+            print(f"[OK] bundle features loaded only: {dict(SOURCES_LOADED)}")
+    else:
+        print(f"[warn] no bundle at {args.bundle}, lazy check skipped")
+finally:
+    shutil.rmtree(tmp)
+
+sys.exit(0 if ok else 1)
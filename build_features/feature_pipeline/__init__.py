@@ -0,0 +1,32 @@
+"""
+Feature pipeline shared by build_features.py, build_features_test.py and
+ts_features.py.
+
+  sources.py    : raw per-run inputs (filename, ss log tail, iperf3 "end")
+  timeseries.py : statistics over the whole ss trace (NumPy)
+  intervals.py  : streaming iperf3 interval parser, as-of join with the ss trace
+  align.py      : per-run ss / iperf3 clock offset, aligned table of both series
+  registry.py   : declarative feature table, lazy per-run evaluation
+  catalog.py    : SQLite index of the runs of a log root, with a query API
+  builder.py    : catalog scan, process pool, manifest, CSV output
+  dataset.py    : content-hashed, memory-mapped cache of parsed CSVs / ss logs
+  decimate.py   : min/max and LTTB decimation, multi-resolution zoom pyramid
+  pcap.py       : pcap/pcapng reader, TCP flow reconstruction, per-flow features
+
+Example:
+  from feature_pipeline import build, features_for_bundle
+  build(ss_dir, json_dir, out_no="f.csv", features=features_for_bundle("rf_congctrl.pkl"))
+"""
+import os
+import sys
+
+# ss_binary.py lives with the collector
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "collect_data"))
+
+from .sources import NAME_RE, parse_name, parse_json, parse_ss_last_line  # noqa: E402
+from .registry import (  # noqa: E402
+    BASE_FEATURES, FEATURES, IV_FEATURES, SOURCES_LOADED, TS_FEATURES, Run, compute, register_feature,
+    register_source, sources_for,
+)
+from .catalog import Catalog  # noqa: E402
+from .builder import ID_WITH, ID_NO, build, features_for_bundle  # noqa: E402
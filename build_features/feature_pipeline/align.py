@@ -0,0 +1,168 @@
+"""
+Time alignment of ss samples and iperf3 intervals.
+
+collect_ss.py stamps every sample with the wall clock (naive local time) and
+time.monotonic(); iperf3 reports its intervals in seconds since the test
+start, whose epoch (start.timestamp.timesecs) is truncated to the second.
+The alignment of a run is t0_mono, the monotonic time of the iperf3 test
+start, so that iperf time = monotonic - t0_mono:
+
+  coarse  : the wall clock of the first ss sample against timesecs. The
+            difference is the collector's time zone (a multiple of 15 min)
+            plus the lag of the first sample. iperf3 stamps timesecs (whole
+            seconds) before the control exchange and the stream connect,
+            which take a few round trips, so interval 0 starts somewhere in
+            [timesecs, timesecs + 1 + SETUP_RTTS * rtt); the middle is used.
+  refined : inside that range, the shift that best matches the kernel state
+            both tools sample: cwnd (ss cwnd*mss vs iperf snd_cwnd, log
+            ratio) and rtt (relative difference), ss interpolated at every
+            interval end. One np.interp covers all candidate shifts x
+            intervals. Kept only when it beats the coarse cost by MIN_GAIN,
+            so runs with a flat cwnd and rtt keep the coarse estimate.
+
+align() puts both series on one time axis (iperf time, s): the interval ends
+by default, or the ends of uniform `step` s windows. ss columns are taken
+as-of (last sample at or before t) or linearly interpolated (how="interp");
+ss_goodput_mbps is bytes_acked over the window, and iperf columns are those
+of the interval holding t. align_archive() stacks many runs into one table.
+"""
+import numpy as np
+
+from . import dataset, intervals
+from .timeseries import select_data_flow, trace_arrays
+
+ZONE_S = 900       # time zone granularity
+SETUP_RTTS = 4     # round trips between timesecs and the first interval, at most
+STEP_S = 0.005     # resolution of the refined t0
+MIN_GAIN = 0.05    # relative cost improvement needed to trust the refinement
+
+SS_ALIGN_COLS = ["rtt_ms", "rtt_var_ms", "cwnd_bytes", "pacing_mbps", "bytes_acked", "retrans_total"]
+IV_ALIGN_COLS = ["tp_mbps", "snd_cwnd", "rtt_ms", "rttvar_ms", "retransmits"]
+ALIGNED_COLS = (["t"] + ["ss_" + c for c in SS_ALIGN_COLS] + ["ss_goodput_mbps"]
+                + ["iv_" + c for c in IV_ALIGN_COLS] + ["iv_bytes_cum"])
+KEY_COLS = ["algo", "rtt", "bw", "run"]
+
+
+def _cost(tr, iv, t0s):
+    """Mean cwnd/rtt mismatch between ss (interpolated) and iperf, per candidate t0."""
+    mono = tr["monotonic"]
+    t = (np.asarray(t0s)[:, None] + iv["t_end"][None, :]).ravel()
+    shape = (len(t0s), len(iv["t_end"]))
+    ss_cwnd = np.interp(t, mono, tr["cwnd"] * tr["mss"]).reshape(shape)
+    ss_rtt = np.interp(t, mono, tr["rtt_ms"]).reshape(shape)
+    valid = ((t >= mono[0]) & (t <= mono[-1])).reshape(shape)
+    valid &= (ss_cwnd > 0) & (iv["snd_cwnd"] > 0) & (iv["rtt_ms"] > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.abs(np.log(ss_cwnd / iv["snd_cwnd"])) + np.abs(ss_rtt - iv["rtt_ms"]) / iv["rtt_ms"]
+    c = np.where(valid, c, 0.0)
+    n = valid.sum(axis=1)
+    return np.where(n > 0, c.sum(axis=1) / np.maximum(n, 1), np.inf)
+
+
+def estimate_offset(tr, iv, wall_offset=None, timesecs=None):
+    """
+    {"t0_mono", "coarse_mono", "zone_s", "lag_s", "cost", "refined"} for one
+    run. tr is the data flow of the trace, wall_offset the wall clock minus
+    monotonic of the collector (None: assume the first ss sample at t=0).
+    """
+    mono = tr["monotonic"]
+    rtt = iv["rtt_ms"][np.isfinite(iv["rtt_ms"])]
+    width = 1 + SETUP_RTTS * (np.median(rtt) / 1e3 if len(rtt) else 0.0)
+    if wall_offset is None or timesecs is None:
+        zone, lo = 0, float(mono[0]) - width / 2
+    else:
+        zone = round((mono[0] + wall_offset - timesecs) / ZONE_S) * ZONE_S
+        lo = timesecs + zone - wall_offset
+    coarse = lo + width / 2
+    t0s = lo + np.arange(0, width, STEP_S)
+    costs = _cost(tr, iv, t0s)
+    base = _cost(tr, iv, [coarse])[0]
+    best = int(np.argmin(costs))
+    refined = bool(np.isfinite(costs[best]) and costs[best] < (1 - MIN_GAIN) * base)
+    t0 = float(t0s[best]) if refined else coarse
+    return {"t0_mono": t0, "coarse_mono": coarse, "zone_s": zone, "lag_s": float(mono[0] - t0),
+            "cost": float(costs[best] if refined else base), "refined": refined}
+
+
+def align(tr, iv, t0_mono, step=None, how="asof"):
+    """{column: array} of ALIGNED_COLS on the interval ends or a `step` s grid."""
+    t_ss = tr["monotonic"] - t0_mono
+    t_end = np.asarray(iv["t_end"], dtype=np.float64)
+    if step:
+        t = np.arange(1, int(t_end[-1] / step + 1e-9) + 1) * step
+        w0 = t - step
+    else:
+        t = t_end
+        w0 = np.asarray(iv["t_start"], dtype=np.float64)
+    inside = (t >= t_ss[0]) & (t <= t_ss[-1])
+    idx = np.searchsorted(t_ss, t, side="right") - 1
+
+    out = {"t": t}
+    series = {c: tr[c] for c in SS_ALIGN_COLS if c != "cwnd_bytes"}
+    series["cwnd_bytes"] = tr["cwnd"] * tr["mss"]
+    for c in SS_ALIGN_COLS:
+        if how == "interp":
+            col = np.where(inside, np.interp(t, t_ss, series[c]), np.nan)
+        else:
+            col = np.where(idx >= 0, series[c][np.maximum(idx, 0)], np.nan)
+        out["ss_" + c] = col
+    acked = tr["bytes_acked"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        good = (np.interp(t, t_ss, acked) - np.interp(w0, t_ss, acked)) * 8 / (t - w0) / 1e6
+    out["ss_goodput_mbps"] = np.where(inside & (w0 >= t_ss[0]), good, np.nan)
+
+    # Interval holding t: t_start < t <= t_end
+    k = np.searchsorted(t_end, t - 1e-9, side="left")
+    held = k < len(t_end)
+    for c in IV_ALIGN_COLS:
+        v = np.asarray(iv[c], dtype=np.float64)
+        out["iv_" + c] = np.where(held, v[np.minimum(k, len(v) - 1)], np.nan)
+    cum = np.concatenate([[0.0], np.cumsum(np.nan_to_num(np.asarray(iv["bytes"], dtype=np.float64)))])
+    out["iv_bytes_cum"] = np.interp(t, np.concatenate([[iv["t_start"][0]], t_end]), cum)
+    return out
+
+
+def load_run(ss_path, json_path):
+    """(data-flow trace, interval columns, offset dict) of one run."""
+    cols, meta = dataset.load_trace_columns(ss_path)
+    if meta["rows"] == 0:
+        raise ValueError(f"{ss_path}: empty trace")
+    tr = select_data_flow(trace_arrays(cols))
+    iv_cols, iv_meta = intervals.load_intervals(json_path)
+    if iv_meta["rows"] == 0:
+        raise ValueError(f"{json_path}: no intervals")
+    iv = {c: np.asarray(v, dtype=np.float64) for c, v in iv_cols.items()}
+    wall0 = meta.get("wall0")
+    wall_offset = None if wall0 is None else wall0 - float(cols["monotonic"][0])
+    return tr, iv, estimate_offset(tr, iv, wall_offset, iv_meta.get("timesecs"))
+
+
+def align_run(ss_path, json_path, step=None, how="asof"):
+    """(aligned table, offset dict) of one run."""
+    tr, iv, off = load_run(ss_path, json_path)
+    return align(tr, iv, off["t0_mono"], step, how), off
+
+
+def align_archive(rows, step=None, how="asof"):
+    """
+    One table for many catalog rows (KEY_COLS + ALIGNED_COLS) and the list of
+    (key, offset dict). Runs that fail are skipped with a warning.
+    """
+    parts, offsets = [], []
+    for r in rows:
+        if not r.get("json_path"):
+            continue
+        try:
+            table, off = align_run(r["ss_path"], r["json_path"], step, how)
+        except Exception as e:
+            print(f"[warn] cannot align {r['ss_path']}: {e}")
+            continue
+        n = len(table["t"])
+        table["algo"] = np.full(n, r["algo"])
+        for c in KEY_COLS[1:]:
+            table[c] = np.full(n, r[c], dtype=np.int64)
+        parts.append(table)
+        offsets.append((tuple(r[c] for c in KEY_COLS), off))
+    if not parts:
+        return {c: np.empty(0) for c in KEY_COLS + ALIGNED_COLS}, offsets
+    return {c: np.concatenate([p[c] for p in parts]) for c in KEY_COLS + ALIGNED_COLS}, offsets
@@ -0,0 +1,184 @@
+"""
+Build feature CSVs from a directory of runs.
+
+Only the sources behind the requested features are evaluated (see
+registry.py), the runs are spread over a process pool, and with a manifest
+a rerun only recomputes runs whose (mtime, size) changed.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .catalog import Catalog
+from .registry import BASE_FEATURES, FEATURES, TS_FEATURES, Run, compute, sources_for
+
+# Run identification columns in front of the features
+ID_WITH = ["algo", "rtt_setting", "bw_setting", "run"]
+ID_NO = ["algo", "run"]
+
+# Columns that are not plain floats when read back from the CSV
+INT_COLS = {"rtt_setting", "bw_setting", "run", "ss_cwnd_bytes"}
+
+
+def features_for_bundle(bundle_path):
+    """feature_cols of a train_rf.py bundle: the only features worth computing for it."""
+    header = os.path.join(bundle_path, "bundle.json")
+    if os.path.isfile(header):
+        # Bundle directory (train_model/model_bundle.py): the header is enough
+        with open(header) as f:
+            names = list(json.load(f)["feature_cols"])
+    else:
+        import joblib
+
+        names = list(joblib.load(bundle_path)["feature_cols"])
+    unknown = [n for n in names if n not in FEATURES]
+    if unknown:
+        raise ValueError(f"bundle needs unregistered features: {unknown}")
+    return names
+
+
+def build_row(task):
+    """Worker: compute one CSV row from (key, ss_path, json_path, names, params)."""
+    key, ss_path, json_path, names, params = task
+    feats = compute(Run(key, ss_path, json_path, params), names)
+    if feats is None:
+        print(f"[warn] missing features for {os.path.basename(ss_path)}")
+        return None
+
+    algo, rtt_setting, bw_setting, run = key
+    row = {
+        "algo": algo,
+        "rtt_setting": rtt_setting,   # ms
+        "bw_setting": bw_setting,     # Mbps
+        "run": run,
+    }
+    row.update(feats)
+    return row
+
+
+def scan_runs(ss_dir, json_dir, exts=(".log", ".ssb", ".ssz")):
+    """
+    Return [(key, ss_path, json_path, stat)] in directory order, from the run
+    catalog of ss_dir's log root (refreshed first: a stat pass, no parsing).
+    """
+    cat = Catalog.for_dirs(ss_dir, json_dir)
+    try:
+        rows = cat.query(ss_dir=cat.rel(ss_dir), order="seq")
+    finally:
+        cat.close()
+    runs = []
+    for r in rows:
+        if "." + r["format"] not in exts:
+            continue
+        if r["json_path"] is None:
+            print(f"[warn] missing JSON file for {os.path.basename(r['ss_path'])}")
+            continue
+        stat = [r["ss_mtime_ns"], r["ss_size"], r["json_mtime_ns"], r["json_size"]]
+        runs.append((r["key"], r["ss_path"], r["json_path"], stat))
+    return runs
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_existing_rows(csv_path):
+    """Rows of a previous *_with_cond.csv, keyed by (algo, rtt, bw, run)."""
+    rows = {}
+    if not os.path.exists(csv_path):
+        return rows
+    with open(csv_path, newline="") as f:
+        for r in csv.DictReader(f):
+            row = {k: (int(v) if k in INT_COLS else v if k == "algo" else float(v))
+                   for k, v in r.items()}
+            rows[(row["algo"], row["rtt_setting"], row["bw_setting"], row["run"])] = row
+    return rows
+
+
+def key_name(key):
+    algo, rtt, bw, run = key
+    return f"{algo}_rtt{rtt}_bw{bw}_run{run}"
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: r[k] for k in fieldnames})
+
+
+def build(ss_dir, json_dir, out_with=None, out_no=None, manifest=None, features=None,
+          jobs=None, full=False, ts_window=None, ts_max_points=None, exts=(".log", ".ssb", ".ssz")):
+    """
+    Build (or incrementally refresh) the feature CSVs.
+
+    features  : feature names to compute (default: BASE_FEATURES, plus
+                TS_FEATURES when ts_window is set)
+    ts_window : goodput window (s) for the time-series features
+    ts_max_points : decimate longer traces before the time-series features
+    manifest  : path of the (mtime, size) manifest; incremental mode needs it
+                and out_with, otherwise every run is computed
+    Returns (rows, n_recomputed).
+    """
+    if features is None:
+        features = BASE_FEATURES + (TS_FEATURES if ts_window is not None else [])
+    features = list(features)
+    params = {"ts_window": 1.0 if ts_window is None else ts_window, "ts_max_points": ts_max_points}
+    fieldnames_with = ID_WITH + features
+    fieldnames_no = ID_NO + features
+
+    runs = scan_runs(ss_dir, json_dir, exts)
+
+    incremental = not full and manifest is not None and out_with is not None
+    old_manifest = load_manifest(manifest) if incremental else {}
+    # Rows computed with other parameters are stale
+    if old_manifest.get("__params__", params) != params:
+        old_manifest = {}
+    cached = load_existing_rows(out_with) if incremental else {}
+
+    # Only runs whose (mtime, size) changed, or whose cached row lacks a column
+    todo = []
+    for key, ss_path, json_path, stat in runs:
+        row = cached.get(key)
+        if old_manifest.get(key_name(key)) != stat or row is None or any(k not in row for k in features):
+            todo.append((key, ss_path, json_path, features, params))
+
+    if todo:
+        # The full trace costs far more than the tails: pool smaller batches
+        if jobs == 1 or len(todo) < 64:
+            fresh = list(map(build_row, todo))
+        else:
+            chunksize = 16 if "ss_trace" in sources_for(features) else 256
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                fresh = list(pool.map(build_row, todo, chunksize=chunksize))
+        for (key, _, _, _, _), row in zip(todo, fresh):
+            if row is None:
+                cached.pop(key, None)
+            else:
+                cached[key] = row
+
+    rows = []
+    new_manifest = {}
+    for key, _, _, stat in runs:
+        row = cached.get(key)
+        if row is None:
+            continue
+        rows.append(row)
+        new_manifest[key_name(key)] = stat
+    new_manifest["__params__"] = params
+
+    if rows:
+        if out_with:
+            write_csv(out_with, fieldnames_with, rows)
+        if out_no:
+            write_csv(out_no, fieldnames_no, rows)
+        if manifest:
+            with open(manifest, "w") as f:
+                json.dump(new_manifest, f)
+
+    return rows, len(todo)
@@ -0,0 +1,257 @@
+"""
+Run catalog: an SQLite index of the runs under a log root.
+
+One row per ss log (.log, .ssb or .ssz) with its (algo, rtt, bw, run) key, the
+matching iperf3 JSON, the (mtime, size) of both files and summary stats of
+the trace. A log root (collect_data/logs, collect_data_test, ...) has ss/ and
+iperf/ below it; its database lives in ~/.cache/congctrl/catalog
+($XDG_CACHE_HOME), one file per root, so the log root is never written to.
+
+refresh() only stats the two directories: new and changed files get their
+row rewritten, deleted files lose it, nothing is parsed. The summary stats
+(sample count, time span, rtt / cwnd / pacing, retransmits, iperf3
+throughput) are filled by summarize(), which reads traces through the
+dataset cache; query() calls it by itself when a condition needs them.
+
+Queries are conditions on columns, e.g.
+
+  cat = Catalog.open("../collect_data/logs")
+  cat.query("algo=cubic", "rtt>=100", bw=500)
+  cat.query("algo=bbr,reno", "ip_tp_mbps<50")
+
+and return dicts with absolute ss_path / json_path.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+
+import numpy as np
+
+from .sources import parse_json, parse_name
+
+# Bump when the schema changes: an older database is rebuilt
+SCHEMA_VERSION = 1
+
+KEY_COLS = ["algo", "rtt", "bw", "run"]
+FILE_COLS = ["ss_dir", "ss_path", "format", "json_path", "seq",
+             "ss_mtime_ns", "ss_size", "json_mtime_ns", "json_size"]
+STAT_COLS = ["samples", "t_start", "t_end", "duration_s",
+             "rtt_mean_ms", "rtt_max_ms", "cwnd_max_bytes", "pacing_mean_mbps",
+             "bytes_acked", "retrans_total", "ip_tp_mbps", "ip_mean_rtt_ms"]
+INT_STATS = {"samples", "bytes_acked", "retrans_total"}
+COLUMNS = KEY_COLS + FILE_COLS + STAT_COLS + ["summarized"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    algo TEXT NOT NULL, rtt INTEGER NOT NULL, bw INTEGER NOT NULL, run INTEGER NOT NULL,
+    ss_dir TEXT NOT NULL, ss_path TEXT PRIMARY KEY, format TEXT NOT NULL, json_path TEXT,
+    seq INTEGER, ss_mtime_ns INTEGER, ss_size INTEGER, json_mtime_ns INTEGER, json_size INTEGER,
+    {", ".join(c + (" INTEGER" if c in INT_STATS else " REAL") for c in STAT_COLS)},
+    summarized INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (algo, rtt, bw, run);
+CREATE INDEX IF NOT EXISTS runs_cond ON runs (rtt, bw);
+"""
+
+COND_RE = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|==|=|<|>)\s*(.+?)\s*$")
+
+
+def _value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text.lower() if text.isalpha() else text
+
+
+def parse_cond(cond):
+    """'rtt>=100' -> (sql, params); 'algo=bbr,reno' becomes an IN (...)."""
+    m = COND_RE.match(cond)
+    if not m or m.group(1) not in COLUMNS:
+        raise ValueError(f"bad condition {cond!r} (expected <column><op><value>, "
+                         f"column one of {', '.join(COLUMNS)})")
+    col, op, text = m.groups()
+    values = [_value(v) for v in text.split(",")]
+    if len(values) > 1 and op in ("=", "==", "!="):
+        neg = "NOT " if op == "!=" else ""
+        return f"{col} {neg}IN ({', '.join('?' * len(values))})", values
+    return f"{col} {'=' if op == '==' else op} ?", [values[0]]
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def summarize_run(ss_path, json_path):
+    """Summary stats of one run (STAT_COLS), from the dataset cache and the iperf3 tail."""
+    from . import dataset
+
+    out = dict.fromkeys(STAT_COLS)
+    try:
+        cols, meta = dataset.load_trace_columns(ss_path)
+    except Exception as e:
+        print(f"[warn] catalog: cannot read {ss_path}: {e}", file=sys.stderr)
+        cols, meta = None, {"rows": 0}
+    out["samples"] = int(meta["rows"])
+    if meta["rows"]:
+        t = cols["monotonic"]
+        out.update(
+            t_start=float(t[0]), t_end=float(t[-1]), duration_s=float(t[-1] - t[0]),
+            rtt_mean_ms=float(np.mean(cols["rtt_ms"])), rtt_max_ms=float(np.max(cols["rtt_ms"])),
+            cwnd_max_bytes=float(np.max(np.asarray(cols["cwnd"], dtype=np.float64) * cols["mss"])),
+            pacing_mean_mbps=float(np.mean(cols["pacing_mbps"])),
+            bytes_acked=int(cols["bytes_acked"][-1]), retrans_total=int(cols["retrans_total"][-1]),
+        )
+    ip = parse_json(json_path) if json_path else None
+    if ip:
+        out.update(ip)
+    return out
+
+
+def db_path_for(root):
+    """Database of a log root: <name>-<hash of the absolute path>.sqlite in the user cache dir."""
+    from .dataset import user_cache_dir
+
+    root = os.path.abspath(root)
+    digest = hashlib.sha1(root.encode()).hexdigest()[:12]
+    return os.path.join(user_cache_dir("catalog"), f"{os.path.basename(root)}-{digest}.sqlite")
+
+
+class Catalog:
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = os.path.abspath(db_path or db_path_for(self.root))
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.row_factory = sqlite3.Row
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS runs")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, log_root, refresh=False, db_path=None):
+        """Catalog of <log_root> (ss/ and iperf/ below it), optionally refreshed."""
+        cat = cls(log_root, db_path)
+        if refresh:
+            cat.refresh()
+        return cat
+
+    @classmethod
+    def for_dirs(cls, ss_dir, json_dir=None):
+        """Catalog whose root holds ss_dir, refreshed against ss_dir / json_dir."""
+        cat = cls(os.path.dirname(os.path.abspath(ss_dir)))
+        cat.refresh(ss_dir, json_dir)
+        return cat
+
+    def close(self):
+        self.db.close()
+
+    def rel(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _abs(self, path):
+        return None if path is None else os.path.normpath(os.path.join(self.root, path))
+
+    def refresh(self, ss_dir=None, json_dir=None):
+        """
+        Sync the rows of ss_dir with the directory (stat only, no parsing).
+        Returns (n_runs, n_changed).
+        """
+        ss_dir = ss_dir or os.path.join(self.root, "ss")
+        json_dir = json_dir or os.path.join(os.path.dirname(os.path.abspath(ss_dir)), "iperf")
+        rel_dir = self.rel(ss_dir)
+        known = {r["ss_path"]: tuple(r)[1:] for r in self.db.execute(
+            "SELECT ss_path, json_path, seq, ss_mtime_ns, ss_size, json_mtime_ns, json_size "
+            "FROM runs WHERE ss_dir = ?", (rel_dir,))}
+
+        upsert, moved, seen = [], [], set()
+        with os.scandir(ss_dir) as it:
+            for seq, entry in enumerate(it):
+                stem, ext = os.path.splitext(entry.name)
+                if ext not in (".log", ".ssb", ".ssz"):
+                    continue
+                key = parse_name(entry.name)
+                if not key:
+                    print(f"[skip] filename not matched: {entry.name}", file=sys.stderr)
+                    continue
+                rel = self.rel(entry.path)
+                seen.add(rel)
+                json_path = os.path.join(json_dir, stem + ".json")
+                try:
+                    json_stat = _stat(json_path)
+                    json_rel = self.rel(json_path)
+                except FileNotFoundError:
+                    json_stat, json_rel = (None, None), None
+                st = entry.stat()
+                state = (json_rel, seq, st.st_mtime_ns, st.st_size) + json_stat
+                old = known.get(rel)
+                if old == state:
+                    continue
+                if old is not None and old[:1] + old[2:] == state[:1] + state[2:]:
+                    moved.append((seq, rel))   # only the directory order changed
+                    continue
+                upsert.append(key + (rel_dir, rel, ext[1:]) + state)
+
+        gone = [(p,) for p in known if p not in seen]
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO runs (algo, rtt, bw, run, ss_dir, ss_path, format, json_path, "
+                "seq, ss_mtime_ns, ss_size, json_mtime_ns, json_size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", upsert)
+            self.db.executemany("UPDATE runs SET seq = ? WHERE ss_path = ?", moved)
+            self.db.executemany("DELETE FROM runs WHERE ss_path = ?", gone)
+        return len(seen), len(upsert) + len(gone)
+
+    def summarize(self):
+        """Fill the summary stats of runs that do not have them yet. Returns how many."""
+        todo = self.db.execute("SELECT ss_path, json_path FROM runs WHERE summarized = 0").fetchall()
+        updates = []
+        for r in todo:
+            stats = summarize_run(self._abs(r["ss_path"]), self._abs(r["json_path"]))
+            updates.append([stats[c] for c in STAT_COLS] + [r["ss_path"]])
+        with self.db:
+            self.db.executemany(
+                f"UPDATE runs SET {', '.join(c + ' = ?' for c in STAT_COLS)}, summarized = 1 "
+                f"WHERE ss_path = ?", updates)
+        return len(updates)
+
+    def query(self, *conds, order="algo, rtt, bw, run, format", **eq):
+        """
+        Runs matching every condition ('rtt>=100', 'algo=bbr,reno', ...) and
+        every column=value keyword (compared as is), as dicts ("key" holds
+        (algo, rtt, bw, run)).
+        """
+        where, params = [], []
+        for cond in conds:
+            sql, p = parse_cond(cond)
+            where.append(sql)
+            params += p
+        for col, value in eq.items():
+            if col not in COLUMNS:
+                raise ValueError(f"unknown column {col!r}")
+            where.append(f"{col} = ?")
+            params.append(value)
+        if any(c in STAT_COLS for c in re.findall(r"\w+", " ".join(where))):
+            self.summarize()
+
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = []
+        for r in self.db.execute(f"{sql} ORDER BY {order}", params):
+            row = dict(r)
+            row["ss_path"] = self._abs(row["ss_path"])
+            row["json_path"] = self._abs(row["json_path"])
+            row["key"] = (row["algo"], row["rtt"], row["bw"], row["run"])
+            rows.append(row)
+        return rows
+
+    def get(self, algo, rtt, bw, run):
+        """The run with this key (binary before text when several formats exist), or None."""
+        rows = self.query(algo=algo, rtt=rtt, bw=bw, run=run, order="format DESC")
+        return rows[0] if rows else None
@@ -0,0 +1,312 @@
+"""
+Content-hashed, memory-mapped cache of parsed inputs.
+
+Feature CSVs and ss logs are parsed once into a structured .npy file (one
+field per column) under ~/.cache/congctrl/dataset ($XDG_CACHE_HOME), so
+reading a data directory never writes into it. Later loads
+np.load(mmap_mode="r") it instead of parsing text again. The cache_dir
+argument or $DATASET_CACHE put the cache elsewhere. A cache that cannot be
+written is a miss: the file is parsed and nothing is stored.
+
+Layout:
+  index.json                   absolute path -> [mtime_ns, size, digest, entry]
+  <kind>-v<N>-<digest>.npy     one entry per distinct file content
+  <kind>-v<N>-<digest>.json    columns, algo, run keys, ...
+
+A file whose (mtime, size) matches the index is not even read. Otherwise
+it is hashed (sha1). Unchanged content keeps its entry, and changed
+content gets a new entry (the old one is removed when nothing refers to
+it), so edited or regenerated logs are picked up automatically. Index
+updates are batched (written every 64 updates and at exit); a process that
+misses them only pays a rehash, never a reparse.
+
+Floats are parsed exactly (like pd.read_csv(float_precision="round_trip");
+the pandas default can be one ulp off).
+
+Rows / traces are keyed by (algo, rtt, bw, run) where the source has them:
+feature CSVs store the key of each row in meta["keys"] and traces take it
+from the file name (see sources.parse_name). Trace meta also has "wall0",
+the wall clock (epoch s) of the first sample, taken with monotonic[0].
+"""
+import atexit
+import csv
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .sources import parse_name
+from .timeseries import SS_COLS, load_trace as _parse_trace
+
+# Bump when a parser changes, so old entries are not reused
+FORMAT_VERSION = 2
+
+
+def user_cache_dir(name="dataset"):
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "congctrl", name)
+
+
+def default_cache_dir():
+    """$DATASET_CACHE, else user_cache_dir()."""
+    return os.environ.get("DATASET_CACHE") or user_cache_dir()
+
+
+def file_digest(path, block=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(block)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+
+# cache_dir -> (index.json mtime_ns, index); saves re-reading it on every load
+_INDEX = {}
+# entry path -> (columns, meta) already opened in this process
+_OPEN = {}
+# cache_dir -> {path: index record} not written to index.json yet
+_PENDING = {}
+FLUSH_EVERY = 64
+
+
+def _read_index(cache_dir):
+    path = os.path.join(cache_dir, "index.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    hit = _INDEX.get(cache_dir)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    _INDEX[cache_dir] = (mtime, index)
+    return index
+
+
+def _write_index(cache_dir, updates):
+    # Merge with what other processes wrote meanwhile
+    _INDEX.pop(cache_dir, None)
+    merged = dict(_read_index(cache_dir), **updates)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(merged, f)
+    os.replace(tmp, os.path.join(cache_dir, "index.json"))
+    _INDEX.pop(cache_dir, None)
+    return merged
+
+
+def flush():
+    """Write pending index updates of every cache dir."""
+    while _PENDING:
+        cache_dir, updates = _PENDING.popitem()
+        try:
+            _write_index(cache_dir, updates)
+        except OSError:
+            pass
+
+
+atexit.register(flush)
+
+
+def _to_records(columns):
+    """{name: 1-D array} -> one structured array (a single mmap-able .npy)."""
+    names = list(columns)
+    n = len(columns[names[0]]) if names else 0
+    rec = np.empty(n, dtype=[(c, columns[c].dtype) for c in names])
+    for c in names:
+        rec[c] = columns[c]
+    return rec
+
+
+def _entry_meta(columns, meta):
+    return dict(meta, columns=list(columns), version=FORMAT_VERSION)
+
+
+def _write_entry(entry_path, columns, meta):
+    """Write the .npy, then meta .json: the .json marks a complete entry."""
+    meta = _entry_meta(columns, meta)
+    np.save(entry_path + ".npy", _to_records(columns))
+    with open(entry_path + ".json", "w") as f:
+        json.dump(meta, f)
+
+
+def _read_entry(entry_path, mmap=True):
+    """(columns, meta); raises OSError / ValueError for missing or partial entries."""
+    hit = _OPEN.get(entry_path)
+    if hit is not None:
+        return hit
+    with open(entry_path + ".json") as f:
+        meta = json.load(f)
+    rec = np.load(entry_path + ".npy", mmap_mode="r" if mmap else None)
+    cols = {c: rec[c] for c in meta["columns"]}
+    if mmap:
+        _OPEN[entry_path] = (cols, meta)
+    return cols, meta
+
+
+def cached(path, kind, parse, cache_dir=None, mmap=True):
+    """
+    (columns, meta) of `path`, where parse(path) -> (columns, meta) runs only
+    when the file content is not in the cache yet. When the cache cannot be
+    written the parsed columns are returned in memory.
+    """
+    path = os.path.abspath(path)
+    cache_dir = cache_dir or default_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        columns, meta = parse(path)
+        return columns, _entry_meta(columns, dict(meta, source=path))
+    pending = _PENDING.setdefault(cache_dir, {})
+
+    st = os.stat(path)
+    stat = [st.st_mtime_ns, st.st_size]
+    rec = pending.get(path) or _read_index(cache_dir).get(path)
+    if rec and rec[:2] == stat:
+        try:
+            return _read_entry(os.path.join(cache_dir, rec[3]), mmap)
+        except (OSError, ValueError):
+            pass   # entry removed or half-written: rebuild it
+
+    digest = file_digest(path)
+    entry = f"{kind}-v{FORMAT_VERSION}-{digest}"
+    entry_path = os.path.join(cache_dir, entry)
+    try:
+        out = _read_entry(entry_path, mmap)
+    except (OSError, ValueError):
+        columns, meta = parse(path)
+        meta = dict(meta, source=path, digest=digest)
+        try:
+            _write_entry(entry_path, columns, meta)
+            out = _read_entry(entry_path, mmap)
+        except OSError:
+            # Read-only or full cache: a miss, not an error
+            return columns, _entry_meta(columns, meta)
+
+    pending[path] = stat + [digest, entry]
+    old = rec[3] if rec else None
+    if old and old != entry:
+        index = dict(_read_index(cache_dir), **pending)
+        if all(r[3] != old for r in index.values()):
+            for ext in (".json", ".npy"):
+                try:
+                    os.unlink(os.path.join(cache_dir, old) + ext)
+                except OSError:
+                    pass
+            _OPEN.pop(os.path.join(cache_dir, old), None)
+    if len(pending) >= FLUSH_EVERY or old != entry and old is not None:
+        try:
+            _write_index(cache_dir, _PENDING.pop(cache_dir))
+        except OSError:
+            pass   # the next load rehashes the file, it does not reparse it
+    return out
+
+
+# ====== Feature tables (build_features.py CSVs) ======
+def _parse_table(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    columns = {}
+    for j, name in enumerate(header):
+        vals = [r[j] for r in rows]
+        for dtype in (np.int64, np.float64):
+            try:
+                columns[name] = np.array(vals, dtype=dtype)
+                break
+            except ValueError:
+                continue
+        else:
+            columns[name] = np.array(vals, dtype=str)
+
+    keys = []
+    if "algo" in columns and "run" in columns:
+        rtt = columns.get("rtt_setting")
+        bw = columns.get("bw_setting")
+        for i in range(len(rows)):
+            keys.append([str(columns["algo"][i]),
+                         None if rtt is None else int(rtt[i]),
+                         None if bw is None else int(bw[i]),
+                         int(columns["run"][i])])
+    return columns, {"rows": len(rows), "keys": keys}
+
+
+def load_table_columns(path, cache_dir=None):
+    """{column: memmapped ndarray}, meta of a feature CSV."""
+    return cached(path, "table", _parse_table, cache_dir)
+
+
+def load_table(path, cache_dir=None):
+    """A feature CSV as a pandas DataFrame, same dtypes as pd.read_csv."""
+    import pandas as pd
+
+    columns, meta = load_table_columns(path, cache_dir)
+    return pd.DataFrame({c: np.asarray(columns[c]) for c in meta["columns"]})
+
+
+# ====== ss traces (collect_ss.py logs) ======
+def _parse_ss_log(path):
+    with open(path, "rb") as f:
+        first = f.readline().split()
+        second = f.readline().split()
+    if first and first[0] == b"wall_time":
+        header, data = [c.decode() for c in first], second
+    else:
+        header, data = SS_COLS, first
+    numeric = [c for c in header if c not in ("wall_time", "algo")]
+    columns = _parse_trace(path, numeric)
+    algo = data[header.index("algo")].decode() if len(data) == len(header) else None
+    wall0 = None
+    if len(data) == len(header) and "wall_time" in header:
+        # collect_ss.py writes naive local time; read as UTC (align.py finds the zone)
+        wall0 = datetime.datetime.fromisoformat(data[header.index("wall_time")].decode()).replace(
+            tzinfo=datetime.timezone.utc).timestamp()
+    return columns, {"algo": algo, "key": parse_name(os.path.basename(path)),
+                     "rows": int(len(columns[numeric[0]])), "wall0": wall0}
+
+
+def load_trace_columns(path, cache_dir=None):
+    """
+    {column: ndarray}, meta of an ss log. Text logs go through the cache;
+    .ssb files are already memory-mappable and are opened directly, and
+    .ssz files decode faster than a cache lookup.
+    """
+    if path.endswith((".ssb", ".ssz")):
+        import ss_binary
+
+        header, records = ss_binary.open_records(path)
+        columns = {c: records[c] for c in records.dtype.names if c != "wall_time"}
+        return columns, {"algo": header["algo"], "key": parse_name(os.path.basename(path)),
+                         "rows": len(records), "columns": list(columns),
+                         "wall0": float(records["wall_time"][0]) if len(records) else None}
+    return cached(path, "sslog", _parse_ss_log, cache_dir)
+
+
+def load_trace(path, cache_dir=None):
+    """An ss log as a pandas DataFrame (numeric columns plus algo)."""
+    import pandas as pd
+
+    columns, meta = load_trace_columns(path, cache_dir)
+    df = pd.DataFrame({c: np.asarray(columns[c]) for c in meta["columns"]})
+    df["algo"] = meta["algo"]
+    return df
+
+
+def find_trace(ss_dir, algo, rtt, bw, run):
+    """Path of the ss log for (algo, rtt, bw, run) in ss_dir, or None."""
+    stem = f"{algo}_rtt{rtt}_bw{bw}_run{run}"
+    for ext in (".ssb", ".ssz", ".log"):
+        path = os.path.join(ss_dir, stem + ext)
+        if os.path.exists(path):
+            return path
+    return None
@@ -0,0 +1,183 @@
+"""
+Decimation of long ss traces, for plotting and (optionally) feature extraction.
+
+  minmax_indices : min and max sample of each equal-count bucket; keeps
+                   every peak and drop, so a line plot of the kept points
+                   looks the same at screen resolution
+  lttb_indices   : Largest-Triangle-Three-Buckets, one representative point
+                   per bucket that keeps the visual shape of the series
+  decimate_trace : slice every column of a trace at the same indices
+
+Both return sorted indices into the raw arrays, so decimated points are real
+samples and counters stay monotonic.
+
+For zooming, build_pyramid() pre-aggregates min/max indices per column at
+bucket sizes BASE, BASE*FACTOR, BASE*FACTOR^2, ... samples; pyramid() keeps
+them in the dataset cache (one entry per trace content) and view() answers
+"column col between t0 and t1 in at most max_points points" from the finest
+level that fits, reading only the buckets in the range.
+"""
+import numpy as np
+
+from . import dataset
+
+# Samples per level-0 bucket and growth factor between levels
+BASE = 16
+FACTOR = 4
+# Stop adding levels once a level has this few buckets
+MIN_BUCKETS = 64
+
+# Series that are not raw columns of the log
+DERIVED = {
+    "cwnd_bytes": lambda c: np.asarray(c["cwnd"], dtype=np.float64) * c["mss"],
+}
+DERIVED_INPUTS = {"cwnd_bytes": ["cwnd", "mss"]}
+PYRAMID_COLS = ["rtt_ms", "rtt_var_ms", "cwnd_bytes", "pacing_mbps", "bytes_acked"]
+
+
+def series(cols, name):
+    return DERIVED[name](cols) if name in DERIVED else cols[name]
+
+
+def _padded(y, k):
+    """y reshaped to (n_buckets, k), the last bucket padded with its last value."""
+    nb = -(-len(y) // k)
+    pad = nb * k - len(y)
+    if pad:
+        y = np.concatenate([y, np.full(pad, y[-1], dtype=y.dtype)])
+    return y.reshape(nb, k)
+
+
+def _bucket_minmax(y, k):
+    """Raw indices of the min and max of each k-sample bucket."""
+    yp = _padded(np.asarray(y), k)
+    base = np.arange(len(yp)) * k
+    last = len(y) - 1
+    return (np.minimum(base + yp.argmin(axis=1), last),
+            np.minimum(base + yp.argmax(axis=1), last))
+
+
+def minmax_indices(y, n_buckets):
+    """Sorted indices of the first, last, min and max sample of n_buckets buckets."""
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    imin, imax = _bucket_minmax(y, -(-n // n_buckets))
+    return np.unique(np.concatenate([[0, n - 1], imin, imax]))
+
+
+def lttb_indices(t, y, n_out):
+    """Indices of the n_out points picked by Largest-Triangle-Three-Buckets."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets between the fixed first and last point
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], edges[i + 2]
+        ct, cy = t[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((t[a] - ct) * (y[lo:hi] - y[a]) - (t[a] - t[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def decimate_trace(tr, max_points, key="cwnd_bytes"):
+    """
+    {column: array} cut to about max_points rows: min/max buckets of `key`
+    (cwnd keeps its sawtooth drops) applied to every column.
+    """
+    n = len(tr["monotonic"])
+    if n <= max_points:
+        return tr
+    idx = minmax_indices(series(tr, key), max(1, max_points // 2))
+    return {c: np.asarray(v)[idx] for c, v in tr.items()}
+
+
+# ====== Multi-resolution pyramid ======
+def build_pyramid(cols, names=PYRAMID_COLS, base=BASE, factor=FACTOR, min_buckets=MIN_BUCKETS):
+    """
+    ({"<name>_imin"/"<name>_imax": all levels concatenated}, levels) where
+    levels is [[offset, n_buckets, samples_per_bucket], ...], finest first.
+    """
+    n = len(cols["monotonic"])
+    out = {}
+    levels = []
+    for name in names:
+        y = np.asarray(series(cols, name))
+        imin, imax = _bucket_minmax(y, base)
+        parts_min, parts_max, lv = [imin], [imax], [[0, len(imin), base]]
+        size, offset = base, len(imin)
+        while len(imin) > min_buckets:
+            # Bucket of the next level: the extreme of FACTOR children
+            cmin, cmax = _padded(imin, factor), _padded(imax, factor)
+            rows = np.arange(len(cmin))
+            imin = cmin[rows, y[cmin].argmin(axis=1)]
+            imax = cmax[rows, y[cmax].argmax(axis=1)]
+            size *= factor
+            lv.append([offset, len(imin), size])
+            offset += len(imin)
+            parts_min.append(imin)
+            parts_max.append(imax)
+        out[name + "_imin"] = np.concatenate(parts_min).astype(np.int64)
+        out[name + "_imax"] = np.concatenate(parts_max).astype(np.int64)
+        levels = lv
+    return out, {"levels": levels, "samples": n}
+
+
+def _parse_pyramid(path):
+    cols, _ = dataset.load_trace_columns(path)
+    if len(cols["monotonic"]) == 0:
+        raise ValueError(f"{path}: empty trace")
+    return build_pyramid(cols)
+
+
+def pyramid(path, cache_dir=None):
+    """Pyramid of an ss log, built once per content and memory-mapped after that."""
+    return dataset.cached(path, f"pyr{BASE}x{FACTOR}", _parse_pyramid, cache_dir)
+
+
+def _at(cols, col, idx):
+    """Values of series `col` at raw indices idx (derived ones from their inputs only)."""
+    needed = DERIVED_INPUTS.get(col, [col])
+    return np.asarray(series({k: np.asarray(cols[k])[idx] for k in needed}, col))
+
+
+def view(path, col, t0=None, t1=None, max_points=4000):
+    """
+    (t, y) of series `col` with t0 <= t <= t1 (trace monotonic time, None
+    for the ends), at most about max_points real samples: the raw samples
+    when they fit, else the min/max of the finest pyramid level that fits.
+    """
+    cols, _ = dataset.load_trace_columns(path)
+    t = cols["monotonic"]
+    i0 = 0 if t0 is None else int(np.searchsorted(t, t0, "left"))
+    i1 = len(t) if t1 is None else int(np.searchsorted(t, t1, "right"))
+    if i1 - i0 <= max_points:
+        idx = np.arange(i0, i1)
+    elif col not in PYRAMID_COLS:
+        idx = i0 + minmax_indices(_at(cols, col, slice(i0, i1)), max_points // 2)
+    else:
+        pyr, meta = pyramid(path)
+        levels = meta["levels"]
+        offset, count, size = levels[-1]
+        for lv in levels:
+            if 2 * ((i1 - i0) // lv[2] + 4) <= max_points:
+                offset, count, size = lv
+                break
+        # Whole buckets inside [i0, i1) come from the level, the two partial
+        # edge buckets from the raw samples
+        b0, b1 = -(-i0 // size), i1 // size
+        idx = [pyr[col + "_imin"][offset + b0:offset + b1], pyr[col + "_imax"][offset + b0:offset + b1]]
+        for lo, hi in ((i0, min(i1, b0 * size)), (max(i0, b1 * size), i1)):
+            if hi > lo:
+                y = _at(cols, col, slice(lo, hi))
+                idx.append([lo + int(y.argmin()), lo + int(y.argmax())])
+        idx = np.unique(np.concatenate(idx + [[i0, i1 - 1]]).astype(np.int64))
+    return np.asarray(t[idx]), _at(cols, col, idx)
@@ -0,0 +1,202 @@
+"""
+iperf3 interval series: streaming parser, ss join and features.
+
+parse_json() (sources.py) only reads the trailing "end" summary. The
+per-interval records (every 0.5 s: bytes, retransmits, snd_cwnd, rtt,
+rttvar of the sender socket) are pulled out here without loading the whole
+document: iter_intervals() reads the file in chunks, skips to the
+"intervals" array and decodes one interval object at a time, so memory is
+bounded by one chunk plus one interval whatever the file size.
+
+load_intervals() stores the series as compact arrays in the dataset cache
+(INTERVAL_COLS, one row per interval, first stream):
+
+  t_start, t_end   interval bounds, seconds since the test start
+  bytes, tp_mbps   bytes sent in the interval and the rate
+  retransmits      retransmitted segments in the interval
+  snd_cwnd         cwnd at the interval end (bytes)
+  rtt_ms, rttvar_ms, pmtu, omitted
+
+join_ss() samples the ss trace at each interval end (as-of: the last ss
+sample at or before it, on the clock offset estimated by align.py), and
+interval_features() turns both into IV_FEATURES.
+"""
+import json
+import re
+from array import array
+
+import numpy as np
+
+INTERVAL_COLS = ["t_start", "t_end", "bytes", "tp_mbps", "retransmits", "snd_cwnd",
+                 "rtt_ms", "rttvar_ms", "pmtu", "omitted"]
+
+IV_FEATURES = [
+    "iv_tp_mean", "iv_tp_cv", "iv_tp_p10", "iv_tp_p90",
+    "iv_retrans_per_s",
+    "iv_rtt_p50_ms", "iv_rtt_p90_ms", "iv_rttvar_p50_ms",
+    "iv_cwnd_p50_bytes", "iv_cwnd_cv",
+    "iv_delivery_ratio",
+    "jn_tp_over_pacing", "jn_cwnd_ratio", "jn_rtt_diff_ms", "jn_tp_rate_corr",
+]
+
+RE_INTERVALS = re.compile(r'"intervals"\s*:\s*\[')
+RE_TIMESECS = re.compile(r'"timesecs"\s*:\s*(\d+)\D')
+RE_SKIP = re.compile(r"[\s,]*")
+
+
+def iter_intervals(path, chunk=1 << 16, header=None):
+    """
+    Yield the objects of the top-level "intervals" array one at a time.
+    If `header` is a dict, the test start epoch is stored in header["timesecs"].
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        buf = ""
+        while True:
+            data = f.read(chunk)
+            if not data:
+                return
+            buf += data
+            m = RE_INTERVALS.search(buf)
+            if m:
+                break
+            # Keep a tail in case the key is cut between two chunks
+            if header is not None and "timesecs" not in header:
+                t = RE_TIMESECS.search(buf)
+                if t:
+                    header["timesecs"] = int(t.group(1))
+            buf = buf[-64:]
+        if header is not None and "timesecs" not in header:
+            t = RE_TIMESECS.search(buf, 0, m.start())
+            if t:
+                header["timesecs"] = int(t.group(1))
+
+        pos = m.end()
+        while True:
+            pos = RE_SKIP.match(buf, pos).end()
+            if pos >= len(buf) or buf[pos] != "]":
+                try:
+                    obj, pos = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    # Object cut at the chunk end: read on (or stop at a truncated file)
+                    data = f.read(chunk)
+                    if not data:
+                        return
+                    buf = buf[pos:] + data
+                    pos = 0
+                    continue
+                yield obj
+                if pos > chunk:
+                    buf = buf[pos:]
+                    pos = 0
+            else:
+                return
+
+
+def parse_intervals(path):
+    """(columns, meta) of the interval series of an iperf3 JSON (first stream)."""
+    header = {}
+    # Flat float64 buffer, 8 bytes per value instead of a tuple of floats per row
+    buf = array("d")
+    for iv in iter_intervals(path, header=header):
+        streams = iv.get("streams") or [iv.get("sum", {})]
+        s = streams[0]
+        buf.extend((
+            s.get("start", np.nan), s.get("end", np.nan), s.get("bytes", np.nan),
+            s.get("bits_per_second", np.nan) / 1e6, s.get("retransmits", np.nan),
+            s.get("snd_cwnd", np.nan), s.get("rtt", np.nan) / 1e3, s.get("rttvar", np.nan) / 1e3,
+            s.get("pmtu", np.nan), float(bool(s.get("omitted", False))),
+        ))
+    values = np.frombuffer(buf, dtype=np.float64).reshape(-1, len(INTERVAL_COLS))
+    columns = {c: values[:, j].copy() for j, c in enumerate(INTERVAL_COLS)}
+    return columns, {"rows": len(values), "timesecs": header.get("timesecs")}
+
+
+def load_intervals(path, cache_dir=None):
+    """{column: memmapped ndarray}, meta of an iperf3 JSON, parsed once per content."""
+    from . import dataset
+
+    return dataset.cached(path, "iperf_iv", parse_intervals, cache_dir)
+
+
+def join_ss(iv, tr, t0_mono=None):
+    """
+    ss columns sampled at each interval end (as-of join): {column: array of
+    len(iv["t_end"])}, NaN where the interval ends before the first sample.
+    t0_mono is the monotonic time of the iperf3 test start (align.py);
+    None takes the first ss sample.
+    """
+    t_ss = tr["monotonic"] - (tr["monotonic"][0] if t0_mono is None else t0_mono)
+    idx = np.searchsorted(t_ss, iv["t_end"], side="right") - 1
+    ok = idx >= 0
+    out = {}
+    for c, v in tr.items():
+        col = np.full(len(idx), np.nan)
+        col[ok] = np.asarray(v, dtype=np.float64)[idx[ok]]
+        out[c] = col
+    return out
+
+
+def _cv(x):
+    m = x.mean()
+    return float(x.std() / m) if m > 0 else 0.0
+
+
+def _nanmedian(x):
+    x = x[np.isfinite(x)]
+    return float(np.median(x)) if len(x) else 0.0
+
+
+def interval_features(iv, tr, t0_mono=None):
+    """IV_FEATURES from the interval columns and the (data flow of the) ss trace."""
+    keep = (np.asarray(iv["omitted"]) == 0) & (np.asarray(iv["t_end"]) > np.asarray(iv["t_start"]))
+    iv = {c: np.asarray(v, dtype=np.float64)[keep] for c, v in iv.items()}
+    if len(iv["t_end"]) < 2:
+        return None
+    tp = iv["tp_mbps"]
+    seconds = iv["t_end"] - iv["t_start"]
+    cwnd = iv["snd_cwnd"]
+    rtt = iv["rtt_ms"]
+    feats = {
+        "iv_tp_mean": tp.mean(), "iv_tp_cv": _cv(tp),
+        "iv_tp_p10": np.percentile(tp, 10), "iv_tp_p90": np.percentile(tp, 90),
+        "iv_retrans_per_s": np.nansum(iv["retransmits"]) / seconds.sum(),
+        "iv_rtt_p50_ms": _nanmedian(rtt), "iv_rtt_p90_ms": float(np.nanpercentile(rtt, 90)),
+        "iv_rttvar_p50_ms": _nanmedian(iv["rttvar_ms"]),
+        "iv_cwnd_p50_bytes": _nanmedian(cwnd), "iv_cwnd_cv": _cv(cwnd[np.isfinite(cwnd)]),
+    }
+    # Bytes in flight implied by the mean rate over the cwnd: ~1 when
+    # cwnd-limited, lower when pacing or the application holds the flow back.
+    # Per-interval rates are bursty (many 0-byte intervals), so whole-run means
+    rate = np.nansum(iv["bytes"]) / seconds.sum()
+    cwnd_p50 = feats["iv_cwnd_p50_bytes"]
+    feats["iv_delivery_ratio"] = rate * feats["iv_rtt_p50_ms"] / 1e3 / cwnd_p50 if cwnd_p50 > 0 else 0.0
+
+    ss = join_ss(iv, tr, t0_mono)
+    ss_cwnd = ss["cwnd"] * ss["mss"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ss_rate = ss_cwnd * 8 / (ss["rtt_ms"] / 1e3) / 1e6
+        pacing = np.nanmean(ss["pacing_mbps"]) if np.isfinite(ss["pacing_mbps"]).any() else 0.0
+        feats["jn_tp_over_pacing"] = tp.mean() / pacing if pacing > 0 else 0.0
+        feats["jn_cwnd_ratio"] = _nanmedian(ss_cwnd / np.where(cwnd > 0, cwnd, np.nan))
+    feats["jn_rtt_diff_ms"] = _nanmedian(ss["rtt_ms"] - rtt)
+    both = np.isfinite(ss_rate) & np.isfinite(tp)
+    if both.sum() >= 3 and tp[both].std() > 0 and ss_rate[both].std() > 0:
+        feats["jn_tp_rate_corr"] = float(np.corrcoef(tp[both], ss_rate[both])[0, 1])
+    else:
+        feats["jn_tp_rate_corr"] = 0.0
+    return {k: float(v) for k, v in feats.items()}
+
+
+def extract(ss_path, json_path):
+    """Aligned intervals + ss trace -> interval_features, warning (not raising) on bad files."""
+    from . import align
+
+    try:
+        tr, iv, off = align.load_run(ss_path, json_path)
+        if len(tr["monotonic"]) == 0:
+            return None
+        return interval_features(iv, tr, off["t0_mono"])
+    except Exception as e:
+        print(f"[warn] interval features failed for {json_path}: {e}")
+        return None
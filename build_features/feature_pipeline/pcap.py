@@ -0,0 +1,556 @@
+"""
+Per-flow features from packet captures, for when only a capture of the
+traffic is available and not ss samples from the sending host.
+
+Reading: pcap (either byte order, µs or ns timestamps) and pcapng (EPB
+blocks, per-interface link type and timestamp resolution) are read in
+chunks of `chunk` bytes. The only per-packet Python work is walking the
+record lengths to find where each record starts. Headers are then gathered
+from the chunk with NumPy fancy indexing: Ethernet (one VLAN tag), Linux
+cooked v1/v2, raw IP and BSD loopback link layers, IPv4 and IPv6 (no
+extension headers), TCP. Each TCP packet becomes one row of PKT_DTYPE, about
+30 bytes. Endpoints (address, port) are interned to small ids, so a capture of
+N packets costs about 30 * N bytes of memory whatever the snap length.
+
+Reconstruction (one flow at a time, vectorized over its packets): the
+sender is the side that sent the most payload. Sequence and ack numbers are
+made relative to its first sequence number and unwrapped past 2^32.
+  - retransmits : data segments starting below the highest byte already sent
+                  (retrans_total counts their bytes, as bytes_retrans in ss)
+  - RTT         : for each ack that advances the cumulative ack, its time
+                  minus the send time of the newest segment it covers (Karn:
+                  not when that range was retransmitted), smoothed into
+                  srtt / rttvar like the kernel (1/8, 1/4)
+  - in flight   : highest byte sent minus the cumulative ack at each send
+
+flow_trace() samples that state every `interval` seconds into the columns
+of an ss trace (timeseries.TRACE_COLS): cwnd is the largest flight in the
+last srtt (over mss), pacing_mbps the bytes sent in the last srtt over
+srtt, i.e. the observed send rate rather than the kernel's pacing_rate.
+flow_features() gives the build_features columns from it: the ss_* of
+the last row (sources._ss_row_features), ip_tp_mbps from the acked bytes
+over the flow lifetime and ip_mean_rtt_ms from the mean of the sampled srtt
+(as iperf3 computes it), and the ts_* statistics over the whole trace.
+"""
+import ipaddress
+import struct
+import sys
+
+import numpy as np
+
+from .registry import BASE_FEATURES
+from .sources import _ss_row_features
+from .timeseries import TRACE_COLS, TS_FEATURES, trace_features
+
+PKT_DTYPE = np.dtype([
+    ("t", "<f8"),           # capture time (s)
+    ("src", "<u4"),         # endpoint ids (see Capture.endpoints)
+    ("dst", "<u4"),
+    ("seq", "<u4"),
+    ("ack", "<u4"),
+    ("payload", "<u4"),     # TCP payload bytes (from the IP length, not the snap length)
+    ("flags", "u1"),
+    ("hlen", "u1"),         # TCP header length (bytes)
+    ("mss", "<u2"),         # MSS option of SYNs (0 otherwise)
+])
+
+FIN, SYN, RST, PSH, ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+# Link type -> offset of the network header (None: read from the frame)
+LINK_ETHERNET = 1
+LINK_OFFSETS = {LINK_ETHERNET: None, 113: 16, 276: 20, 101: 0, 228: 0, 229: 0, 12: 0, 14: 0, 0: 4, 108: 4}
+PROTO_FIELD = {113: 14, 276: 0}   # cooked captures: ethertype field
+
+PCAP_MAGIC = {b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+              b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9)}
+PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+PCAPNG_IDB, PCAPNG_EPB = 1, 6
+
+
+# ====== Vectorized field access on a chunk ======
+def _u8(b, i):
+    return b[i].astype(np.uint32)
+
+
+def _be16(b, i):
+    return (_u8(b, i) << 8) | _u8(b, i + 1)
+
+
+def _be32(b, i):
+    return (_be16(b, i) << 16) | _be16(b, i + 2)
+
+
+def _u32(b, i, order):
+    if order == ">":
+        return _be32(b, i)
+    return _u8(b, i) | (_u8(b, i + 1) << 8) | (_u8(b, i + 2) << 16) | (_u8(b, i + 3) << 24)
+
+
+def _be64(b, i):
+    return (_be32(b, i).astype(np.uint64) << np.uint64(32)) | _be32(b, i + 4).astype(np.uint64)
+
+
+def decode_frames(b, data, caplen, link, t):
+    """
+    TCP header fields of the frames starting at `data` (int64 offsets into
+    the uint8 array b) with link types `link`. Returns (indices of the TCP frames,
+    src key, dst key, fields), where the keys are (hi, lo, port) uint64
+    triplets of the kept frames.
+    """
+    n = len(data)
+    end = data + caplen
+    last = len(b) - 1
+    at = lambda i: np.minimum(i, last)  # noqa: E731 - gathers stay inside the chunk; rows are masked after
+
+    l3 = np.zeros(n, dtype=np.int64)
+    ethertype = np.zeros(n, dtype=np.uint32)
+    known = np.zeros(n, dtype=bool)
+    for lt in np.unique(link).tolist():
+        sel = link == lt
+        if lt == LINK_ETHERNET:
+            et = _be16(b, at(data + 12))
+            vlan = (et == 0x8100) | (et == 0x88A8)
+            et = np.where(vlan, _be16(b, at(data + 16)), et)
+            l3[sel] = (data + np.where(vlan, 18, 14))[sel]
+            ethertype[sel] = et[sel]
+            known |= sel
+        elif lt in LINK_OFFSETS:
+            l3[sel] = data[sel] + LINK_OFFSETS[lt]
+            if lt in PROTO_FIELD:
+                ethertype[sel] = _be16(b, at(data + PROTO_FIELD[lt]))[sel]
+            else:
+                ethertype[sel] = np.where(_u8(b, at(l3))[sel] >> 4 == 6, 0x86DD, 0x0800)
+            known |= sel
+    v4 = known & (ethertype == 0x0800) & (_u8(b, at(l3)) >> 4 == 4) & (l3 + 20 <= end)
+    v6 = known & (ethertype == 0x86DD) & (_u8(b, at(l3)) >> 4 == 6) & (l3 + 40 <= end)
+    ihl = (_u8(b, at(l3)) & 0xF).astype(np.int64) * 4
+    proto = np.where(v4, _u8(b, at(l3 + 9)), _u8(b, at(l3 + 6)))
+    # Fragments other than the first carry no TCP header
+    frag = v4 & ((_be16(b, at(l3 + 6)) & 0x1FFF) != 0)
+    tcp = (v4 | v6) & (proto == 6) & ~frag
+    l4 = np.where(v4, l3 + ihl, l3 + 40)
+    tcp &= l4 + 20 <= end
+
+    keep = np.flatnonzero(tcp)
+    l3, l4, v4 = l3[keep], l4[keep], v4[keep]
+    ip_len = np.where(v4, _be16(b, at(l3 + 2)).astype(np.int64) - (l4 - l3),
+                      _be16(b, at(l3 + 4)).astype(np.int64))
+    hlen = (_u8(b, at(l4 + 12)) >> 4).astype(np.int64) * 4
+    flags = _u8(b, at(l4 + 13))
+    has_mss = ((flags & SYN) != 0) & (hlen >= 24) & (_u8(b, at(l4 + 20)) == 2) & (l4 + 24 <= end[keep])
+
+    zero = np.zeros(len(keep), dtype=np.uint64)
+    src_hi = np.where(v4, zero, _be64(b, at(l3 + 8)))
+    src_lo = np.where(v4, _be32(b, at(l3 + 12)).astype(np.uint64), _be64(b, at(l3 + 16)))
+    dst_hi = np.where(v4, zero, _be64(b, at(l3 + 24)))
+    dst_lo = np.where(v4, _be32(b, at(l3 + 16)).astype(np.uint64), _be64(b, at(l3 + 32)))
+    fields = {
+        "t": t[keep],
+        "seq": _be32(b, at(l4 + 4)), "ack": _be32(b, at(l4 + 8)),
+        # IPv4 length 0 is TSO on the capturing host: fall back to the frame
+        "payload": np.maximum(np.where(ip_len > 0, ip_len, (end[keep] - l4)) - hlen, 0),
+        "flags": flags, "hlen": hlen, "mss": np.where(has_mss, _be16(b, at(l4 + 22)), 0),
+    }
+    v6_flag = (~v4).astype(np.uint64)
+    src = (src_hi, src_lo, _be16(b, at(l4)).astype(np.uint64) | (v6_flag << np.uint64(16)))
+    dst = (dst_hi, dst_lo, _be16(b, at(l4 + 2)).astype(np.uint64) | (v6_flag << np.uint64(16)))
+    return keep, src, dst, fields
+
+
+# ====== Record walking (the only per-packet Python loop) ======
+def _walk_pcap(buf, start, order):
+    """Offsets of the complete pcap records in buf[start:] and the end of the last one."""
+    incl = struct.Struct(order + "I").unpack_from
+    offs = []
+    add = offs.append
+    off, end = start, len(buf)
+    while off + 16 <= end:
+        nxt = off + 16 + incl(buf, off + 8)[0]
+        if nxt > end:
+            break
+        add(off)
+        off = nxt
+    return np.array(offs, dtype=np.int64), off
+
+
+def _walk_pcapng(buf, start, order):
+    """(offsets, block types) of the complete pcapng blocks in buf[start:], and the end."""
+    hdr = struct.Struct(order + "II").unpack_from
+    offs, types = [], []
+    add, add_type = offs.append, types.append
+    off, end = start, len(buf)
+    while off + 12 <= end:
+        if buf[off:off + 4] == PCAPNG_SHB:
+            break   # new section (maybe another byte order): let the caller re-read its header
+        btype, blen = hdr(buf, off)
+        if blen < 12 or off + blen > end:
+            break
+        add(off)
+        add_type(btype)
+        off += blen
+    return np.array(offs, dtype=np.int64), np.array(types, dtype=np.int64), off
+
+
+class Capture:
+    """
+    Streaming reader of one capture file. iter_chunks() yields PKT_DTYPE
+    arrays; endpoint ids index self.endpoints ((hi, lo, port) tuples, see
+    endpoint_str()). Counters: packets (all records), tcp_packets, bytes.
+    """
+
+    def __init__(self, path, chunk=1 << 24, ports=None):
+        self.path = path
+        self.chunk = chunk
+        self.ports = set(ports) if ports else None
+        self.endpoints = []
+        self._ids = {}
+        self.packets = 0
+        self.tcp_packets = 0
+        self.bytes = 0
+
+    def _intern(self, key):
+        """Endpoint ids of the (hi, lo, port) key arrays; one dict lookup per distinct endpoint."""
+        hi, lo, port = key
+        ids = np.empty(len(lo), dtype=np.uint32)
+        # IPv4 endpoints pack into one uint64 (a 1-D unique sorts far faster than rows)
+        v4 = port >> np.uint64(16) == 0
+        packed = (lo[v4] << np.uint64(16)) | port[v4]
+        uniq, inv = np.unique(packed, return_inverse=True)
+        ids[v4] = self._lookup([(0, k >> 16, k & 0xFFFF) for k in uniq.tolist()])[inv]
+        if not v4.all():
+            v6 = ~v4
+            uniq, inv = np.unique(np.stack([hi[v6], lo[v6], port[v6]], axis=1), axis=0, return_inverse=True)
+            ids[v6] = self._lookup(list(map(tuple, uniq.tolist())))[inv.ravel()]
+        return ids
+
+    def _lookup(self, rows):
+        ids = np.empty(len(rows), dtype=np.uint32)
+        for i, row in enumerate(rows):
+            eid = self._ids.get(row)
+            if eid is None:
+                eid = self._ids[row] = len(self.endpoints)
+                self.endpoints.append(row)
+            ids[i] = eid
+        return ids
+
+    def _packets(self, b, data, caplen, link, t):
+        keep, src, dst, fields = decode_frames(b, data, caplen, link, t)
+        out = np.empty(len(keep), dtype=PKT_DTYPE)
+        for c, v in fields.items():
+            out[c] = v
+        out["src"] = self._intern(src)
+        out["dst"] = self._intern(dst)
+        if self.ports is not None and len(out):
+            port = np.array([p & 0xFFFF for _, _, p in self.endpoints], dtype=np.int64)
+            wanted = np.isin(port, list(self.ports))
+            out = out[wanted[out["src"]] | wanted[out["dst"]]]
+        self.tcp_packets += len(out)
+        return out
+
+    def iter_chunks(self):
+        with open(self.path, "rb") as f:
+            head = f.read(4)
+            f.seek(0)
+            if head in PCAP_MAGIC:
+                yield from self._iter_pcap(f)
+            elif head == PCAPNG_SHB:
+                yield from self._iter_pcapng(f)
+            else:
+                raise ValueError(f"{self.path}: not a pcap or pcapng file")
+
+    def _iter_pcap(self, f):
+        header = f.read(24)
+        order, unit = PCAP_MAGIC[header[:4]]
+        link = struct.unpack(order + "I", header[20:24])[0] & 0xFFFF
+        self.bytes += 24
+        buf = b""
+        while True:
+            data = f.read(self.chunk)
+            buf = buf + data if buf else data
+            if not buf:
+                return
+            offs, end = _walk_pcap(buf, 0, order)
+            if len(offs):
+                b = np.frombuffer(buf, dtype=np.uint8)
+                sec = _u32(b, offs, order).astype(np.float64)
+                frac = _u32(b, offs + 4, order).astype(np.float64)
+                caplen = _u32(b, offs + 8, order).astype(np.int64)
+                self.packets += len(offs)
+                self.bytes += end
+                yield self._packets(b, offs + 16, caplen, np.full(len(offs), link), sec + frac * unit)
+            buf = buf[end:]
+            if not data:
+                if buf:
+                    print(f"[warn] {self.path}: {len(buf)} trailing bytes (truncated record)", file=sys.stderr)
+                return
+
+    def _iter_pcapng(self, f):
+        order, links, units = "<", [], []
+        buf = b""
+        while True:
+            data = f.read(self.chunk)
+            buf = buf + data if buf else data
+            if not buf:
+                return
+            pos = 0
+            while True:
+                if buf[pos:pos + 4] == PCAPNG_SHB:
+                    if len(buf) < pos + 12:
+                        break
+                    order = "<" if buf[pos + 8:pos + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+                    blen = struct.unpack_from(order + "I", buf, pos + 4)[0]
+                    if pos + blen > len(buf):
+                        break
+                    links, units = [], []    # interface ids restart with each section
+                    self.bytes += blen
+                    pos += blen
+                    continue
+                offs, types, end = _walk_pcapng(buf, pos, order)
+                if not len(offs):
+                    break
+                for o in offs[types == PCAPNG_IDB].tolist():
+                    links.append(struct.unpack_from(order + "H", buf, o + 8)[0])
+                    units.append(_if_tsresol(buf, o, order))
+                epb = offs[types == PCAPNG_EPB]
+                if len(epb):
+                    b = np.frombuffer(buf, dtype=np.uint8)
+                    iface = _u32(b, epb + 8, order).astype(np.int64)
+                    ticks = ((_u32(b, epb + 12, order).astype(np.uint64) << np.uint64(32))
+                             | _u32(b, epb + 16, order).astype(np.uint64))
+                    t = ticks.astype(np.float64) * np.asarray(units)[iface]
+                    caplen = _u32(b, epb + 20, order).astype(np.int64)
+                    self.packets += len(epb)
+                    yield self._packets(b, epb + 28, caplen, np.asarray(links)[iface], t)
+                self.bytes += end - pos
+                pos = end
+            buf = buf[pos:]
+            if not data:
+                if buf:
+                    print(f"[warn] {self.path}: {len(buf)} trailing bytes (truncated block)", file=sys.stderr)
+                return
+
+    def read(self):
+        """All TCP packets of the capture as one PKT_DTYPE array."""
+        parts = list(self.iter_chunks())
+        return np.concatenate(parts) if parts else np.empty(0, dtype=PKT_DTYPE)
+
+    def endpoint_str(self, eid):
+        hi, lo, port = self.endpoints[eid]
+        if port >> 16:
+            addr = ipaddress.IPv6Address((hi << 64) | lo)
+            return f"[{addr}]:{port & 0xFFFF}"
+        return f"{ipaddress.IPv4Address(lo)}:{port}"
+
+
+def _if_tsresol(buf, off, order):
+    """Seconds per timestamp tick of an interface description block (if_tsresol, default µs)."""
+    blen = struct.unpack_from(order + "I", buf, off + 4)[0]
+    pos, end = off + 16, off + blen - 4
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(order + "HH", buf, pos)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            v = buf[pos + 4]
+            return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+        pos += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+# ====== Flows ======
+def split_flows(pk):
+    """[(a, b, indices)] per TCP connection (endpoint ids a < b), packets in time order."""
+    a = np.minimum(pk["src"], pk["dst"]).astype(np.uint64)
+    b = np.maximum(pk["src"], pk["dst"]).astype(np.uint64)
+    pair = (a << np.uint64(32)) | b
+    order = np.lexsort((pk["t"], pair))
+    pair = pair[order]
+    starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+    ends = np.r_[starts[1:], len(pair)]
+    return [(int(pair[s] >> np.uint64(32)), int(pair[s] & np.uint64(0xFFFFFFFF)), order[s:e])
+            for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def _rel(x, base):
+    """Sequence numbers relative to base, unwrapped past 2^32 (in capture order)."""
+    r = ((x.astype(np.int64) - int(base) + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    if len(r) > 1 and np.abs(np.diff(r)).max() > (1 << 31):
+        r = np.unwrap(r.astype(np.float64), period=float(1 << 32)).astype(np.int64)
+    return r
+
+
+def _ewma(x, alpha, first):
+    """y[i] = (1 - alpha) y[i-1] + alpha x[i], y[-1] = first; closed form per block of 256."""
+    y = np.empty(len(x))
+    prev = first
+    k = 1.0 - alpha
+    for s in range(0, len(x), 256):
+        xs = x[s:s + 256]
+        p = k ** np.arange(1, len(xs) + 1)
+        y[s:s + 256] = p * (prev + np.cumsum(alpha * xs / p))
+        prev = y[s + len(xs) - 1]
+    return y
+
+
+def reconstruct(pk, sender=None):
+    """
+    Sender-side state of one connection (packets of split_flows, time
+    order). Returns None when the flow carries no data.
+    """
+    src = pk["src"]
+    payload = pk["payload"].astype(np.int64)
+    if sender is None:
+        ids = np.unique(src)
+        sent = [payload[src == i].sum() for i in ids]
+        sender = int(ids[int(np.argmax(sent))])
+    d = src == sender
+    if not (d & (payload > 0)).any():
+        return None
+    syn = d & ((pk["flags"] & SYN) != 0)
+    base = pk["seq"][syn][0] if syn.any() else pk["seq"][d][0]
+    seq = _rel(pk["seq"][d], base)
+    dpay = payload[d]
+    data = dpay > 0
+    t_d = pk["t"][d][data]
+    s_d = seq[data]
+    e_d = s_d + dpay[data]
+    hi = np.maximum.accumulate(e_d)
+    prev_hi = np.r_[s_d[0], hi[:-1]]
+    retrans = s_d < prev_hi
+    # Acked bytes count from the SYN, as tcpi_bytes_acked does (from the first seen byte without one)
+    start = 0
+
+    ma = ~d & ((pk["flags"] & ACK) != 0)
+    t_a = pk["t"][ma]
+    a = _rel(pk["ack"][ma], base)
+    cum = np.maximum.accumulate(a) if len(a) else a
+    prev_cum = np.r_[start, cum[:-1]] if len(a) else a
+    adv = a > prev_cum
+
+    # RTT: newest new segment covered by each advancing ack (Karn: skip retransmitted ranges)
+    new = ~retrans
+    t_new, e_new = t_d[new], e_d[new]
+    r_e = np.sort(e_d[retrans])
+    t_adv, a_adv, p_adv = t_a[adv], a[adv], prev_cum[adv]
+    i = np.searchsorted(e_new, a_adv, side="right") - 1
+    ok = i >= 0
+    i = np.maximum(i, 0)
+    ok &= (e_new[i] > p_adv) & (t_new[i] <= t_adv)
+    ok &= np.searchsorted(r_e, a_adv, side="right") == np.searchsorted(r_e, p_adv, side="right")
+    t_rtt = t_adv[ok]
+    rtt = t_adv[ok] - t_new[i[ok]]
+
+    j = np.searchsorted(t_a, t_d, side="right") - 1
+    una = np.where(j >= 0, cum[np.maximum(j, 0)] if len(cum) else start, start)
+    flight = hi - una
+
+    # Sender mss: the peer's MSS option less the sender's TCP options, else the common segment size
+    peer_mss = pk["mss"][~d & ((pk["flags"] & SYN) != 0)]
+    opts = int(np.median(pk["hlen"][d][data])) - 20
+    if len(peer_mss) and peer_mss[0]:
+        mss = int(peer_mss[0]) - opts
+    else:
+        mss = int(np.bincount(dpay[data]).argmax())
+    return {
+        "sender": sender, "mss": max(mss, 1), "start": start,
+        "t_first": float(pk["t"][0]), "t_last": float(pk["t"][-1]),
+        "t_d": t_d, "payload": dpay[data], "retrans": retrans, "flight": flight,
+        "t_a": t_a, "cum": cum, "t_rtt": t_rtt, "rtt": rtt,
+        "srtt": _ewma(rtt, 1 / 8, rtt[0]) if len(rtt) else rtt,
+        "packets": len(pk),
+    }
+
+
+def _rttvar(rec):
+    rtt, srtt = rec["rtt"], rec["srtt"]
+    if not len(rtt):
+        return rtt
+    err = np.abs(rtt - np.r_[rtt[0], srtt[:-1]])
+    return _ewma(err, 1 / 4, rtt[0] / 2)
+
+
+def flow_trace(rec, interval=0.5):
+    """{column: array} of timeseries.TRACE_COLS, sampled every `interval` s like collect_ss.py."""
+    if not len(rec["rtt"]):
+        return None
+    t = rec["t_first"] + interval * np.arange(1, int((rec["t_last"] - rec["t_first"]) / interval) + 1)
+    if not len(t):
+        t = np.array([rec["t_last"]])
+    mss = rec["mss"]
+    # srtt / rttvar: last sample at or before t (the first one before any sample)
+    k = np.maximum(np.searchsorted(rec["t_rtt"], t, side="right") - 1, 0)
+    srtt = rec["srtt"][k]
+    rttvar = _rttvar(rec)[k]
+
+    t_d = rec["t_d"]
+    i1 = np.searchsorted(t_d, t, side="right")
+    i0 = np.searchsorted(t_d, t - srtt, side="right")
+    # Largest flight in (t - srtt, t]: maximum.reduceat over interleaved window bounds
+    flight = rec["flight"]
+    bounds = np.minimum(np.stack([i0, i1], axis=1).ravel(), len(flight) - 1)
+    win_max = np.maximum.reduceat(flight, bounds)[::2]
+    last = flight[np.maximum(i1 - 1, 0)]
+    cwnd_bytes = np.where(i1 > i0, np.maximum(win_max, last), last)
+    sent = np.r_[0, np.cumsum(rec["payload"])]
+    rate = (sent[i1] - sent[i0]) / srtt
+
+    j = np.searchsorted(rec["t_a"], t, side="right") - 1
+    acked = np.where(j >= 0, rec["cum"][np.maximum(j, 0)] - rec["start"], 0) if len(rec["cum"]) else 0 * t
+    # Retransmitted bytes, like bytes_retrans of the ss logs
+    rbytes = np.r_[0, np.cumsum(np.where(rec["retrans"], rec["payload"], 0))]
+    retrans = rbytes[i1]
+    return {
+        "monotonic": t,
+        "rtt_ms": srtt * 1e3,
+        "rtt_var_ms": rttvar * 1e3,
+        "cwnd": np.maximum(np.round(cwnd_bytes / mss), 1).astype(np.float64),
+        "mss": np.full(len(t), float(mss)),
+        "pacing_mbps": rate * 8 / 1e6,
+        "bytes_acked": np.maximum(acked, 0).astype(np.float64),
+        "bytes_sent": sent[i1].astype(np.float64),
+        "retrans_total": retrans.astype(np.float64),
+    }
+
+
+def flow_features(tr, rec, names=None):
+    """build_features columns of one reconstructed flow (BASE_FEATURES by default), or None."""
+    names = names or BASE_FEATURES
+    last = {c: float(tr[c][-1]) for c in TRACE_COLS}
+    out = dict(_ss_row_features(last))
+    duration = rec["t_last"] - rec["t_first"]
+    out["ip_tp_mbps"] = last["bytes_acked"] * 8 / duration / 1e6 if duration > 0 else 0.0
+    out["ip_mean_rtt_ms"] = float(np.mean(tr["rtt_ms"]))
+    if any(n in TS_FEATURES for n in names):
+        ts = trace_features(tr)
+        if ts is None:
+            return None   # too short for the trace statistics, like build_features drops it
+        out.update(ts)
+    missing = [n for n in names if n not in out]
+    if missing:
+        raise KeyError(f"not available from a capture: {', '.join(missing)}")
+    return {n: out[n] for n in names}
+
+
+def capture_features(path, names=None, interval=0.5, min_bytes=0, ports=None, chunk=1 << 24):
+    """
+    [(flow dict, {feature: value})] for every connection of a capture that
+    acked at least min_bytes, and the Capture (packet/byte counters).
+    """
+    cap = Capture(path, chunk, ports)
+    pk = cap.read()
+    out = []
+    for a, b, idx in split_flows(pk):
+        rec = reconstruct(pk[idx])
+        if rec is None:
+            continue
+        tr = flow_trace(rec, interval)
+        if tr is None or tr["bytes_acked"][-1] < min_bytes:
+            continue
+        peer = b if rec["sender"] == a else a
+        flow = {"src": cap.endpoint_str(rec["sender"]), "dst": cap.endpoint_str(peer),
+                "packets": rec["packets"], "bytes_acked": int(tr["bytes_acked"][-1]),
+                "duration_s": rec["t_last"] - rec["t_first"], "samples": len(tr["monotonic"])}
+        feats = flow_features(tr, rec, names)
+        if feats is not None:
+            out.append((flow, feats))
+    return out, cap
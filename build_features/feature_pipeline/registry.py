@@ -0,0 +1,135 @@
+"""
+Declarative feature registry with lazy, per-run evaluation.
+
+A feature is a (name, source) pair plus an optional function of the source's
+output. A source is a loader over one run (ss log tail, iperf3 "end" object,
+full ss trace, ...). Computing a set of features only runs the sources those
+features need, each at most once per run, so asking for the six columns of
+the current model never touches the full trace.
+
+Adding a feature:
+    register_feature("ss_cwnd_pkts", "ss_last", lambda d: d["ss_cwnd_bytes"] / 1460)
+
+Adding a source:
+    @register_source("my_source")
+    def load_my_source(run, params): ...
+"""
+from . import intervals, sources, timeseries
+
+SOURCES = {}    # name -> loader(run, params) -> dict or None
+FEATURES = {}   # name -> Feature
+SOURCES_LOADED = {}  # name -> number of loads in this process (for checks)
+
+# The columns of the committed CSVs (and of rf_congctrl.pkl)
+BASE_FEATURES = [
+    "ss_rtt_ms", "ss_rtt_var_ms",
+    "ss_cwnd_bytes",
+    "ss_pacing_mbps",
+    "ip_tp_mbps",
+    "ip_mean_rtt_ms",
+]
+TS_FEATURES = list(timeseries.TS_FEATURES)
+IV_FEATURES = list(intervals.IV_FEATURES)
+
+
+class Feature:
+    def __init__(self, name, source, fn=None, doc=""):
+        self.name = name
+        self.source = source
+        self.fn = fn
+        self.doc = doc
+
+    def value(self, data):
+        if self.fn is None:
+            return data[self.name]
+        return self.fn(data)
+
+
+def register_source(name):
+    def deco(loader):
+        SOURCES[name] = loader
+        return loader
+    return deco
+
+
+def register_feature(name, source, fn=None, doc=""):
+    FEATURES[name] = Feature(name, source, fn, doc)
+
+
+class Run:
+    """
+    One (ss log, iperf3 JSON) pair. Source outputs are memoized, so several
+    features reading the same source cost one load.
+    """
+
+    def __init__(self, key, ss_path, json_path, params=None):
+        self.key = key
+        self.ss_path = ss_path
+        self.json_path = json_path
+        self.params = params or {}
+        self._cache = {}
+
+    def get(self, source):
+        if source not in self._cache:
+            SOURCES_LOADED[source] = SOURCES_LOADED.get(source, 0) + 1
+            self._cache[source] = SOURCES[source](self, self.params)
+        return self._cache[source]
+
+
+def sources_for(names):
+    """Sources needed to compute the given features (in first-use order)."""
+    needed = []
+    for name in names:
+        src = FEATURES[name].source
+        if src not in needed:
+            needed.append(src)
+    return needed
+
+
+def compute(run, names):
+    """
+    Evaluate features `names` on `run`.
+    Returns {name: value}, or None if a needed source failed.
+    """
+    out = {}
+    for name in names:
+        feat = FEATURES[name]
+        data = run.get(feat.source)
+        if data is None:
+            return None
+        out[name] = feat.value(data)
+    return out
+
+
+# ====== Sources ======
+@register_source("ss_last")
+def _load_ss_last(run, params):
+    return sources.parse_ss_last_line(run.ss_path)
+
+
+@register_source("iperf_end")
+def _load_iperf_end(run, params):
+    return sources.parse_json(run.json_path)
+
+
+@register_source("ss_trace")
+def _load_ss_trace(run, params):
+    return timeseries.extract(run.ss_path, params.get("ts_window", 1.0), params.get("ts_max_points"))
+
+
+@register_source("iperf_intervals")
+def _load_iperf_intervals(run, params):
+    return intervals.extract(run.ss_path, run.json_path)
+
+
+# ====== Features ======
+register_feature("ss_rtt_ms", "ss_last", doc="RTT of the last ss sample (ms)")
+register_feature("ss_rtt_var_ms", "ss_last", doc="RTT variance of the last ss sample (ms)")
+register_feature("ss_cwnd_bytes", "ss_last", doc="last cwnd * mss (bytes)")
+register_feature("ss_pacing_mbps", "ss_last", doc="last pacing rate (Mbps)")
+register_feature("ip_tp_mbps", "iperf_end", doc="iperf3 sender throughput (Mbps)")
+register_feature("ip_mean_rtt_ms", "iperf_end", doc="iperf3 sender mean RTT (ms)")
+for _name in TS_FEATURES:
+    register_feature(_name, "ss_trace", doc="time-series statistic over the whole ss trace")
+for _name in IV_FEATURES:
+    register_feature(_name, "iperf_intervals", doc="iperf3 interval series, joined with the ss trace on time")
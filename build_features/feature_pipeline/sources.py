@@ -0,0 +1,265 @@
+"""
+Raw inputs of one run: the filename, the ss log and the iperf3 JSON.
+
+Each loader reads as little as possible (file tails, one record) and
+returns a small dict, or None with a warning when the file is unusable.
+"""
+import json
+import os
+import re
+
+# Filename format: algo_rtt{num}_bw{num}_run{num}
+# Example: bbr_rtt200_bw500_run5.log / .json
+NAME_RE = re.compile(r"(reno|bbr|cubic|vegas)_rtt(\d+)_bw(\d+)_run(\d+)", re.IGNORECASE)
+
+# Text ss log columns before the flow column (collect_ss.py with a FlowTable
+# writes one more, the flow id of the socket)
+N_SS_COLS = 16
+SENT_COL = 10   # bytes_sent
+
+# iperf3 JSON: the top-level "end" is the only "end" key holding an object
+# (per-interval "end" values are numbers), and it sits at the end of the file
+RE_JSON_END = re.compile(r'"end":\s*\{')
+
+
+def parse_name(fname):
+    """Extract algo, rtt_setting, bw_setting, and run index from filename"""
+    m = NAME_RE.search(fname)
+    if not m:
+        return None
+    algo, rtt, bw, run = m.groups()
+    return algo.lower(), int(rtt), int(bw), int(run)
+
+
+def read_tail(path, block=4096):
+    """
+    Yield (tail bytes, reached_start) with a window that grows 4x each time,
+    so callers can stop as soon as the tail holds what they need.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        while True:
+            start = max(0, size - block)
+            f.seek(start)
+            data = f.read(size - start)
+            yield data, start == 0
+            if start == 0:
+                return
+            block *= 4
+
+
+def parse_json(json_path):
+    """
+    Extract the following fields from iperf3 JSON output:
+      - ip_tp_mbps     : bits_per_second converted to Mbps
+      - ip_mean_rtt_ms : mean_rtt (microseconds) converted to milliseconds
+
+    Only the trailing "end" object is decoded: the file is read backwards
+    until it is found, so the ~1600 lines of intervals are never parsed.
+    """
+    try:
+        decoder = json.JSONDecoder()
+        end = None
+        for data, whole in read_tail(json_path, block=8192):
+            text = data.decode("utf-8", errors="replace")
+            matches = list(RE_JSON_END.finditer(text))
+            if matches:
+                try:
+                    end, _ = decoder.raw_decode(text, matches[-1].end() - 1)
+                    break
+                except ValueError:
+                    pass  # cut in the middle of the object, read further back
+            if whole:
+                with open(json_path, "r") as f:
+                    end = json.load(f)["end"]
+
+        sender_end = end["streams"][0]["sender"]
+
+        bits_per_second = float(sender_end["bits_per_second"])
+        tp_mbps = bits_per_second / 1e6
+
+        mean_rtt_us = float(sender_end.get("mean_rtt", 0.0))  # microseconds
+        mean_rtt_ms = mean_rtt_us / 1000.0
+
+        return {
+            "ip_tp_mbps": tp_mbps,
+            "ip_mean_rtt_ms": mean_rtt_ms,
+        }
+    except Exception as e:
+        print(f"[warn] parse_json failed for {json_path}: {e}")
+        return None
+
+
+def read_last_line(path):
+    """Last non-empty line of a text file, found by seeking backwards."""
+    for data, whole in read_tail(path):
+        lines = data.rstrip(b"\r\n").splitlines()
+        # Need a full line: either a newline before it or the file start
+        if len(lines) >= 2 or whole:
+            return lines[-1].decode() if lines else ""
+
+
+def data_flow_id(ss_path):
+    """Flow id of the data connection from the <log>.flows sidecar, or None."""
+    try:
+        with open(ss_path + ".flows") as f:
+            for line in f:
+                flow = json.loads(line)
+                if flow.get("data"):
+                    return flow["flow"]
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def last_data_row(ss_path):
+    """
+    Last row of the data flow in a log with a flow column: the flow named
+    by the sidecar, else the row with the highest bytes_sent in the tail
+    (counters only grow, and the data flow sends the most).
+    """
+    flow = data_flow_id(ss_path)
+    best = None
+    for data, whole in read_tail(ss_path):
+        lines = data.splitlines()
+        if not whole:
+            lines = lines[1:]   # cut in the middle
+        rows = [ln.split() for ln in lines]
+        rows = [r for r in rows if len(r) > N_SS_COLS and r[0] != b"wall_time"]
+        if flow is None:
+            for r in rows:
+                if best is None or int(r[SENT_COL]) >= int(best[SENT_COL]):
+                    best = r
+            break
+        rows = [r for r in rows if int(r[N_SS_COLS]) == flow]
+        if rows:
+            best = rows[-1]
+            break
+    return [c.decode() for c in best] if best else None
+
+
+def parse_ss_last_line(ss_path):
+    """
+    Extract the last record from an ss log.
+    Expected format:
+      wall_time monotonic algo rtt_ms rtt_var_ms cwnd mss pacing_mbps ...
+
+    Convert it into:
+      ss_rtt_ms, ss_rtt_var_ms, ss_cwnd_bytes, ss_pacing_mbps
+
+    Logs with a flow column give the last row of the data flow. Older logs
+    (every matching socket, no id) keep the literal last row, which is what
+    the committed feature CSVs were built from.
+    """
+    try:
+        if ss_path.endswith(".ssb"):
+            return parse_ssb_last_record(ss_path)
+        if ss_path.endswith(".ssz"):
+            return parse_ssz_last_record(ss_path)
+
+        last_line = read_last_line(ss_path)
+        if not last_line or last_line.startswith("wall_time"):
+            # Header only or empty file
+            return None
+
+        last = last_line.split()
+        if len(last) > N_SS_COLS and last[N_SS_COLS] != "0":
+            last = last_data_row(ss_path) or last
+        if len(last) < 8:
+            return None
+
+        ss_rtt_ms = float(last[3])
+        ss_rtt_var_ms = float(last[4])
+        cwnd_segs = int(last[5])
+        mss_bytes = int(last[6])
+        pacing_mbps = float(last[7])
+
+        # Normalize cwnd to bytes
+
+        cwnd_bytes = cwnd_segs * mss_bytes
+
+        return {
+            "ss_rtt_ms": ss_rtt_ms,
+            "ss_rtt_var_ms": ss_rtt_var_ms,
+            "ss_cwnd_bytes": cwnd_bytes,
+            "ss_pacing_mbps": pacing_mbps,
+        }
+    except Exception as e:
+        print(f"[warn] parse_ss_last_line failed for {ss_path}: {e}")
+        return None
+
+
+def parse_ssb_last_record(ss_path):
+    """Same as parse_ss_last_line for a binary .ssb log: read one record."""
+    import ss_binary
+
+    header, offset = ss_binary.read_header(ss_path)
+    cols, record = ss_binary.layout(header)
+    names = [c for c, _ in cols]
+    n = (os.path.getsize(ss_path) - offset) // record.size
+    if n == 0:
+        return None
+    with open(ss_path, "rb") as f:
+        f.seek(offset + (n - 1) * record.size)
+        rec = dict(zip(names, record.unpack(f.read(record.size))))
+    if rec.get("flow"):
+        return _ssb_data_row(ss_path, n)
+    return _ss_row_features(rec)
+
+
+def _ssb_data_row(ss_path, n, block=4096):
+    """parse_ssb_last_record for logs with a flow column: the data flow's last record."""
+    import ss_binary
+
+    _, records = ss_binary.open_ssb(ss_path)
+    flow = data_flow_id(ss_path)
+    stop = n
+    while stop > 0:
+        tail = records[max(0, stop - block):stop]
+        if flow is None:
+            i = len(tail) - 1 - int(tail["bytes_sent"][::-1].argmax())
+        else:
+            hits = (tail["flow"] == flow).nonzero()[0]
+            if not len(hits):
+                stop -= block
+                block *= 4
+                continue
+            i = int(hits[-1])
+        return _ss_row_features(dict(zip(records.dtype.names, tail[i].tolist())))
+    return None
+
+
+def parse_ssz_last_record(ss_path):
+    """
+    Same as parse_ss_last_line for a compressed .ssz log: only the last
+    block is decoded, unless the data flow has no row in it.
+    """
+    import ss_compressed
+
+    _, records = ss_compressed.open_ssz(ss_path, tail=1)
+    if len(records) == 0:
+        return None
+    i = len(records) - 1
+    if records["flow"][i]:
+        flow = data_flow_id(ss_path)
+        if flow is None:
+            i = len(records) - 1 - int(records["bytes_sent"][::-1].argmax())
+        else:
+            hits = (records["flow"] == flow).nonzero()[0]
+            if not len(hits):
+                _, records = ss_compressed.open_ssz(ss_path)
+                hits = (records["flow"] == flow).nonzero()[0]
+                if not len(hits):
+                    return None
+            i = int(hits[-1])
+    return _ss_row_features(dict(zip(records.dtype.names, records[i].tolist())))
+
+
+def _ss_row_features(rec):
+    return {
+        "ss_rtt_ms": rec["rtt_ms"],
+        "ss_rtt_var_ms": rec["rtt_var_ms"],
+        "ss_cwnd_bytes": rec["cwnd"] * rec["mss"],
+        "ss_pacing_mbps": rec["pacing_mbps"],
+    }
@@ -0,0 +1,270 @@
+"""
+Time-series features over full ss traces.
+
+parse_ss_last_line() (sources.py) only keeps the final sample; the
+dynamics over the flow (cwnd sawtooth, pacing oscillation, RTT inflation,
+goodput stability) are what separate reno / cubic / vegas / bbr. This module
+loads a whole trace into NumPy arrays and computes per-flow statistics:
+
+  - percentiles of rtt, rtt_var, cwnd (bytes) and pacing rate
+  - linear slopes of cwnd and rtt over time
+  - cwnd sawtooth: multiplicative-decrease rate and mean period between drops
+  - pacing spectrum: dominant oscillation frequency and its power share
+  - retransmit rate (retransmitted / sent bytes)
+  - goodput per window from bytes_acked deltas (mean / std / p90)
+"""
+import numpy as np
+
+TS_FEATURES = [
+    "ts_rtt_p10", "ts_rtt_p50", "ts_rtt_p90",
+    "ts_rttvar_p50", "ts_rttvar_p90",
+    "ts_cwnd_p10", "ts_cwnd_p50", "ts_cwnd_p90",
+    "ts_pacing_p10", "ts_pacing_p50", "ts_pacing_p90",
+    "ts_rtt_inflation",
+    "ts_cwnd_slope", "ts_rtt_slope",
+    "ts_cwnd_drop_rate", "ts_cwnd_saw_period_s",
+    "ts_pacing_peak_hz", "ts_pacing_peak_frac",
+    "ts_retrans_rate",
+    "ts_goodput_mean", "ts_goodput_std", "ts_goodput_p90",
+]
+
+# Columns read from an ss log
+TRACE_COLS = [
+    "monotonic", "rtt_ms", "rtt_var_ms", "cwnd", "mss", "pacing_mbps",
+    "bytes_acked", "bytes_sent", "retrans_total",
+]
+
+# collect_ss.py text header, used when a log has no header line
+SS_COLS = [
+    "wall_time", "monotonic", "algo",
+    "rtt_ms", "rtt_var_ms",
+    "cwnd", "mss", "pacing_mbps",
+    "ssthresh",
+    "bytes_acked", "bytes_sent", "bytes_received",
+    "segs_out", "segs_in", "unacked", "retrans_total",
+]
+
+# A drop of cwnd below this fraction of the previous sample counts as a
+# multiplicative decrease (reno halves, cubic keeps 0.7)
+DROP_RATIO = 0.8
+
+
+def load_trace(path, cols=TRACE_COLS):
+    """
+    Read columns of an ss log (.log text, .ssb or .ssz binary) into
+    {column: ndarray}, plus the flow id column when the log has one.
+    """
+    if path.endswith((".ssb", ".ssz")):
+        import ss_binary
+
+        _, records = ss_binary.open_records(path)
+        if "flow" in records.dtype.names and "flow" not in cols:
+            cols = list(cols) + ["flow"]
+        return {c: np.asarray(records[c], dtype=np.float64) for c in cols}
+
+    # Tokenize the whole file once, slice the wanted columns out of the
+    # token list and let NumPy parse them in a single call (several times
+    # faster than pandas.read_csv for these small files)
+    with open(path, "rb") as f:
+        first = f.readline().split()
+        tokens = f.read().split()
+    if first and first[0] == b"wall_time":
+        header = [c.decode() for c in first]
+    else:
+        header = SS_COLS
+        tokens = first + tokens
+    if "flow" in header and "flow" not in cols:
+        cols = list(cols) + ["flow"]
+    ncol = len(header)
+    n = len(tokens) // ncol   # drops a partial last line
+    if n == 0:
+        return {c: np.empty(0) for c in cols}
+
+    picked = [b" ".join(tokens[header.index(c):n * ncol:ncol]) for c in cols]
+    values = np.fromstring(b" ".join(picked), sep=" ").reshape(len(cols), n)
+    return dict(zip(cols, values))
+
+
+def trace_arrays(cols):
+    """float64 {column: array} of TRACE_COLS (plus flow if present) from loaded columns."""
+    names = TRACE_COLS + (["flow"] if "flow" in cols else [])
+    return {c: np.asarray(cols[c], dtype=np.float64) for c in names}
+
+
+class ConnectionChain:
+    """
+    Connection ids for the rows of an old log (every socket on the port, no
+    flow id), one tick at a time: a row continues the connection whose
+    bytes_sent it does not go below, the closest one winning, else it starts
+    a new connection. Used by select_data_flow and online_classify.py --replay.
+    """
+
+    def __init__(self):
+        self.last_sent = []   # per connection
+        self.last_t = []
+
+    def assign(self, t, sent):
+        """Ids of the bytes_sent values of one tick (all sampled at t)."""
+        ids = []
+        taken = set()
+        for v in sent:
+            best, best_gap = -1, None
+            for c, s in enumerate(self.last_sent):
+                if c in taken or self.last_t[c] == t or v < s:
+                    continue
+                gap = v - s
+                if best_gap is None or gap < best_gap:
+                    best, best_gap = c, gap
+            if best < 0:
+                best = len(self.last_sent)
+                self.last_sent.append(v)
+                self.last_t.append(t)
+            taken.add(best)
+            self.last_sent[best] = v
+            self.last_t[best] = t
+            ids.append(best)
+        return ids
+
+
+def select_data_flow(tr):
+    """
+    Keep the rows of the iperf3 data connection.
+
+    Logs from a collector with a FlowTable tag each row with the socket's
+    flow id: the flow whose bytes_sent grew the most is kept, in one
+    vectorized pass. Old logs mix every socket on the port in one file
+    (data, control and sometimes a stale flow, all with the same timestamp)
+    without an id. Their rows are chained into connections by counter
+    continuity (bytes_sent never decreases and the closest continuation
+    wins), and the connection that sent the most during the trace is returned.
+    """
+    t = tr["monotonic"]
+    flow = tr.get("flow")
+    if flow is not None and len(flow) and flow.max() > 0:
+        ids, inv = np.unique(flow, return_inverse=True)
+        if len(ids) == 1:
+            return tr
+        sent = tr["bytes_sent"]
+        hi = np.full(len(ids), -np.inf)
+        lo = np.full(len(ids), np.inf)
+        np.maximum.at(hi, inv, sent)
+        np.minimum.at(lo, inv, sent)
+        keep = inv == int(np.argmax(hi - lo))
+        return {c: v[keep] for c, v in tr.items()}
+    if len(t) < 2 or np.all(np.diff(t) > 0):
+        return tr
+
+    sent = tr["bytes_sent"]
+    chain = ConnectionChain()
+    chain_id = np.empty(len(t), dtype=np.int64)
+    start = 0
+    while start < len(t):
+        end = start
+        while end < len(t) and t[end] == t[start]:
+            end += 1
+        chain_id[start:end] = chain.assign(t[start], sent[start:end])
+        start = end
+
+    growth = np.zeros(len(chain.last_sent))
+    for c in range(len(chain.last_sent)):
+        rows = sent[chain_id == c]
+        growth[c] = rows[-1] - rows[0]
+    keep = chain_id == int(np.argmax(growth))
+    return {c: v[keep] for c, v in tr.items()}
+
+
+def _slope(x, y):
+    """Least-squares slope of y over x (0 if x is constant)."""
+    xm = x - x.mean()
+    den = np.dot(xm, xm)
+    return float(np.dot(xm, y - y.mean()) / den) if den > 0 else 0.0
+
+
+def trace_features(tr, window=1.0, max_points=None):
+    """
+    Compute TS_FEATURES for one trace. Returns None if it is too short.
+    With max_points, longer traces are first decimated (decimate.py: min/max
+    buckets of cwnd, every column sliced alike), trading exactness of the
+    percentiles for time on very long, high-rate traces.
+    """
+    tr = select_data_flow(tr)
+    if max_points:
+        from .decimate import decimate_trace
+
+        tr = decimate_trace(tr, max_points)
+    t = tr["monotonic"]
+    if len(t) < 3:
+        return None
+    t = t - t[0]
+    duration = t[-1]
+    if duration <= 0:
+        return None
+
+    rtt = tr["rtt_ms"]
+    rttvar = tr["rtt_var_ms"]
+    cwnd = tr["cwnd"] * tr["mss"]
+    pacing = tr["pacing_mbps"]
+
+    # Percentiles of the four main series in one call
+    pct = np.percentile(np.vstack([rtt, rttvar, cwnd, pacing]), [10, 50, 90], axis=1)
+
+    feats = {
+        "ts_rtt_p10": pct[0, 0], "ts_rtt_p50": pct[1, 0], "ts_rtt_p90": pct[2, 0],
+        "ts_rttvar_p50": pct[1, 1], "ts_rttvar_p90": pct[2, 1],
+        "ts_cwnd_p10": pct[0, 2], "ts_cwnd_p50": pct[1, 2], "ts_cwnd_p90": pct[2, 2],
+        "ts_pacing_p10": pct[0, 3], "ts_pacing_p50": pct[1, 3], "ts_pacing_p90": pct[2, 3],
+        "ts_rtt_inflation": pct[2, 0] / pct[0, 0] if pct[0, 0] > 0 else 0.0,
+        "ts_cwnd_slope": _slope(t, cwnd),
+        "ts_rtt_slope": _slope(t, rtt),
+    }
+
+    # ---------- cwnd sawtooth ----------
+    drops = np.flatnonzero(cwnd[1:] < DROP_RATIO * cwnd[:-1]) + 1
+    feats["ts_cwnd_drop_rate"] = len(drops) / duration
+    feats["ts_cwnd_saw_period_s"] = float(np.mean(np.diff(t[drops]))) if len(drops) >= 2 else 0.0
+
+    # ---------- pacing oscillation spectrum ----------
+    dt = float(np.median(np.diff(t)))
+    n = int(duration / dt) + 1 if dt > 0 else 0
+    if n >= 8:
+        grid = np.arange(n) * dt
+        p = np.interp(grid, t, pacing)
+        # Remove mean and linear trend so the peak is an oscillation
+        p = p - (p.mean() + _slope(grid, p) * (grid - grid.mean()))
+        power = np.abs(np.fft.rfft(p)) ** 2
+        power[0] = 0.0
+        total = power.sum()
+        k = int(np.argmax(power))
+        feats["ts_pacing_peak_hz"] = k / (n * dt)
+        feats["ts_pacing_peak_frac"] = float(power[k] / total) if total > 0 else 0.0
+    else:
+        feats["ts_pacing_peak_hz"] = 0.0
+        feats["ts_pacing_peak_frac"] = 0.0
+
+    # ---------- retransmissions ----------
+    sent = tr["bytes_sent"][-1] - tr["bytes_sent"][0]
+    retrans = tr["retrans_total"][-1] - tr["retrans_total"][0]
+    feats["ts_retrans_rate"] = float(retrans / sent) if sent > 0 else 0.0
+
+    # ---------- goodput per window from bytes_acked ----------
+    acked = tr["bytes_acked"]
+    if duration >= 2 * window:
+        edges = np.arange(0.0, duration + 1e-9, window)
+        gp = np.diff(np.interp(edges, t, acked)) * 8 / window / 1e6
+    else:
+        gp = np.diff(acked) * 8 / np.maximum(np.diff(t), 1e-9) / 1e6
+    feats["ts_goodput_mean"] = float(gp.mean())
+    feats["ts_goodput_std"] = float(gp.std())
+    feats["ts_goodput_p90"] = float(np.percentile(gp, 90))
+
+    return {k: float(v) for k, v in feats.items()}
+
+
+def extract(path, window=1.0, max_points=None):
+    """load_trace + trace_features, warning (not raising) on bad files."""
+    try:
+        return trace_features(load_trace(path), window, max_points)
+    except Exception as e:
+        print(f"[warn] ts features failed for {path}: {e}")
+        return None
+
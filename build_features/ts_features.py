@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compute the time-series features (feature_pipeline/timeseries.py) for every
+trace in a directory and report traces/sec.
+
+Example:
+  python3 ts_features.py --ss_dir ../collect_data/logs/ss --out ts.csv
+  python3 ts_features.py --ss_dir ../collect_data/logs/ss --where algo=cubic "rtt>=100"
+"""
+import argparse
+import csv
+import os
+import time
+
+from feature_pipeline.catalog import Catalog
+from feature_pipeline.timeseries import TS_FEATURES, extract
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ss_dir", required=True, help="directory containing ss logs")
+    parser.add_argument("--out", default=None, help="optional CSV of per-trace features")
+    parser.add_argument("--window", type=float, default=1.0, help="goodput window (s)")
+    parser.add_argument("--max_points", type=int, default=None, help="decimate longer traces first")
+    parser.add_argument("--where", nargs="+", default=[], help="run catalog conditions, e.g. algo=bbr rtt>=100")
+    args = parser.parse_args()
+
+    cat = Catalog.for_dirs(args.ss_dir)
+    paths = [r["ss_path"] for r in cat.query(*args.where, ss_dir=cat.rel(args.ss_dir))]
+    cat.close()
+    t0 = time.perf_counter()
+    rows = []
+    for path in paths:
+        feats = extract(path, args.window, args.max_points)
+        if feats is not None:
+            rows.append(dict(flow=os.path.splitext(os.path.basename(path))[0], **feats))
+    dt = time.perf_counter() - t0
+    print(f"[OK] {len(rows)} traces in {dt:.2f} s ({len(paths) / dt:.0f} traces/s)")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["flow"] + TS_FEATURES)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"[OK] saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Size and decode speed of the .ssz storage (ss_compressed.py) on an archive
+of text ss logs, against the text logs and fixed-width .ssb records.
+
+Every log is converted to .ssb and to .ssz with each available codec
+("none" is delta + varint alone), in a temporary directory. Decoded .ssz
+records must equal the .ssb records (wall_time to the µs). Then, for each
+format, the whole archive is loaded into NumPy arrays, best of --repeat:
+
+  - ratio     : .ssb bytes / stored bytes (and text bytes / stored bytes)
+  - decode    : rows/s and MB/s of decoded records (.ssb record size)
+  - encode    : seconds to write the archive (pure Python writer)
+
+A synthetic log with --flows interleaved flows, small blocks and a block
+cut short at the end checks the per-flow deltas and crash handling; its
+decode rate is that of one long file (no per-file overhead).
+
+Example:
+  python3 bench_compress.py --ss_dir logs/ss
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import ss_binary
+import ss_compressed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--ss_dir", default=os.path.join(HERE, "logs", "ss"))
+parser.add_argument("--repeat", type=int, default=3, help="best of N passes")
+parser.add_argument("--flows", type=int, default=5, help="flows of the synthetic interleaved log")
+args = parser.parse_args()
+
+
+def same_records(a, b):
+    for c in a.dtype.names:
+        if c == "wall_time":
+            ok = np.array_equal(np.round(a[c] * 1e6), np.round(b[c] * 1e6))
+        else:
+            ok = np.array_equal(a[c], b[c])
+        if not ok:
+            return c
+    return None
+
+
+def check_interleaved(tmp, n_flows, rows=20000):
+    """Random interleaved flows, 512-row blocks, last block truncated."""
+    rng = np.random.default_rng(1)
+    path = os.path.join(tmp, "mixed.ssz")
+    flows = rng.integers(1, n_flows + 1, rows)
+    counters = np.zeros((n_flows + 1, 6), dtype=np.int64)
+    expect = np.empty(rows, dtype=ss_binary._numpy_dtype())
+    with ss_compressed.CompressedRecordWriter(path, "cubic", max_rows=512) as w:
+        for i, f in enumerate(flows.tolist()):
+            counters[f] += rng.integers(0, 1 << 20, 6)
+            s = {"rtt_ms": round(rng.uniform(1, 300), 3), "rtt_var_ms": round(rng.uniform(0, 50), 3),
+                 "cwnd": int(rng.integers(1, 5000)), "mss": 1448,
+                 "pacing_mbps": round(rng.uniform(0, 1000), 6), "ssthresh": int(rng.integers(-1, 5000)),
+                 "unacked": int(rng.integers(0, 500)), "flow": f}
+            for c, v in zip(["bytes_acked", "bytes_sent", "bytes_received", "segs_out", "segs_in",
+                             "retrans_total"], counters[f].tolist()):
+                s[c] = v
+            wall, mono = 1.7e9 + i * 0.01, 5e5 + i * 0.01
+            w.append(wall, mono, s)
+            expect[i] = tuple(round(wall, 6) if c == "wall_time" else round(mono, 9) if c == "monotonic"
+                              else s[c] for c in ss_compressed.COLUMN_NAMES)
+    t0 = time.perf_counter()
+    _, got = ss_compressed.open_ssz(path)
+    dt = time.perf_counter() - t0
+    bad = same_records(expect, got)
+    assert bad is None, f"interleaved flows: column {bad} differs"
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 7)
+    _, cut = ss_compressed.open_ssz(path)
+    assert len(cut) == rows - rows % 512 and same_records(expect[:len(cut)], cut) is None
+    _, last = ss_compressed.open_ssz(path, tail=1)
+    assert same_records(expect[len(cut) - 512:len(cut)], last) is None
+    print(f"[OK] {rows} rows of {n_flows} interleaved flows, 512-row blocks: lossless; "
+          f"truncated file keeps its {len(cut) // 512} complete blocks; "
+          f"decode {rows / dt / 1e6:.2f} Mrows/s ({rows * ss_binary.RECORD_SIZE / dt / 1e6:.0f} MB/s)")
+
+
+def best(fn, paths):
+    times = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        for p in paths:
+            fn(p)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+logs = sorted(glob.glob(os.path.join(args.ss_dir, "*.log")))
+if not logs:
+    raise SystemExit(f"no text ss log in {args.ss_dir}")
+codecs = [c for c in ss_compressed.CODECS]
+print(f"codecs available: {', '.join(codecs)} (zstd needs zstandard, lz4 needs lz4)")
+
+tmp = tempfile.mkdtemp(prefix="bench_compress_")
+try:
+    check_interleaved(tmp, args.flows)
+
+    text_bytes = sum(os.path.getsize(p) for p in logs)
+    out = {fmt: [] for fmt in ["ssb"] + codecs}
+    encode = {}
+    for fmt in out:
+        d = os.path.join(tmp, fmt)
+        os.makedirs(d)
+        t0 = time.perf_counter()
+        for p in logs:
+            stem = os.path.splitext(os.path.basename(p))[0]
+            if fmt == "ssb":
+                dst = os.path.join(d, stem + ".ssb")
+                ss_binary.convert_text_log(p, dst)
+            else:
+                dst = os.path.join(d, stem + ".ssz")
+                ss_compressed.convert_text_log(p, dst, fmt)
+            out[fmt].append(dst)
+        encode[fmt] = time.perf_counter() - t0
+
+    rows = 0
+    for i, ref in enumerate(out["ssb"]):
+        _, want = ss_binary.open_ssb(ref)
+        rows += len(want)
+        for codec in codecs:
+            _, got = ss_compressed.open_ssz(out[codec][i])
+            bad = same_records(want, got)
+            assert bad is None, f"{out[codec][i]}: column {bad} differs from .ssb"
+    print(f"[OK] {len(logs)} logs, {rows} rows: .ssz records == .ssb records for every codec")
+
+    ssb_bytes = sum(os.path.getsize(p) for p in out["ssb"])
+    decoded_mb = rows * ss_binary.RECORD_SIZE / 1e6
+    print(f"text {text_bytes / 1e6:.2f} MB, .ssb {ssb_bytes / 1e6:.2f} MB")
+    print(f"{'format':8s} {'MB':>7s} {'vs ssb':>7s} {'vs text':>8s} {'bytes/row':>10s} "
+          f"{'encode s':>9s} {'decode s':>9s} {'Mrows/s':>8s} {'MB/s':>8s}")
+    for fmt, paths in out.items():
+        size = sum(os.path.getsize(p) for p in paths)
+        if fmt == "ssb":
+            dt = best(lambda p: np.array(ss_binary.open_ssb(p)[1]), paths)
+            label = "ssb"
+        else:
+            dt = best(ss_compressed.open_ssz, paths)
+            label = "ssz/" + fmt
+        print(f"{label:8s} {size / 1e6:7.2f} {ssb_bytes / size:6.2f}x {text_bytes / size:7.2f}x "
+              f"{size / rows:10.2f} {encode[fmt]:9.2f} {dt:9.3f} {rows / dt / 1e6:8.2f} "
+              f"{decoded_mb / dt:8.1f}")
+finally:
+    shutil.rmtree(tmp)
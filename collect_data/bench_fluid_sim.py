@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Speed of the fluid-model synthesizer (fluid_sim.py), and a check that its
+output reads like a testbed log root.
+
+  - simulate : flows/s of FluidBatch alone per algo and --batch size, over
+               the run_experiments.sh RTTs (rtt 10 ms needs the most steps)
+  - end to end: fluid_sim.py's work (simulate + write ss log, .flows and
+               iperf3 JSON) for the whole grid with --runs runs per cell on
+               --jobs worker processes, into a temporary directory
+  - readers  : every written run has its two sockets, the data flow covers
+               the whole test, and build_features' sources parse the ss log
+               and JSON into the model features
+
+Example:
+  python3 bench_fluid_sim.py --batch 64 256 1024 --runs 64 --jobs 4
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fluid_sim
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "build_features"))
+from feature_pipeline import dataset, sources  # noqa: E402
+from feature_pipeline.timeseries import select_data_flow, trace_arrays  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch", nargs="+", type=int, default=[64, 256, 1024], help="flows per batch")
+parser.add_argument("--runs", type=int, default=64, help="runs per (algo, rtt, bw) cell, end to end")
+parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+parser.add_argument("--format", choices=["text", "ssb", "ssz"], default="text")
+args = parser.parse_args()
+
+opts = {"out_root": None, "duration": 30.0, "interval": 0.5, "format": args.format, "aqm": "codel",
+        "rwnd_bytes": 0, "jitter_ms": 0.2}
+
+print(f"{'algo':6s} {'batch':>6s} {'flows':>6s} {'s':>7s} {'flows/s':>8s}")
+for algo in fluid_sim.ALGOS:
+    for batch in args.batch:
+        tasks = fluid_sim.make_tasks([algo], fluid_sim.RTTS, [fluid_sim.BWS[i % 4] for i in range(batch)],
+                                     1, batch, opts)
+        t0 = time.perf_counter()
+        n = sum(fluid_sim.run_group(task)[0] for task in tasks)
+        dt = time.perf_counter() - t0
+        print(f"{algo:6s} {batch:6d} {n:6d} {dt:7.2f} {n / dt:8.0f}")
+
+tmp = tempfile.mkdtemp(prefix="bench_fluid_sim_")
+try:
+    for sub in ("ss", "iperf"):
+        os.makedirs(os.path.join(tmp, sub))
+    jobs = args.jobs or os.cpu_count()
+    tasks = fluid_sim.make_tasks(fluid_sim.ALGOS, fluid_sim.RTTS, fluid_sim.BWS, args.runs,
+                                 max(args.batch), dict(opts, out_root=tmp))
+    t0 = time.perf_counter()
+    n = sim_s = write_s = 0
+    with ProcessPoolExecutor(jobs) as pool:
+        for flows, s, w in pool.map(fluid_sim.run_group, tasks):
+            n, sim_s, write_s = n + flows, sim_s + s, write_s + w
+    wall = time.perf_counter() - t0
+    print(f"end to end: {n} flows in {wall:.1f} s on {jobs} workers = {n / wall:.0f} flows/s "
+          f"(per worker: simulate {n / sim_s:.0f}, write {n / write_s:.0f} flows/s)")
+
+    logs = sorted(glob.glob(os.path.join(tmp, "ss", "*." + ("log" if args.format == "text" else args.format))))
+    assert len(logs) == n, f"{len(logs)} ss logs for {n} flows"
+    bad = 0
+    for p in logs[::max(1, len(logs) // 500)]:
+        with open(p + ".flows") as f:
+            two = len(f.read().splitlines()) == 2
+        tr = select_data_flow(trace_arrays(dataset.load_trace_columns(p, cache_dir=os.path.join(tmp, "c"))[0]))
+        whole = tr["monotonic"][-1] - tr["monotonic"][0] >= opts["duration"] - 2 * opts["interval"]
+        stem = os.path.splitext(os.path.basename(p))[0]
+        last = sources.parse_ss_last_line(p)
+        ip = sources.parse_json(os.path.join(tmp, "iperf", stem + ".json"))
+        bad += not (two and whole and last and ip)
+    assert bad == 0, f"{bad} runs do not read like testbed runs"
+    print(f"[OK] {n} runs: 2 sockets each, data flow over the whole test, ss/iperf3 features parse")
+finally:
+    shutil.rmtree(tmp)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the collect_ss.py sampler backends.
+
+For each backend, call sample() repeatedly and report:
+  - samples/sec  : wall-clock rate of full polls
+  - CPU/sample   : user+sys CPU per poll, including forked children (`ss`)
+
+--sockets N skips the kernel and times the per-tick bookkeeping of N
+concurrent synthetic sockets instead: FlowTable tagging (with 5% of the
+sockets replaced every tick) plus the text, .ssb and .ssz writers.
+
+Example:
+  python3 bench_sampler.py --port 5201 --n 500
+  python3 bench_sampler.py --sockets 500
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from flow_table import FlowTable
+from ss_sampler import BACKENDS, SAMPLE_FIELDS
+from ss_writers import open_writer
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--port", type=int, default=5201)
+parser.add_argument("--dst", type=str, default=None)
+parser.add_argument("--n", type=int, default=500, help="polls per backend")
+parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+parser.add_argument("--sockets", type=int, default=0, help="time FlowTable + writers on N synthetic sockets")
+args = parser.parse_args()
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+
+
+def bench_sockets(n_sockets, ticks):
+    """Per-tick cost of tagging and writing n_sockets samples."""
+    base = dict.fromkeys(SAMPLE_FIELDS, 1)
+    base.update(algo="cubic", rtt_ms=10.0, rtt_var_ms=1.0, pacing_mbps=5.0)
+    churn = max(1, n_sockets // 20)
+    print(f"{'format':8s} {'sockets':>8s} {'ticks':>6s} {'us/tick':>9s} {'us/sample':>10s} {'flows':>7s}")
+    for fmt in ("text", "ssb", "ssz"):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = open_writer(os.path.join(tmp, "bench.log"), "cubic", fmt)
+            table = FlowTable(expire=1.0)
+            ports = list(range(n_sockets))
+            wall = datetime.datetime.now()
+            t0 = time.perf_counter()
+            for k in range(ticks):
+                mono = k * 0.01
+                # Replace a few sockets per tick (connections closing / opening)
+                for j in range(churn):
+                    ports[(k * churn + j) % n_sockets] = n_sockets + k * churn + j
+                samples = [dict(base, bytes_sent=k, bytes_acked=k, sock=("10.0.0.1", p, "10.0.0.2", 5201, p))
+                           for p in ports]
+                table.observe(mono, samples)
+                for s in samples:
+                    writer.append(wall, mono, s)
+                writer.maybe_flush()
+            dt = time.perf_counter() - t0
+            writer.close()
+        print(f"{fmt:8s} {n_sockets:8d} {ticks:6d} {dt / ticks * 1e6:9.0f} "
+              f"{dt / ticks / n_sockets * 1e6:10.2f} {len(table.flows()):7d}")
+
+
+if args.sockets:
+    bench_sockets(args.sockets, args.n)
+    raise SystemExit(0)
+
+print(f"{'backend':10s} {'polls':>7s} {'samples/s':>11s} {'CPU/sample(ms)':>15s} {'rows/poll':>10s}")
+for name in args.backends:
+    try:
+        sampler = BACKENDS[name](args.port, args.dst)
+    except OSError as e:
+        print(f"{name:10s} unavailable: {e}")
+        continue
+
+    sampler.sample()  # warm up
+    rows = 0
+    wall0, cpu0 = time.perf_counter(), cpu_seconds()
+    for _ in range(args.n):
+        rows += len(sampler.sample())
+    wall = time.perf_counter() - wall0
+    cpu = cpu_seconds() - cpu0
+    sampler.close()
+
+    print(f"{name:10s} {args.n:7d} {args.n / wall:11.1f} "
+          f"{cpu / args.n * 1000:15.3f} {rows / args.n:10.1f}")
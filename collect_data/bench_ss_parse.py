@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Parse speed and parity of the `ss -ti` info-line tokenizer (ss_sampler.py)
+against the per-field regexes it replaced (parse_regex below, one search
+per field).
+
+The corpus is a synthetic `ss -tie` dump built from the text logs of
+--ss_dir: one entry per logged sample, fields in the order ss prints them,
+with the optional fields (ssthresh, bytes_retrans, retrans, lost,
+app_limited, busy, rwnd_limited, bbr:(...)) and the rate style (raw bps or
+K/M/Gbps) varying from entry to entry. Real dumps (`ss -tieH >> dump.txt`)
+can be added with --corpus.
+
+Checks: parse_info_line gives the same value as the regexes for every
+regex-parsed field of every entry, and parse_dump finds every entry.
+Reports µs per line for the regexes (also with the 5 fields parse_info_line
+added), parse_info_line and the full typed parse_info, and the bulk
+parse_dump rate of the corpus file. The parsers take turns on every pass.
+
+Example:
+  python3 bench_ss_parse.py --ss_dir logs/ss
+  python3 bench_ss_parse.py --corpus /tmp/dump.txt
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import tempfile
+import time
+
+import ss_binary
+from ss_sampler import EXTRA_FIELDS, SAMPLE_FIELDS, iter_dump, parse_dump, parse_info, parse_info_line
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--ss_dir", default=os.path.join(HERE, "logs", "ss"))
+parser.add_argument("--corpus", nargs="*", default=[], help="saved `ss -tie` dumps to add to the corpus")
+parser.add_argument("--repeat", type=int, default=3, help="best of N passes")
+args = parser.parse_args()
+
+# ====== Reference: the original per-field regexes ======
+RE_RTT = re.compile(r"rtt:(\d+\.?\d*)/(\d+\.?\d*)")
+RE_CWND = re.compile(r"cwnd:(\d+)")
+RE_MSS = re.compile(r"mss:(\d+)")
+RE_SSTH = re.compile(r"ssthresh:(\d+)")
+RE_PACING = re.compile(r"pacing_rate (\d+\.?\d*)([KMG]?bps)")
+RE_ACKED = re.compile(r"bytes_acked:(\d+)")
+RE_SENT = re.compile(r"bytes_sent:(\d+)")
+RE_RECV = re.compile(r"bytes_received:(\d+)")
+RE_SEGS_O = re.compile(r"segs_out:(\d+)")
+RE_SEGS_I = re.compile(r"segs_in:(\d+)")
+RE_UNACK = re.compile(r"unacked:(\d+)")
+RE_RETRANS = re.compile(r"retrans:(\d+)(?:/(\d+))?")
+RE_ALGO = re.compile(r"\b(cubic|reno|bbr2?|bbr|vegas|yeah|westwood)\b")
+# The fields parse_info_line added, for a same-fields comparison
+RE_MINRTT = re.compile(r"minrtt:(\d+\.?\d*)")
+RE_DELIVERY = re.compile(r"delivery_rate (\d+\.?\d*)([KMG]?bps)")
+RE_LOST = re.compile(r"lost:(\d+)")
+RE_APP_LIMITED = re.compile(r"\bapp_limited\b")
+RE_BUSY = re.compile(r"busy:(\d+)ms")
+
+
+def parse_rate_to_mbps(val_str, unit_str):
+    val = float(val_str)
+    if unit_str.startswith("K"):
+        return val / 1000.0
+    elif unit_str.startswith("M"):
+        return val
+    elif unit_str.startswith("G"):
+        return val * 1000.0
+    return val / 1e6
+
+
+def parse_regex(info_line):
+    m_algo = RE_ALGO.search(info_line)
+    algo = m_algo.group(1).lower() if m_algo else "unknown"
+    m_rtt = RE_RTT.search(info_line)
+    m_cwnd = RE_CWND.search(info_line)
+    if not (m_rtt and m_cwnd):
+        return None
+    m_mss = RE_MSS.search(info_line)
+    m_ssth = RE_SSTH.search(info_line)
+    m_pace = RE_PACING.search(info_line)
+    m_acked = RE_ACKED.search(info_line)
+    m_sent = RE_SENT.search(info_line)
+    m_recv = RE_RECV.search(info_line)
+    m_out = RE_SEGS_O.search(info_line)
+    m_in = RE_SEGS_I.search(info_line)
+    m_unack = RE_UNACK.search(info_line)
+    m_retr = RE_RETRANS.search(info_line)
+    return {
+        "algo": "bbr" if algo.startswith("bbr") else algo,
+        "rtt_ms": float(m_rtt.group(1)),
+        "rtt_var_ms": float(m_rtt.group(2)),
+        "cwnd": int(m_cwnd.group(1)),
+        "mss": int(m_mss.group(1)) if m_mss else 0,
+        "pacing_mbps": parse_rate_to_mbps(m_pace.group(1), m_pace.group(2)) if m_pace else 0.0,
+        "ssthresh": int(m_ssth.group(1)) if m_ssth else -1,
+        "bytes_acked": int(m_acked.group(1)) if m_acked else 0,
+        "bytes_sent": int(m_sent.group(1)) if m_sent else 0,
+        "bytes_received": int(m_recv.group(1)) if m_recv else 0,
+        "segs_out": int(m_out.group(1)) if m_out else 0,
+        "segs_in": int(m_in.group(1)) if m_in else 0,
+        "unacked": int(m_unack.group(1)) if m_unack else 0,
+        "retrans_total": int(m_retr.group(1)) if m_retr else 0,
+    }
+
+
+def parse_regex_extra(info_line):
+    rec = parse_regex(info_line)
+    if rec is None:
+        return None
+    m_min = RE_MINRTT.search(info_line)
+    m_del = RE_DELIVERY.search(info_line)
+    m_lost = RE_LOST.search(info_line)
+    m_busy = RE_BUSY.search(info_line)
+    rec["min_rtt_ms"] = float(m_min.group(1)) if m_min else 0.0
+    rec["delivery_mbps"] = parse_rate_to_mbps(m_del.group(1), m_del.group(2)) if m_del else 0.0
+    rec["lost"] = int(m_lost.group(1)) if m_lost else 0
+    rec["app_limited"] = RE_APP_LIMITED.search(info_line) is not None
+    rec["busy_ms"] = float(m_busy.group(1)) if m_busy else 0.0
+    return rec
+
+
+# ====== Synthetic corpus ======
+def rate(rng, mbps):
+    bps = mbps * 1e6
+    if rng.random() < 0.5:
+        return f"{bps:.0f}bps"
+    for unit, scale in (("Gbps", 1e9), ("Mbps", 1e6), ("Kbps", 1e3)):
+        if bps >= scale:
+            return f"{bps / scale:.1f}{unit}"
+    return f"{bps:.0f}bps"
+
+
+def render(rng, algo, s):
+    """One `ss -tie` info line for a logged sample, in ss's field order."""
+    f = ["ts", "sack"] + (["ecn"] if rng.random() < 0.1 else []) + [algo, "wscale:7,7"]
+    f += [f"rto:{204 + int(s['rtt_ms'])}", f"rtt:{s['rtt_ms']:g}/{s['rtt_var_ms']:g}", "ato:40",
+          f"mss:{s['mss']}", "pmtu:1500", "rcvmss:536", "advmss:1448", f"cwnd:{s['cwnd']}"]
+    if 0 <= s["ssthresh"] < 2 ** 31 - 1 and rng.random() < 0.8:
+        f.append(f"ssthresh:{s['ssthresh']}")
+    f.append(f"bytes_sent:{s['bytes_sent']}")
+    if s["retrans_total"] and rng.random() < 0.5:
+        f.append(f"bytes_retrans:{s['retrans_total'] * s['mss']}")
+    f += [f"bytes_acked:{s['bytes_acked']}", f"bytes_received:{s['bytes_received']}",
+          f"segs_out:{s['segs_out']}", f"segs_in:{s['segs_in']}", f"data_segs_out:{max(0, s['segs_out'] - 2)}"]
+    if algo == "bbr":
+        f.append(f"bbr:(bw:{rate(rng, s['pacing_mbps'])},mrtt:{s['rtt_ms'] * 0.8:g},"
+                 f"pacing_gain:2.88672,cwnd_gain:2.88672)")
+    f += [f"send {rate(rng, s['cwnd'] * s['mss'] * 8 / max(s['rtt_ms'], 1e-3) / 1e3)}",
+          f"lastsnd:{rng.randint(0, 500)}", f"lastrcv:{rng.randint(0, 500)}", f"lastack:{rng.randint(0, 50)}"]
+    if s["pacing_mbps"]:
+        f.append(f"pacing_rate {rate(rng, s['pacing_mbps'])}")
+    f += [f"delivery_rate {rate(rng, s['pacing_mbps'] * rng.uniform(0.5, 1.0))}",
+          f"delivered:{s['segs_out']}"]
+    if rng.random() < 0.2:
+        f.append("app_limited")
+    f.append(f"busy:{rng.randint(1, 60000)}ms")
+    if rng.random() < 0.1:
+        f.append(f"rwnd_limited:{rng.randint(1, 99)}ms({rng.uniform(0, 10):.1f}%)")
+    if s["unacked"]:
+        f.append(f"unacked:{s['unacked']}")
+    if s["retrans_total"]:
+        f.append(f"retrans:{rng.randint(0, 3)}/{s['retrans_total']}")
+        f.append(f"lost:{rng.randint(0, 3)}")
+    f += ["rcv_space:14600", "rcv_ssthresh:64076", f"minrtt:{s['rtt_ms'] * 0.8:g}", "snd_wnd:131072"]
+    return " ".join(f)
+
+
+def build_corpus(path, logs, seed=1):
+    rng = random.Random(seed)
+    n = 0
+    with open(path, "w") as out:
+        for log in logs:
+            for algo, _, _, s in ss_binary.iter_text_log(log):
+                sport = 40000 + n % 20000
+                out.write(f"ESTAB 0 0 10.0.0.1:{sport} 10.0.0.2:5201 ino:{1000 + n} sk:{n:x} <->\n")
+                out.write("\t " + render(rng, algo, s) + "\n")
+                n += 1
+    return n
+
+
+def best(fns, items):
+    """Best time of each fn over items; the fns take turns, so load changes hit all of them."""
+    times = [float("inf")] * len(fns)
+    for _ in range(args.repeat):
+        for i, fn in enumerate(fns):
+            t0 = time.perf_counter()
+            for x in items:
+                fn(x)
+            times[i] = min(times[i], time.perf_counter() - t0)
+    return times
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    corpus = os.path.join(tmp, "corpus.txt")
+    n = build_corpus(corpus, sorted(glob.glob(os.path.join(args.ss_dir, "*.log"))))
+    files = [corpus] + args.corpus
+    entries = []
+    for path in files:
+        with open(path) as f:
+            entries += list(iter_dump(f))
+    lines = [info for _, info in entries]
+    size = sum(os.path.getsize(p) for p in files)
+    print(f"corpus: {n} synthetic entries + {len(lines) - n} from --corpus, {size / 1e6:.1f} MB")
+
+    mismatches = 0
+    for line in lines:
+        want, got = parse_regex(line), parse_info_line(line)
+        if want is None or got is None:
+            ok = want is None and got is None
+        else:
+            ok = all(want[c] == got[c] and type(want[c]) is type(got[c]) for c in SAMPLE_FIELDS)
+        if not ok:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"[diff] {line}\n  regex {want}\n  token {got}")
+    assert mismatches == 0, f"{mismatches} lines differ from the regexes"
+    extra = sum(parse_regex_extra(line) != parse_info_line(line) for line in lines)
+    assert extra == 0, f"{extra} lines differ from the regexes on the added fields"
+    print(f"[OK] {len(lines)} lines: parse_info_line == per-field regexes on {len(SAMPLE_FIELDS) + len(EXTRA_FIELDS)} fields")
+
+    bulk = sum(len(parse_dump(p)) for p in files)
+    assert bulk == sum(parse_regex(line) is not None for line in lines), "parse_dump missed entries"
+
+    parsers = [("regex (13 x re)", parse_regex), ("regex (18 x re)", parse_regex_extra),
+               ("parse_info_line", parse_info_line), ("parse_info (all)", parse_info)]
+    print(f"{'parser':18s} {'us/line':>8s} {'lines/s':>10s} {'fields':>7s}")
+    for (label, fn), dt in zip(parsers, best([fn for _, fn in parsers], lines)):
+        fields = sum(len(fn(line) or ()) for line in lines[:1000]) / min(len(lines), 1000)
+        print(f"{label:18s} {dt / len(lines) * 1e6:8.2f} {len(lines) / dt:10.0f} {fields:7.1f}")
+    (dt,) = best([lambda p: parse_dump(p)], files)
+    print(f"parse_dump (bulk): {bulk} entries in {dt:.3f} s, {size / dt / 1e6:.1f} MB/s, "
+          f"{bulk / dt:.0f} entries/s")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-socket flow tracking for collect_ss.py and ss_daemon.py.
+
+The port filter of a collector matches every socket of an iperf3 test: the
+control connection, the data connection(s), sometimes a stale flow of the
+previous run. Their samples share a timestamp, and without a key the rows
+of a log cannot be told apart. FlowTable gives each socket a small integer
+flow id (1, 2, ... in order of first sight), stored in sample["flow"] and
+written as the flow column of the log, so readers keep the data flow by id.
+
+Sockets are keyed by their 4-tuple (src, sport, dst, dport). The same
+4-tuple seen with another inode, or with bytes_sent going backwards, is a
+new connection reusing the ports and gets a new id. Per flow the table
+keeps first/last sight, the sample count and the latest counters. Flows
+not seen for `expire` seconds are retired, so lookups stay one dict access
+per sample and the table only holds live sockets (hundreds are fine).
+Retired flows are kept (up to max_retired) for the <output>.flows sidecar:
+one JSON object per flow with its socket, counters and whether it is the
+data flow (the one that sent the most bytes).
+"""
+import collections
+import json
+
+
+class FlowState:
+    __slots__ = ("flow_id", "sock", "first_seen", "last_seen", "samples",
+                 "bytes_sent", "bytes_acked", "retrans_total")
+
+    def __init__(self, flow_id, sock, mono):
+        self.flow_id = flow_id
+        self.sock = sock
+        self.first_seen = mono
+        self.last_seen = mono
+        self.samples = 0
+        self.bytes_sent = 0
+        self.bytes_acked = 0
+        self.retrans_total = 0
+
+    def describe(self):
+        src, sport, dst, dport, inode = self.sock
+        return {
+            "flow": self.flow_id, "src": src, "sport": sport, "dst": dst, "dport": dport,
+            "inode": inode, "first_seen": self.first_seen, "last_seen": self.last_seen,
+            "samples": self.samples, "bytes_sent": self.bytes_sent,
+            "bytes_acked": self.bytes_acked, "retrans_total": self.retrans_total,
+        }
+
+
+class FlowTable:
+    def __init__(self, expire=5.0, max_retired=100000):
+        self.active = {}         # (src, sport, dst, dport) -> FlowState
+        self.retired = collections.deque(maxlen=max_retired)
+        self.expire = expire
+        self.next_id = 1
+        self.next_sweep = None
+
+    def tag(self, mono, s):
+        """Set s["flow"] from s["sock"] and update the flow's state. Returns the id (0: no socket)."""
+        sock = s.get("sock")
+        if sock is None:
+            s["flow"] = 0
+            return 0
+        key = sock[:4]
+        st = self.active.get(key)
+        if st is None or (sock[4] and st.sock[4] and sock[4] != st.sock[4]) \
+                or s["bytes_sent"] < st.bytes_sent:
+            if st is not None:
+                self.retired.append(st)
+            st = self.active[key] = FlowState(self.next_id, sock, mono)
+            self.next_id += 1
+        st.last_seen = mono
+        st.samples += 1
+        st.bytes_sent = s["bytes_sent"]
+        st.bytes_acked = s["bytes_acked"]
+        st.retrans_total = s["retrans_total"]
+        s["flow"] = st.flow_id
+        return st.flow_id
+
+    def observe(self, mono, samples):
+        """Tag a tick's samples and retire flows that went quiet."""
+        for s in samples:
+            self.tag(mono, s)
+        self.sweep(mono)
+
+    def sweep(self, mono):
+        if self.next_sweep is None:
+            self.next_sweep = mono + self.expire
+        if mono < self.next_sweep:
+            return
+        self.next_sweep = mono + self.expire
+        gone = [k for k, st in self.active.items() if mono - st.last_seen > self.expire]
+        for k in gone:
+            self.retired.append(self.active.pop(k))
+
+    def flows(self):
+        """Every flow seen so far (retired first), oldest id first."""
+        return sorted(list(self.retired) + list(self.active.values()), key=lambda st: st.flow_id)
+
+    def data_flow(self):
+        """Id of the flow that sent the most bytes (0 if none)."""
+        flows = self.flows()
+        return max(flows, key=lambda st: st.bytes_sent).flow_id if flows else 0
+
+    def write(self, path):
+        """Write the <output>.flows sidecar; returns the number of flows."""
+        data = self.data_flow()
+        flows = self.flows()
+        with open(path, "w") as f:
+            for st in flows:
+                f.write(json.dumps(dict(st.describe(), data=st.flow_id == data)) + "\n")
+        return len(flows)
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Synthetic runs from a fluid model of the testbed bottleneck, to grow the
+training set to new RTT/BW conditions without running the grid.
+
+One flow per (algo, rtt, bw, run) goes through the link that config_link
+builds: an HTB rate of bw Mbit/s, a netem delay of rtt ms and a queue of
+calc_queue_pkts() packets (about 1 BDP), drained by fq_codel. The state is
+fluid (packets as floats) and all flows of one (algo, rtt) group are
+stepped together as NumPy arrays, a few steps per RTT:
+
+  link    : send rate x = min(cwnd, rwnd) / rtt (BBR: also paced), the
+            queue grows by (x - C) dt, rtt = base + queue / C. Overflow
+            above the limit is dropped; with --aqm codel a packet is also
+            dropped once the sojourn time stays above 5 ms for 100 ms
+            (then at interval / sqrt(count), as CoDel does). Senders react
+            to at most one loss event per RTT.
+  reno    : slow start +1 per ack, then +1/cwnd per ack, halve on loss.
+  cubic   : HyStart delay exit, W(t) = C (t - K)^3 + W_max with the
+            TCP-friendly floor and fast convergence, beta 0.7.
+  vegas   : diff = cwnd (rtt - base_rtt) / rtt, +-1 per RTT outside
+            [alpha, beta], slow start left at diff > gamma, halve on loss.
+            Like Linux it grows even when the receive window is the limit.
+  bbr     : v1 state machine: startup (2.885 gain) until the max filtered
+            delivery rate stops growing 25% over 3 rounds, drain, the
+            8-phase PROBE_BW gain cycle, PROBE_RTT (4 packets, 200 ms) when
+            the 10 s min_rtt expires. Loss is only counted.
+
+The rtt seen by the sender carries a little measurement noise (--jitter_ms),
+smoothed into srtt / rttvar per ack like the kernel does. Every run is then
+written the way the testbed writes it: the ss log goes through the same
+writer (ss_writers.open_writer, --format) and FlowTable as collect_ss.py,
+with the iperf3 control socket as flow 1 and the data socket as flow 2,
+and a <run>.json holds the iperf3 -J report (0.5 s intervals and the end
+summary). build_features.py reads the output root like a real one.
+
+Example:
+  python3 fluid_sim.py --out_root logs_sim --runs 20
+  cd ../build_features && python3 build_features.py --ss_dir ../collect_data/logs_sim/ss \\
+      --json_dir ../collect_data/logs_sim/iperf --out_prefix features_sim
+  cd ../train_model && SYNTH_CSV=../build_features/features_sim_no_cond.csv python3 train_rf.py
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from flow_table import FlowTable
+from orchestrate import calc_queue_pkts
+from ss_writers import open_writer
+
+ALGOS = ["bbr", "cubic", "reno", "vegas"]   # same grid as run_experiments.sh
+RTTS = [10, 50, 100, 200]
+BWS = [10, 50, 100, 500]
+MSS = 1460
+PMTU = 1500
+INIT_CWND = 10
+SSTHRESH_UNSET = 65535    # what the ss log shows before the first ssthresh (rcv_ssthresh)
+SUBSTEPS = 4              # steps per base RTT
+
+CODEL_TARGET = 0.005
+CODEL_INTERVAL = 0.1
+CUBIC_C = 0.4
+CUBIC_BETA = 0.7
+VEGAS_ALPHA, VEGAS_BETA, VEGAS_GAMMA = 2, 4, 1
+BBR_HIGH_GAIN = 2.885
+BBR_CYCLE = np.array([1.25, 0.75, 1, 1, 1, 1, 1, 1])
+BBR_BW_ROUNDS = 10
+STARTUP, DRAIN, PROBE_BW, PROBE_RTT = range(4)
+
+# The control connection of an iperf3 test: a few hundred bytes at setup, idle after
+CONTROL = {"cwnd": INIT_CWND, "ssthresh": SSTHRESH_UNSET, "bytes_acked": 163, "bytes_sent": 162,
+           "bytes_received": 4, "segs_out": 9, "segs_in": 8, "unacked": 0, "retrans_total": 0}
+
+
+class FluidBatch:
+    """n flows of one algo, each through its own bottleneck, stepped together."""
+
+    def __init__(self, algo, rtt_ms, bw_mbit, mss=MSS, aqm="codel", rwnd_bytes=0,
+                 jitter_ms=0.2, rng=None):
+        self.rng = rng or np.random.default_rng()
+        self.algo = algo
+        bw_mbit = np.asarray(bw_mbit, dtype=np.float64)
+        n = self.n = len(bw_mbit)
+        # HTB is accurate to ~1%, and the hosts add a fraction of a ms to netem's delay
+        self.C = bw_mbit * 1e6 / 8 / mss * self.rng.uniform(0.98, 1.0, n)
+        self.D = rtt_ms / 1e3 + self.rng.uniform(5e-5, 3e-4, n)
+        self.B = np.array([calc_queue_pkts(rtt_ms, int(b), mss) for b in bw_mbit], dtype=np.float64)
+        self.codel = aqm == "codel"
+        self.rwnd = rwnd_bytes / mss if rwnd_bytes else np.inf
+        self.jitter = jitter_ms / 1e3
+
+        self.q = np.zeros(n)
+        self.cwnd = np.full(n, float(INIT_CWND))
+        self.ssth = np.full(n, np.inf)
+        self.srtt = self.D.copy()
+        self.rttvar = self.D / 2
+        self.min_rtt = self.D.copy()
+        self.inflight = self.cwnd.copy()
+        self.acked = np.zeros(n)
+        self.sent = np.zeros(n)
+        self.lost = np.zeros(n)
+        self.recover_until = np.zeros(n)
+        self.codel_at = np.full(n, np.inf)
+        self.codel_n = np.zeros(n)
+        self.pacing = np.full(n, np.inf)
+
+        if algo == "cubic":
+            self.epoch = np.full(n, np.nan)
+            self.wmax = np.zeros(n)
+            self.origin = np.zeros(n)
+            self.K = np.zeros(n)
+            self.west = np.zeros(n)
+        elif algo == "bbr":
+            self.mode = np.full(n, STARTUP)
+            self.btlbw = INIT_CWND / self.D
+            self.bw_filter = np.zeros((n, BBR_BW_ROUNDS))
+            self.bw_filter[:, 0] = self.btlbw
+            self.rounds = np.zeros(n, dtype=np.int64)
+            self.round_end = self.D.copy()
+            self.full = np.zeros(n, dtype=bool)
+            self.full_bw = np.zeros(n)
+            self.full_cnt = np.zeros(n)
+            self.mr = self.D.copy()
+            self.mr_stamp = np.zeros(n)
+            self.cycle = np.zeros(n, dtype=np.int64)
+            self.cycle_stamp = np.zeros(n)
+            self.prt_done = np.zeros(n)
+            self.prior_cwnd = self.cwnd.copy()
+            self.pacing = BBR_HIGH_GAIN * self.btlbw
+        elif algo not in ("reno", "vegas"):
+            raise ValueError(f"unknown algo: {algo}")
+
+    # ====== One step of dt seconds ending at t ======
+    def step(self, t, dt):
+        rtt = self.D + self.q / self.C
+        meas = rtt + np.abs(self.rng.standard_normal(self.n)) * self.jitter
+        window = np.minimum(self.cwnd, self.rwnd)
+        x = np.minimum(window / rtt, self.pacing)
+
+        # Bottleneck: deliver at most C, queue the rest, drop what does not fit
+        y = np.minimum(self.C, self.q / dt + x)
+        q = self.q + (x - y) * dt
+        drop = np.maximum(q - self.B, 0.0)
+        q -= drop
+        if self.codel:
+            above = q > self.C * CODEL_TARGET
+            self.codel_at = np.where(above, np.minimum(self.codel_at, t + CODEL_INTERVAL), np.inf)
+            fire = t >= self.codel_at
+            self.codel_n = np.where(above, self.codel_n + fire, 0.0)
+            self.codel_at = np.where(fire, t + CODEL_INTERVAL / np.sqrt(np.maximum(self.codel_n, 1)),
+                                     self.codel_at)
+            q = np.maximum(q - fire, 0.0)
+            drop = drop + fire
+        self.q = q
+        react = (drop > 0) & (t >= self.recover_until)
+        self.recover_until = np.where(react, t + rtt, self.recover_until)
+
+        acked = y * dt
+        self.acked += acked
+        self.sent += x * dt + drop    # drops go out again as retransmits
+        self.lost += drop
+        self.inflight = x * rtt
+        # srtt / rttvar: kernel EWMA (1/8, 1/4) once per delayed ack
+        k = acked * 0.5
+        err = meas - self.srtt
+        self.srtt += (1 - 0.875 ** k) * err
+        self.rttvar += (1 - 0.75 ** k) * (np.abs(err) - self.rttvar)
+        self.min_rtt = np.minimum(self.min_rtt, meas)
+
+        getattr(self, "_" + self.algo)(t, dt, acked, y, rtt, meas, react)
+
+    def _cwnd_limited(self, slow):
+        if self.rwnd == np.inf:
+            return True
+        return np.where(slow, self.cwnd < 2 * self.rwnd, self.cwnd <= self.rwnd)
+
+    def _halve(self, react, beta=0.5):
+        cut = np.maximum(self.cwnd * beta, 2.0)
+        self.ssth = np.where(react, cut, self.ssth)
+        self.cwnd = np.where(react, cut, self.cwnd)
+
+    def _reno(self, t, dt, acked, y, rtt, meas, react):
+        slow = self.cwnd < self.ssth
+        self.cwnd += np.where(slow, acked, acked / self.cwnd) * self._cwnd_limited(slow)
+        self._halve(react)
+
+    def _cubic(self, t, dt, acked, y, rtt, meas, react):
+        slow = self.cwnd < self.ssth
+        # HyStart: leave slow start once the rtt rises clearly above the minimum
+        eta = np.clip(self.min_rtt / 8, 0.004, 0.016)
+        leave = slow & (self.cwnd >= 16) & (meas > self.min_rtt + eta)
+        self.ssth = np.where(leave, self.cwnd, self.ssth)
+        slow &= ~leave
+
+        start = ~slow & np.isnan(self.epoch)
+        if start.any():
+            self.epoch = np.where(start, t, self.epoch)
+            self.K = np.where(start, np.cbrt(np.maximum(self.wmax - self.cwnd, 0) / CUBIC_C), self.K)
+            self.origin = np.where(start, np.maximum(self.wmax, self.cwnd), self.origin)
+            self.west = np.where(start, self.cwnd, self.west)
+        target = self.origin + CUBIC_C * (t - self.epoch + self.min_rtt - self.K) ** 3
+        self.west += acked * (3 * (1 - CUBIC_BETA) / (1 + CUBIC_BETA)) / self.cwnd
+        target = np.maximum(target, self.west)
+        # At most 1 packet per 2 acked (1.5x per RTT), else ~nothing above the target
+        inc = np.where(target > self.cwnd, np.minimum((target - self.cwnd) / self.cwnd, 0.5),
+                       0.01 / self.cwnd)
+        self.cwnd += np.where(slow, acked, np.nan_to_num(inc) * acked) * self._cwnd_limited(slow)
+
+        if react.any():
+            self.wmax = np.where(react, np.where(self.cwnd < self.wmax, self.cwnd * (1 + CUBIC_BETA) / 2,
+                                                 self.cwnd), self.wmax)
+            self.epoch = np.where(react, np.nan, self.epoch)
+            self._halve(react, CUBIC_BETA)
+
+    def _vegas(self, t, dt, acked, y, rtt, meas, react):
+        slow = self.cwnd < self.ssth
+        diff = self.cwnd * (rtt - self.min_rtt) / rtt
+        leave = slow & (diff > VEGAS_GAMMA)
+        if leave.any():
+            self.cwnd = np.where(leave, np.minimum(self.cwnd, self.cwnd * self.min_rtt / rtt + 1), self.cwnd)
+            self.ssth = np.where(leave, np.minimum(self.ssth, self.cwnd - 1), self.ssth)
+            slow &= ~leave
+        per_rtt = dt / rtt
+        inc = np.where(diff < VEGAS_ALPHA, per_rtt, np.where(diff > VEGAS_BETA, -per_rtt, 0.0))
+        self.cwnd = np.maximum(self.cwnd + np.where(slow, acked, inc), 2.0)
+        self._halve(react)
+
+    def _bbr(self, t, dt, acked, y, rtt, meas, react):
+        # Max filter of the delivery rate over the last 10 rounds
+        new = t >= self.round_end
+        self.round_end = np.where(new, t + rtt, self.round_end)
+        self.rounds += new
+        rows = np.arange(self.n)
+        slot = self.rounds % BBR_BW_ROUNDS
+        cur = self.bw_filter[rows, slot]
+        self.bw_filter[rows, slot] = np.where(new, y, np.maximum(cur, y))
+        self.btlbw = self.bw_filter.max(axis=1)
+
+        # Startup ends when the bandwidth grew less than 25% over 3 rounds
+        check = new & ~self.full
+        grew = self.btlbw >= self.full_bw * 1.25
+        self.full_bw = np.where(check & grew, self.btlbw, self.full_bw)
+        self.full_cnt = np.where(check, np.where(grew, 0, self.full_cnt + 1), self.full_cnt)
+        self.full |= self.full_cnt >= 3
+        mode = np.where((self.mode == STARTUP) & self.full, DRAIN, self.mode)
+
+        # 10 s min_rtt filter; on expiry, PROBE_RTT
+        expired = t > self.mr_stamp + 10.0
+        upd = (meas <= self.mr) | expired
+        self.mr = np.where(upd, meas, self.mr)
+        self.mr_stamp = np.where(upd, t, self.mr_stamp)
+        enter = expired & (mode != PROBE_RTT)
+        self.prior_cwnd = np.where(enter, self.cwnd, self.prior_cwnd)
+        self.prt_done = np.where(enter, t + 0.2 + rtt, self.prt_done)
+        mode = np.where(enter, PROBE_RTT, mode)
+        leave = (mode == PROBE_RTT) & (t >= self.prt_done)
+        mode = np.where(leave, np.where(self.full, PROBE_BW, STARTUP), mode)
+        self.mr_stamp = np.where(leave, t, self.mr_stamp)
+        self.cwnd = np.where(leave, np.maximum(self.cwnd, self.prior_cwnd), self.cwnd)
+
+        bdp = self.btlbw * self.mr
+        drained = (mode == DRAIN) & (self.inflight <= bdp)
+        if drained.any():
+            phase = self.rng.integers(1, 8, self.n)
+            self.cycle = np.where(drained, (phase + 1) % 8, self.cycle)   # any phase but 0.75
+            self.cycle_stamp = np.where(drained, t, self.cycle_stamp)
+            mode = np.where(drained, PROBE_BW, mode)
+        adv = (mode == PROBE_BW) & (t - self.cycle_stamp > self.mr)
+        self.cycle = np.where(adv, (self.cycle + 1) % 8, self.cycle)
+        self.cycle_stamp = np.where(adv, t, self.cycle_stamp)
+        self.mode = mode
+
+        pacing_gain = np.select([mode == STARTUP, mode == DRAIN, mode == PROBE_BW],
+                                [BBR_HIGH_GAIN, 1 / BBR_HIGH_GAIN, BBR_CYCLE[self.cycle]], 1.0)
+        cwnd_gain = np.where(mode == PROBE_BW, 2.0, BBR_HIGH_GAIN)
+        self.pacing = pacing_gain * self.btlbw * 0.99
+        target = cwnd_gain * bdp + 3
+        cwnd = np.where(self.full, np.minimum(self.cwnd + acked, target), self.cwnd + acked)
+        self.cwnd = np.where(mode == PROBE_RTT, 4.0, np.maximum(cwnd, 4.0))
+
+    # ====== What ss and iperf3 would report ======
+    def pacing_pkts(self):
+        """sk_pacing_rate: BBR's own, else 2x (slow start) / 1.2x cwnd per srtt."""
+        if self.algo == "bbr":
+            return self.pacing
+        ratio = np.where(self.cwnd < self.ssth / 2, 2.0, 1.2)
+        return ratio * np.maximum(self.cwnd, self.inflight) / self.srtt
+
+
+def simulate(algo, rtt_ms, bw_mbit, duration=30.0, interval=0.5, iv_interval=0.5, mss=MSS,
+             aqm="codel", rwnd_bytes=0, jitter_ms=0.2, substeps=SUBSTEPS, seed=None):
+    """
+    Simulate one flow per entry of bw_mbit (all with rtt_ms). Returns
+    (ss, iv): {column: (n_samples, n)} at the ss sample times ss["t"] and
+    {column: (n_intervals, n)} per iperf3 interval, times in seconds from
+    the test start.
+    """
+    rng = np.random.default_rng(seed)
+    fb = FluidBatch(algo, rtt_ms, bw_mbit, mss, aqm, rwnd_bytes, jitter_ms, rng)
+    dt = min(rtt_ms / 1e3 / substeps, interval, iv_interval)
+    n_steps = int(np.ceil(duration / dt - 1e-9))
+    # ss samples at phase + k * interval; iperf intervals end every iv_interval
+    phase = rng.uniform(0, interval)
+    ss_steps = {int(round(s / dt)): s for s in np.arange(phase, duration, interval)}
+    iv_steps = {int(round(s / dt)): s for s in np.arange(iv_interval, duration + 1e-9, iv_interval)}
+    iv_steps[n_steps] = duration
+
+    ss = {c: [] for c in ["t", "rtt_ms", "rtt_var_ms", "cwnd", "pacing_mbps", "ssthresh",
+                          "acked", "sent", "inflight", "lost"]}
+    iv = {c: [] for c in ["t_end", "acked", "lost", "snd_cwnd", "rtt_us", "rttvar_us"]}
+    for k in range(1, n_steps + 1):
+        fb.step(k * dt, dt)
+        if k in ss_steps:
+            ss["t"].append(ss_steps[k])
+            ss["rtt_ms"].append(fb.srtt * 1e3)
+            ss["rtt_var_ms"].append(fb.rttvar * 1e3)
+            ss["cwnd"].append(fb.cwnd.copy())
+            ss["pacing_mbps"].append(fb.pacing_pkts() * mss * 8 / 1e6)
+            ss["ssthresh"].append(fb.ssth.copy())
+            ss["acked"].append(fb.acked.copy())
+            ss["sent"].append(fb.sent.copy())
+            ss["inflight"].append(fb.inflight)
+            ss["lost"].append(fb.lost.copy())
+        if k in iv_steps:
+            iv["t_end"].append(iv_steps[k])
+            iv["acked"].append(fb.acked.copy())
+            iv["lost"].append(fb.lost.copy())
+            iv["snd_cwnd"].append(fb.cwnd * mss)
+            iv["rtt_us"].append(fb.srtt * 1e6)
+            iv["rttvar_us"].append(fb.rttvar * 1e6)
+    return ({c: np.array(v) for c, v in ss.items()}, {c: np.array(v) for c, v in iv.items()})
+
+
+# ====== Output: the files a testbed run leaves behind ======
+def _data_sample(ss, i, j, mss):
+    cwnd = max(int(ss["cwnd"][i, j]), 1)
+    acked = int(ss["acked"][i, j])
+    sent = int(ss["sent"][i, j])
+    lost = int(ss["lost"][i, j])
+    ssth = ss["ssthresh"][i, j]
+    return {
+        "rtt_ms": float(ss["rtt_ms"][i, j]), "rtt_var_ms": float(ss["rtt_var_ms"][i, j]),
+        "cwnd": cwnd, "mss": mss, "pacing_mbps": float(ss["pacing_mbps"][i, j]),
+        "ssthresh": int(ssth) if np.isfinite(ssth) else SSTHRESH_UNSET,
+        "bytes_acked": acked * mss + 1, "bytes_sent": sent * mss,
+        "bytes_received": 0, "segs_out": sent + 3, "segs_in": acked // 2 + 2,
+        "unacked": int(ss["inflight"][i, j]), "retrans_total": lost,
+    }
+
+
+def write_run(out_root, algo, rtt_ms, bw_mbit, run, ss, iv, j, fmt="text", mss=MSS,
+              duration=30.0, wall0=None, mono0=None):
+    """Write flow j of a simulate() result as <out_root>/ss/<run>.log and <out_root>/iperf/<run>.json."""
+    name = f"{algo}_rtt{rtt_ms}_bw{bw_mbit}_run{run}"
+    ss_path = os.path.join(out_root, "ss", name + ".log")
+    if fmt != "text":
+        ss_path = os.path.splitext(ss_path)[0] + "." + fmt
+    # wall0 / mono0: clocks at interval 0. iperf3 stamps timesecs (truncated to
+    # the second) before the control exchange and connect, a few RTTs earlier
+    if wall0 is None:
+        wall0 = 1.77e9 + run * 3600 + rtt_ms * 60 + bw_mbit + (run * 0.618034) % 1
+    mono0 = mono0 if mono0 is not None else 5e5 + (wall0 % 86400)
+    timesecs = int(wall0 - 3 * rtt_ms / 1e3)
+
+    writer = open_writer(ss_path, algo, fmt)
+    flows = FlowTable()
+    control = dict(CONTROL, algo=algo, mss=mss, rtt_ms=rtt_ms * 1.5, rtt_var_ms=rtt_ms * 0.75,
+                   pacing_mbps=2 * INIT_CWND * mss * 8 / (rtt_ms * 1.5e3),
+                   sock=("10.0.0.1", 39668, "10.0.0.2", 5201, 1001))
+    for i, t in enumerate(ss["t"].tolist()):
+        wall = datetime.datetime.fromtimestamp(wall0 + t)
+        mono = mono0 + t
+        samples = [dict(control), dict(_data_sample(ss, i, j, mss), algo=algo,
+                                       sock=("10.0.0.1", 39670, "10.0.0.2", 5201, 1002))]
+        flows.observe(mono, samples)
+        for s in samples:
+            writer.append(wall, mono, s)
+    writer.close()
+    flows.write(ss_path + ".flows")
+
+    t_end = iv["t_end"].tolist()
+    t_start = [0.0] + t_end[:-1]
+    acked = np.concatenate([[0.0], iv["acked"][:, j]])
+    lost = np.concatenate([[0.0], iv["lost"][:, j]])
+    intervals = []
+    for k in range(len(t_end)):
+        sec = t_end[k] - t_start[k]
+        nbytes = int((acked[k + 1] - acked[k]) * mss)
+        stream = {"socket": 5, "start": t_start[k], "end": t_end[k], "seconds": sec, "bytes": nbytes,
+                  "bits_per_second": nbytes * 8 / sec, "retransmits": int(lost[k + 1]) - int(lost[k]),
+                  "snd_cwnd": int(iv["snd_cwnd"][k, j]), "rtt": int(iv["rtt_us"][k, j]),
+                  "rttvar": int(iv["rttvar_us"][k, j]), "pmtu": PMTU, "omitted": False, "sender": True}
+        summed = {c: stream[c] for c in ["start", "end", "seconds", "bytes", "bits_per_second",
+                                         "retransmits", "omitted", "sender"]}
+        intervals.append({"streams": [stream], "sum": summed})
+    rtts = iv["rtt_us"][:, j]
+    total = int(acked[-1] * mss)
+    sender = {"socket": 5, "start": 0, "end": duration, "seconds": duration, "bytes": total,
+              "bits_per_second": total * 8 / duration, "retransmits": int(lost[-1]),
+              "max_snd_cwnd": int(iv["snd_cwnd"][:, j].max()), "max_rtt": int(rtts.max()),
+              "min_rtt": int(rtts.min()), "mean_rtt": int(rtts.mean()), "sender": True}
+    receiver = {"socket": 5, "start": 0, "end": duration + rtt_ms / 1e3, "seconds": duration,
+                "bytes": total, "bits_per_second": total * 8 / duration, "sender": True}
+    report = {
+        "start": {"version": "iperf 3.9", "system_info": "fluid_sim.py",
+                  "timestamp": {"time": datetime.datetime.fromtimestamp(timesecs, datetime.timezone.utc).strftime(
+                      "%a, %d %b %Y %H:%M:%S GMT"), "timesecs": timesecs},
+                  "tcp_mss_default": mss,
+                  "test_start": {"protocol": "TCP", "num_streams": 1, "omit": 0, "duration": duration}},
+        "intervals": intervals,
+        "end": {"streams": [{"sender": sender, "receiver": receiver}],
+                "sum_sent": {k: sender[k] for k in ["start", "end", "seconds", "bytes",
+                                                     "bits_per_second", "retransmits", "sender"]},
+                "sum_received": {k: receiver[k] for k in ["start", "end", "seconds", "bytes",
+                                                           "bits_per_second", "sender"]},
+                "sender_tcp_congestion": algo, "receiver_tcp_congestion": "cubic"},
+    }
+    # Compact: json.dumps stays in C without indent, and every reader takes either
+    with open(os.path.join(out_root, "iperf", name + ".json"), "w") as f:
+        f.write(json.dumps(report))
+    return ss_path
+
+
+def run_group(task):
+    """Simulate and write one (algo, rtt) batch of (bw, run) cells. Returns (flows, sim s, write s)."""
+    algo, rtt, cells, opts, seed = task
+    t0 = time.perf_counter()
+    ss, iv = simulate(algo, rtt, [bw for bw, _ in cells], duration=opts["duration"],
+                      interval=opts["interval"], aqm=opts["aqm"], rwnd_bytes=opts["rwnd_bytes"],
+                      jitter_ms=opts["jitter_ms"], seed=seed)
+    t1 = time.perf_counter()
+    if opts["out_root"]:
+        for j, (bw, run) in enumerate(cells):
+            write_run(opts["out_root"], algo, rtt, bw, run, ss, iv, j, opts["format"],
+                      duration=opts["duration"])
+    return len(cells), t1 - t0, time.perf_counter() - t1
+
+
+def make_tasks(algos, rtts, bws, runs, batch, opts, seed=0, first_run=1):
+    tasks = []
+    for a, algo in enumerate(algos):
+        for rtt in rtts:
+            cells = [(bw, run) for bw in bws for run in range(first_run, first_run + runs)]
+            for c in range(0, len(cells), batch):
+                tasks.append((algo, rtt, cells[c:c + batch], opts, [seed, a, rtt, c]))
+    # Longest first: small RTTs need the most steps
+    tasks.sort(key=lambda task: task[1])
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out_root", default="logs_sim", help="writes <out_root>/ss and <out_root>/iperf")
+    parser.add_argument("--algos", nargs="+", default=ALGOS, choices=ALGOS)
+    parser.add_argument("--rtts", nargs="+", type=int, default=RTTS, help="ms")
+    parser.add_argument("--bws", nargs="+", type=int, default=BWS, help="Mbit/s")
+    parser.add_argument("--runs", type=int, default=5, help="runs per (algo, rtt, bw) cell")
+    parser.add_argument("--first_run", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--interval", type=float, default=0.5, help="ss sample interval (s)")
+    parser.add_argument("--format", choices=["text", "ssb", "ssz"], default="text")
+    parser.add_argument("--aqm", choices=["codel", "droptail"], default="codel",
+                        help="codel: fq_codel under netem like config_link; droptail: queue limit only")
+    parser.add_argument("--rwnd_kb", type=float, default=0, help="receive window cap (KB, 0: none)")
+    parser.add_argument("--jitter_ms", type=float, default=0.2, help="rtt measurement noise")
+    parser.add_argument("--batch", type=int, default=1024, help="flows stepped together")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for sub in ("ss", "iperf"):
+        os.makedirs(os.path.join(args.out_root, sub), exist_ok=True)
+    opts = {"out_root": args.out_root, "duration": args.duration, "interval": args.interval,
+            "format": args.format, "aqm": args.aqm, "rwnd_bytes": args.rwnd_kb * 1000,
+            "jitter_ms": args.jitter_ms}
+    tasks = make_tasks(args.algos, args.rtts, args.bws, args.runs, args.batch, opts, args.seed,
+                       args.first_run)
+    jobs = args.jobs or os.cpu_count()
+    t0 = time.perf_counter()
+    n = sim_s = write_s = 0
+    with ProcessPoolExecutor(jobs) as pool:
+        for flows, s, w in pool.map(run_group, tasks):
+            n, sim_s, write_s = n + flows, sim_s + s, write_s + w
+    wall = time.perf_counter() - t0
+    print(f"[OK] {n} flows in {wall:.1f} s on {jobs} workers: {n / wall:.0f} flows/s "
+          f"(per worker: simulate {n / sim_s:.0f} flows/s, write {n / write_s:.0f} flows/s)")
+    print(f"[OK] saved: {args.out_root}/ss, {args.out_root}/iperf")
+
+
+if __name__ == "__main__":
+    main()
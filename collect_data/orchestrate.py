@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Parallel version of run_experiments.sh on a single host.
+
+Builds N isolated lanes, each one a network namespace with a local iperf3
+server behind a veth pair:
+
+    root ns                               lane ns "cclane<i>"
+    iperf3 -c  --> veth cc<i>a ===== veth cc<i>b --> iperf3 -s
+                   10.201.<i>.1          10.201.<i>.2
+                   HTB + netem + fq_codel (same chain as config_link)
+
+Grid cells (rtt, bw, algo, run) are handed out to the lanes from one queue;
+a lane only reconfigures its qdisc when the (rtt, bw) condition changes.
+All flows are sampled by one in-process ss_daemon Collector. Finished cells
+are appended to <log_root>/progress.jsonl, so a killed sweep resumes where
+it stopped; a cell is only "ok" when iperf3 succeeded and its ss log got
+samples from a live collector, anything else is run again on resume.
+Needs root (ip netns / tc).
+
+Example:
+  sudo python3 orchestrate.py --lanes 4
+  sudo python3 orchestrate.py --lanes 4 --dry_run     # print commands only
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from ss_daemon import Collector
+
+PORT = 5201
+
+
+def calc_queue_pkts(rtt_ms, bw_mbit, mss):
+    """Queue limit (packets) ≈ 1 BDP, at least 10 (same as run_experiments.sh)."""
+    num = bw_mbit * 1000 * rtt_ms
+    den = 8 * mss
+    return max(10, (num + den - 1) // den)
+
+
+class Lane:
+    def __init__(self, idx, dry_run=False):
+        self.idx = idx
+        self.ns = f"cclane{idx}"
+        self.veth = f"cc{idx}a"
+        self.peer = f"cc{idx}b"
+        self.local_ip = f"10.201.{idx}.1"
+        self.server_ip = f"10.201.{idx}.2"
+        self.dry_run = dry_run
+        self.cond = None
+        self.server = None
+
+    def sh(self, *cmd, check=True):
+        if self.dry_run:
+            print(f"[lane {self.idx}] $ {' '.join(cmd)}")
+            return
+        subprocess.run(cmd, check=check, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def setup(self):
+        self.teardown()
+        self.sh("ip", "netns", "add", self.ns)
+        self.sh("ip", "link", "add", self.veth, "type", "veth", "peer", "name", self.peer)
+        self.sh("ip", "link", "set", self.peer, "netns", self.ns)
+        self.sh("ip", "addr", "add", f"{self.local_ip}/30", "dev", self.veth)
+        self.sh("ip", "link", "set", self.veth, "up")
+        self.sh("ip", "netns", "exec", self.ns, "ip", "addr", "add", f"{self.server_ip}/30", "dev", self.peer)
+        self.sh("ip", "netns", "exec", self.ns, "ip", "link", "set", self.peer, "up")
+        self.sh("ip", "netns", "exec", self.ns, "ip", "link", "set", "lo", "up")
+
+        cmd = ["ip", "netns", "exec", self.ns, "iperf3", "-s", "-p", str(PORT), "-B", self.server_ip]
+        if self.dry_run:
+            print(f"[lane {self.idx}] $ {' '.join(cmd)} &")
+        else:
+            self.server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(0.5)
+
+    def config_link(self, rtt_ms, bw_mbit, q_pkts):
+        """HTB rate limit -> netem delay/limit -> fq_codel, on the client side egress."""
+        if self.cond == (rtt_ms, bw_mbit):
+            return
+        dev = self.veth
+        self.sh("tc", "qdisc", "del", "dev", dev, "root", check=False)
+        self.sh("tc", "qdisc", "add", "dev", dev, "root", "handle", "1:", "htb", "default", "1")
+        self.sh("tc", "class", "add", "dev", dev, "parent", "1:", "classid", "1:1",
+                "htb", "rate", f"{bw_mbit}mbit", "ceil", f"{bw_mbit}mbit")
+        self.sh("tc", "qdisc", "add", "dev", dev, "parent", "1:1", "handle", "10:", "netem",
+                "delay", f"{rtt_ms}ms", "limit", str(q_pkts))
+        self.sh("tc", "qdisc", "add", "dev", dev, "parent", "10:", "handle", "20:", "fq_codel")
+        self.cond = (rtt_ms, bw_mbit)
+
+    def teardown(self):
+        if self.server is not None:
+            self.server.terminate()
+            self.server.wait()
+            self.server = None
+        # Deleting the namespace also removes the veth pair
+        self.sh("ip", "netns", "del", self.ns, check=False)
+        self.cond = None
+
+
+def load_done(progress_path):
+    done = set()
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # partial line from a killed run
+                if rec.get("status") == "ok":
+                    done.add(rec["flow_id"])
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lanes", type=int, default=4)
+    parser.add_argument("--algos", nargs="+", default=["bbr", "cubic", "reno", "vegas"])
+    parser.add_argument("--rtts", nargs="+", type=int, default=[10, 50, 100, 200])
+    parser.add_argument("--bws", nargs="+", type=int, default=[10, 50, 100, 500])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--duration", type=int, default=30, help="seconds per flow")
+    parser.add_argument("--mss", type=int, default=1460)
+    parser.add_argument("--interval", type=float, default=0.5, help="ss sampling interval")
+    parser.add_argument("--log_root", default="logs")
+    parser.add_argument("--dry_run", action="store_true")
+    args = parser.parse_args()
+
+    ss_dir = os.path.join(args.log_root, "ss")
+    iperf_dir = os.path.join(args.log_root, "iperf")
+    os.makedirs(ss_dir, exist_ok=True)
+    os.makedirs(iperf_dir, exist_ok=True)
+    progress_path = os.path.join(args.log_root, "progress.jsonl")
+
+    # Same grid and order as run_experiments.sh, minus what is already done
+    done = load_done(progress_path)
+    cells = queue.Queue()
+    total = skipped = 0
+    for rtt, bw, algo, run in itertools.product(args.rtts, args.bws, args.algos,
+                                                range(1, args.runs + 1)):
+        total += 1
+        flow_id = f"{algo}_rtt{rtt}_bw{bw}_run{run}"
+        if flow_id in done:
+            skipped += 1
+            continue
+        cells.put((rtt, bw, algo, run, flow_id))
+    todo = cells.qsize()
+    print(f"[grid] {total} cells, {skipped} already done, {todo} to run on {args.lanes} lanes")
+    if todo == 0:
+        return
+
+    collector = sampling = None
+    if not args.dry_run:
+        collector = Collector(interval=args.interval)
+        sampling = threading.Thread(target=collector.run, daemon=True)
+        sampling.start()
+
+    lanes = [Lane(i, args.dry_run) for i in range(args.lanes)]
+    progress_lock = threading.Lock()
+    # A dry run must not mark cells as done
+    progress_f = open(os.devnull if args.dry_run else progress_path, "a")
+    finished = [0]
+
+    def run_cell(lane, rtt, bw, algo, run, flow_id):
+        lane.config_link(rtt, bw, calc_queue_pkts(rtt, bw, args.mss))
+        ss_log = os.path.abspath(os.path.join(ss_dir, f"{flow_id}.log"))
+        iperf_log = os.path.join(iperf_dir, f"{flow_id}.json")
+        cmd = ["iperf3", "-c", lane.server_ip, "-p", str(PORT),
+               "-t", str(args.duration), "-C", algo, "-i", "0.5", "-J"]
+        if args.dry_run:
+            print(f"[lane {lane.idx}] $ {' '.join(cmd)} > {iperf_log}")
+            return "ok"
+
+        resp = collector.handle({"cmd": "register", "port": PORT, "dst": lane.server_ip,
+                                 "algo": algo, "output": ss_log})
+        if not resp.get("ok"):
+            return f"register failed: {resp.get('error')}"
+        try:
+            with open(iperf_log, "w") as out:
+                rc = subprocess.run(cmd, stdout=out, stderr=subprocess.DEVNULL).returncode
+        finally:
+            resp = collector.handle({"cmd": "unregister", "output": ss_log})
+        if rc != 0:
+            return f"iperf3 exit {rc}"
+        # Only an ok cell is skipped on resume: its ss log must be complete
+        if not sampling.is_alive():
+            return "collector died"
+        if not resp.get("records"):
+            return "no ss samples"
+        return "ok"
+
+    def worker(lane):
+        while True:
+            if sampling is not None and not sampling.is_alive():
+                # Cells left in the queue are not recorded and run on resume
+                print(f"[lane {lane.idx}] collector thread died, stopping", file=sys.stderr)
+                return
+            try:
+                rtt, bw, algo, run, flow_id = cells.get_nowait()
+            except queue.Empty:
+                return
+            t0 = time.time()
+            try:
+                status = run_cell(lane, rtt, bw, algo, run, flow_id)
+            except Exception as e:
+                status = f"error: {e}"
+            with progress_lock:
+                finished[0] += 1
+                progress_f.write(json.dumps({
+                    "flow_id": flow_id, "lane": lane.idx, "status": status,
+                    "start": t0, "seconds": round(time.time() - t0, 3),
+                }) + "\n")
+                progress_f.flush()
+                print(f"[lane {lane.idx}] {flow_id}: {status} ({finished[0]}/{todo})")
+
+    t_start = time.time()
+    try:
+        for lane in lanes:
+            lane.setup()
+        threads = [threading.Thread(target=worker, args=(lane,)) for lane in lanes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        if collector is not None:
+            collector.stopping.set()
+        for lane in lanes:
+            lane.teardown()
+        progress_f.close()
+
+    elapsed = time.time() - t_start
+    if elapsed > 0 and not args.dry_run:
+        print(f"[done] {finished[0]} flows in {elapsed:.0f} s "
+              f"-> {finished[0] * 3600 / elapsed:.1f} flows/hour")
+
+
+if __name__ == "__main__":
+    if os.geteuid() != 0 and "--dry_run" not in sys.argv:
+        raise SystemExit("orchestrate.py needs root (ip netns / tc); use --dry_run to preview")
+    main()
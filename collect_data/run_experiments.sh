@@ -22,6 +22,12 @@ BWS=(10 50 100 500)
 # Number of runs per (algo, rtt, bw) combination
 RUNS=5
 
+# ss sampling: one long-lived ss_daemon.py for the whole sweep
+# (set COLLECTOR=per_flow to start a collect_ss.py process per flow instead)
+COLLECTOR="${COLLECTOR:-daemon}"
+SS_SOCK="/tmp/ss_daemon.$$.sock"
+SS_INTERVAL=0.5
+
 # Top-level log directories
 LOG_ROOT="logs"
 LOG_SS_DIR="${LOG_ROOT}/ss"
@@ -84,28 +90,55 @@ run_one_flow() {
     local ss_log="${LOG_SS_DIR}/${flow_id}.log"
     local iperf_log="${LOG_IPERF_DIR}/${flow_id}.json"
 
-    # Start ss collector in the background
-    python3 collect_ss.py \
-        --port "${PORT}" \
-        --dst "${SERVER_IP}" \
-        --interval 0.5 \
-        --algo "${algo}" \
-        --output "${ss_log}" &
-    local ss_pid=$!
+    local ss_pid=""
+    if [[ "${COLLECTOR}" == "daemon" ]]; then
+        # Register this flow with the running collector daemon
+        python3 ss_daemon.py register --sock "${SS_SOCK}" \
+            --port "${PORT}" \
+            --dst "${SERVER_IP}" \
+            --algo "${algo}" \
+            --output "${ss_log}" >/dev/null
+    else
+        # Start ss collector in the background
+        python3 collect_ss.py \
+            --port "${PORT}" \
+            --dst "${SERVER_IP}" \
+            --interval "${SS_INTERVAL}" \
+            --algo "${algo}" \
+            --output "${ss_log}" &
+        ss_pid=$!
+    fi
 
     # Run iperf3 (single flow)
     iperf3 -c "${SERVER_IP}" -p "${PORT}" \
            -t "${DURATION}" -C "${algo}" \
            -i 0.5 -J > "${iperf_log}" || true
 
-    # Stop ss collector
-    kill "${ss_pid}" 2>/dev/null || true
-    wait "${ss_pid}" 2>/dev/null || true
+    # Stop ss collection for this flow
+    if [[ -n "${ss_pid}" ]]; then
+        kill "${ss_pid}" 2>/dev/null || true
+        wait "${ss_pid}" 2>/dev/null || true
+    else
+        python3 ss_daemon.py unregister --sock "${SS_SOCK}" \
+            --output "${ss_log}" >/dev/null || true
+    fi
 
     echo "==== Done: ${flow_id} ===="
     sleep 2
 }
 
+# Start the collector daemon once for the whole sweep
+if [[ "${COLLECTOR}" == "daemon" ]]; then
+    python3 ss_daemon.py serve --sock "${SS_SOCK}" --interval "${SS_INTERVAL}" &
+    SS_DAEMON_PID=$!
+    trap 'kill "${SS_DAEMON_PID}" 2>/dev/null || true' EXIT
+    # Wait for the control socket to appear
+    for _ in $(seq 1 50); do
+        [[ -S "${SS_SOCK}" ]] && break
+        sleep 0.1
+    done
+fi
+
 # Main experiment loop: for each RTT × BW combination
 for rtt in "${RTTS[@]}"; do
     for bw in "${BWS[@]}"; do
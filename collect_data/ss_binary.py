@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Fixed-width binary format for ss samples (.ssb).
+
+File layout:
+  b"SSB1" | u32 header_len | JSON header (padded to 8 bytes) | records...
+
+The JSON header holds the column list, the struct format and the algo of the
+flow (constant per file, so it is not repeated in every record). Records are
+packed little-endian structs, RECORD_SIZE bytes each, with wall_time stored
+as epoch seconds.
+
+Writing only needs the standard library (the collector host may not have
+NumPy); reading maps the file straight into a NumPy structured array, so
+columns are views into the page cache and nothing is copied or parsed.
+
+Convert existing text logs:
+  python3 ss_binary.py logs/ss/*.log            # writes logs/ss/*.ssb
+  python3 ss_binary.py --out_dir logs/ssb logs/ss/*.log
+"""
+import argparse
+import datetime
+import json
+import os
+import struct
+import time
+
+MAGIC = b"SSB1"
+VERSION = 2
+
+# (column, struct code); order is the same as the text log header minus algo.
+# v2 added flow (FlowTable id of the socket, 0 = unknown); v1 files are
+# still read through their header's struct format (LAYOUTS).
+COLUMNS_V1 = [
+    ("wall_time", "d"),
+    ("monotonic", "d"),
+    ("rtt_ms", "d"),
+    ("rtt_var_ms", "d"),
+    ("cwnd", "I"),
+    ("mss", "I"),
+    ("pacing_mbps", "d"),
+    ("ssthresh", "i"),
+    ("unacked", "I"),
+    ("bytes_acked", "Q"),
+    ("bytes_sent", "Q"),
+    ("bytes_received", "Q"),
+    ("segs_out", "I"),
+    ("segs_in", "I"),
+    ("retrans_total", "Q"),
+]
+COLUMNS = COLUMNS_V1 + [("flow", "I")]
+COLUMN_NAMES = [c for c, _ in COLUMNS]
+RECORD = struct.Struct("<" + "".join(code for _, code in COLUMNS))
+RECORD_SIZE = RECORD.size
+
+# struct format -> columns, for every layout this module can read
+LAYOUTS = {"<" + "".join(code for _, code in cols): cols for cols in (COLUMNS_V1, COLUMNS)}
+
+# Text log columns (collect_ss.py header); newer logs end with a flow column
+TEXT_COLS = [
+    "wall_time", "monotonic", "algo",
+    "rtt_ms", "rtt_var_ms",
+    "cwnd", "mss", "pacing_mbps",
+    "ssthresh",
+    "bytes_acked", "bytes_sent", "bytes_received",
+    "segs_out", "segs_in", "unacked", "retrans_total",
+]
+
+
+def _numpy_dtype(columns=COLUMNS):
+    import numpy as np
+
+    codes = {"d": "<f8", "I": "<u4", "i": "<i4", "Q": "<u8"}
+    return np.dtype([(name, codes[code]) for name, code in columns])
+
+
+def layout(header):
+    """(columns, struct.Struct) of the records of a file with this header."""
+    cols = LAYOUTS[header["struct"]]
+    return cols, struct.Struct(header["struct"])
+
+
+def _encode_header(algo, extra=None):
+    header = {
+        "version": VERSION,
+        "algo": algo,
+        "columns": COLUMN_NAMES,
+        "struct": RECORD.format,
+        "record_size": RECORD_SIZE,
+    }
+    if extra:
+        header.update(extra)
+    raw = json.dumps(header).encode()
+    # Pad so the first record starts on an 8-byte boundary
+    pad = (-(len(MAGIC) + 4 + len(raw))) % 8
+    raw += b" " * pad
+    return MAGIC + struct.pack("<I", len(raw)) + raw
+
+
+def read_header(path):
+    """Return (header dict, byte offset of the first record)."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an .ssb file")
+        (hlen,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(hlen))
+    if header.get("struct") not in LAYOUTS:
+        raise ValueError(f"{path}: unsupported record layout {header.get('struct')}")
+    return header, 8 + hlen
+
+
+class BufferedRecordWriter:
+    """
+    Append ss samples to an .ssb file through a bounded in-memory buffer.
+
+    The buffer is written out when it holds max_bytes or when max_age seconds
+    have passed since the last write, whichever comes first, so a crash loses
+    at most max_age seconds of samples and steady state costs one write()
+    per buffer instead of one per record.
+    """
+
+    def __init__(self, path, algo, max_bytes=64 * 1024, max_age=1.0, extra_header=None):
+        self.f = open(path, "wb")
+        self.f.write(_encode_header(algo, extra_header))
+        self.f.flush()
+        self.buf = bytearray()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.last_flush = time.monotonic()
+        self.records = 0
+
+    def append(self, wall_epoch, mono, s):
+        self.buf += RECORD.pack(
+            wall_epoch, mono,
+            s["rtt_ms"], s["rtt_var_ms"], s["cwnd"], s["mss"],
+            s["pacing_mbps"], s["ssthresh"], s["unacked"],
+            s["bytes_acked"], s["bytes_sent"], s["bytes_received"],
+            s["segs_out"], s["segs_in"], s["retrans_total"], s.get("flow", 0),
+        )
+        self.records += 1
+        if len(self.buf) >= self.max_bytes:
+            self.flush()
+
+    def maybe_flush(self, now=None):
+        """Flush if the oldest buffered record is older than max_age."""
+        if now is None:
+            now = time.monotonic()
+        if self.buf and now - self.last_flush >= self.max_age:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            self.f.write(self.buf)
+            self.buf.clear()
+        self.f.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_ssb(path):
+    """
+    Memory-map an .ssb file.
+    Returns (header, records) where records is a read-only NumPy structured
+    array backed by the file; records["cwnd"] etc. are zero-copy views.
+    A trailing partial record (collector killed mid-write) is ignored.
+    """
+    import numpy as np
+
+    header, offset = read_header(path)
+    cols, rec = layout(header)
+    dtype = _numpy_dtype(cols)
+    n = (os.path.getsize(path) - offset) // rec.size
+    if n == 0:
+        return header, np.empty(0, dtype=dtype)
+    records = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n,))
+    return header, records
+
+
+def open_records(path):
+    """(header, records) of a binary log: .ssb memory-mapped, .ssz decoded (ss_compressed.py)."""
+    if path.endswith(".ssz"):
+        import ss_compressed
+
+        return ss_compressed.open_ssz(path)
+    return open_ssb(path)
+
+
+def load_columns(path):
+    """Return {column: ndarray view} plus "algo" from the header (.ssb or .ssz)."""
+    header, records = open_records(path)
+    cols = {name: records[name] for name in records.dtype.names}
+    cols["algo"] = header["algo"]
+    return cols
+
+
+def iter_text_log(path):
+    """Yield (algo, wall_epoch, mono, sample dict) from a collect_ss.py text log."""
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < len(TEXT_COLS) or parts[0] == "wall_time":
+                continue
+            rec = dict(zip(TEXT_COLS, parts))
+            wall_epoch = datetime.datetime.fromisoformat(rec["wall_time"]).timestamp()
+            # Logs written before the flow column read as flow 0 (unknown)
+            flow = int(parts[len(TEXT_COLS)]) if len(parts) > len(TEXT_COLS) else 0
+            sample = {
+                "rtt_ms": float(rec["rtt_ms"]),
+                "rtt_var_ms": float(rec["rtt_var_ms"]),
+                "cwnd": int(rec["cwnd"]),
+                "mss": int(rec["mss"]),
+                "pacing_mbps": float(rec["pacing_mbps"]),
+                "ssthresh": int(rec["ssthresh"]),
+                "unacked": int(rec["unacked"]),
+                "bytes_acked": int(rec["bytes_acked"]),
+                "bytes_sent": int(rec["bytes_sent"]),
+                "bytes_received": int(rec["bytes_received"]),
+                "segs_out": int(rec["segs_out"]),
+                "segs_in": int(rec["segs_in"]),
+                "retrans_total": int(rec["retrans_total"]),
+                "flow": flow,
+            }
+            yield rec["algo"], wall_epoch, float(rec["monotonic"]), sample
+
+
+def convert_text_log(src, dst):
+    """Convert one text ss log into an .ssb file. Returns the record count."""
+    rows = list(iter_text_log(src))
+    algo = rows[0][0] if rows else "unknown"
+    with BufferedRecordWriter(dst, algo, max_bytes=1 << 20, max_age=float("inf"),
+                              extra_header={"source": os.path.basename(src)}) as w:
+        for _, wall_epoch, mono, sample in rows:
+            w.append(wall_epoch, mono, sample)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="convert text ss logs to .ssb")
+    parser.add_argument("logs", nargs="+", help="text ss logs (*.log)")
+    parser.add_argument("--out_dir", default=None, help="default: next to each log")
+    args = parser.parse_args()
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    total_in = total_out = 0
+    for src in args.logs:
+        base = os.path.splitext(os.path.basename(src))[0] + ".ssb"
+        dst = os.path.join(args.out_dir or os.path.dirname(src), base)
+        n = convert_text_log(src, dst)
+        total_in += os.path.getsize(src)
+        total_out += os.path.getsize(dst)
+        print(f"[OK] {src} -> {dst} ({n} records)")
+
+    if total_out:
+        print(f"text {total_in} bytes -> binary {total_out} bytes "
+              f"({total_in / total_out:.2f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Delta-encoded, block-compressed storage for ss samples (.ssz).
+
+Most columns of an ss log barely change from one sample to the next, and the
+counters (bytes_acked, bytes_sent, segs_out, segs_in, retrans_total, ...)
+only grow, so the fixed-width .ssb records spend most of their bytes on high
+bits that repeat. Here every column is stored as integers at a fixed scale,
+delta-coded against the previous row of the same flow, zigzag-mapped and
+written as LEB128 varints; the varint streams of a block are then compressed
+with zstd (zstandard), lz4 (lz4.frame) or zlib, whichever is available at
+write time (or the one asked for).
+
+File layout:
+  b"SSZ1" | u32 header_len | JSON header | blocks...
+  block:  u32 rows | u32 compressed_len | compressed payload
+  payload (decompressed): per column, u32 len | varints of the block
+
+The header holds the columns (those of .ssb v2), their scales, the codec and
+the algo. Floats are kept at their source resolution: wall_time to the µs,
+monotonic to the ns, rtt to the µs, pacing to the bit/s (the text log writes
+no more digits than that, so text -> .ssz -> floats is exact). Each block
+starts its deltas from zero, so blocks decode on their own and a block cut
+short by a crash is dropped, like the partial record of an .ssb file.
+
+Writing only needs the standard library. Reading decodes all blocks of a
+column at once in NumPy (varints, zigzag, per-flow cumulative sums) into
+the same structured array as ss_binary.open_ssb, so readers of .ssb work
+unchanged.
+
+Convert existing text logs:
+  python3 ss_compressed.py logs/ss/*.log            # writes logs/ss/*.ssz
+  python3 ss_compressed.py --codec zlib --out_dir logs/ssz logs/ss/*.log
+"""
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+
+from ss_binary import COLUMNS, iter_text_log
+
+MAGIC = b"SSZ1"
+VERSION = 1
+
+COLUMN_NAMES = [c for c, _ in COLUMNS]
+# Floats are stored as round(value * scale); every other column is an integer
+SCALES = {"wall_time": 10 ** 6, "monotonic": 10 ** 9, "rtt_ms": 10 ** 3,
+          "rtt_var_ms": 10 ** 3, "pacing_mbps": 10 ** 6}
+FLOW_COL = COLUMN_NAMES.index("flow")
+ZERO_ROW = (0,) * len(COLUMN_NAMES)
+
+U32 = struct.Struct("<I")
+BLOCK = struct.Struct("<II")
+
+
+def _codecs():
+    """name -> (compress, decompress) of the codecs importable here, best first."""
+    found = {}
+    try:
+        import zstandard
+
+        found["zstd"] = (zstandard.ZstdCompressor(level=9).compress,
+                         zstandard.ZstdDecompressor().decompress)
+    except ImportError:
+        pass
+    try:
+        import lz4.frame
+
+        found["lz4"] = (lz4.frame.compress, lz4.frame.decompress)
+    except ImportError:
+        pass
+    found["zlib"] = (lambda raw: zlib.compress(raw, 9), zlib.decompress)
+    found["none"] = (bytes, bytes)
+    return found
+
+
+CODECS = _codecs()
+DEFAULT_CODEC = next(iter(CODECS))
+
+
+def _encode_header(algo, codec, extra=None):
+    header = {
+        "version": VERSION,
+        "algo": algo,
+        "columns": COLUMN_NAMES,
+        "scales": SCALES,
+        "codec": codec,
+    }
+    if extra:
+        header.update(extra)
+    raw = json.dumps(header).encode()
+    return MAGIC + U32.pack(len(raw)) + raw
+
+
+def read_header(path):
+    """Return (header dict, byte offset of the first block)."""
+    with open(path, "rb") as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path}: not an .ssz file")
+        (hlen,) = U32.unpack(f.read(4))
+        header = json.loads(f.read(hlen))
+    if header.get("codec") not in CODECS:
+        raise ValueError(f"{path}: codec {header.get('codec')} is not available")
+    return header, 8 + hlen
+
+
+def _put_varint(buf, v):
+    while v > 0x7F:
+        buf.append((v & 0x7F) | 0x80)
+        v >>= 7
+    buf.append(v)
+
+
+class CompressedRecordWriter:
+    """
+    Append ss samples to an .ssz file, one compressed block per flush.
+
+    Samples are varint-coded as they come in; a block is compressed and
+    written when it holds max_rows samples or when max_age seconds have
+    passed since the last write. Larger blocks compress better, and a crash
+    loses at most max_age seconds of samples.
+    """
+
+    def __init__(self, path, algo, codec=None, max_rows=4096, max_age=10.0, extra_header=None):
+        self.codec = codec or DEFAULT_CODEC
+        self.compress = CODECS[self.codec][0]
+        self.f = open(path, "wb")
+        self.f.write(_encode_header(algo, self.codec, extra_header))
+        self.f.flush()
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.last_flush = time.monotonic()
+        self.records = 0
+        self._reset()
+
+    def _reset(self):
+        self.cols = [bytearray() for _ in COLUMN_NAMES]
+        self.prev = {}          # flow id -> previous row (scaled ints) in this block
+        self.prev_flow = 0
+        self.rows = 0
+
+    def append(self, wall_epoch, mono, s):
+        flow = s.get("flow", 0)
+        row = (
+            round(wall_epoch * 10 ** 6), round(mono * 10 ** 9),
+            round(s["rtt_ms"] * 10 ** 3), round(s["rtt_var_ms"] * 10 ** 3),
+            s["cwnd"], s["mss"], round(s["pacing_mbps"] * 10 ** 6), s["ssthresh"], s["unacked"],
+            s["bytes_acked"], s["bytes_sent"], s["bytes_received"],
+            s["segs_out"], s["segs_in"], s["retrans_total"], flow,
+        )
+        # The flow column is delta-coded against the previous row, the rest
+        # against the previous row of the same flow
+        base = list(self.prev.get(flow, ZERO_ROW))
+        base[FLOW_COL] = self.prev_flow
+        for buf, v, b in zip(self.cols, row, base):
+            d = v - b
+            z = d << 1 if d >= 0 else (-d << 1) - 1
+            if z < 0x80:
+                buf.append(z)
+            else:
+                _put_varint(buf, z)
+        self.prev[flow] = row
+        self.prev_flow = flow
+        self.rows += 1
+        self.records += 1
+        if self.rows >= self.max_rows:
+            self.flush()
+
+    def maybe_flush(self, now=None):
+        """Flush if the oldest buffered sample is older than max_age."""
+        if now is None:
+            now = time.monotonic()
+        if self.rows and now - self.last_flush >= self.max_age:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            payload = b"".join(U32.pack(len(buf)) + buf for buf in self.cols)
+            packed = self.compress(payload)
+            self.f.write(BLOCK.pack(self.rows, len(packed)) + packed)
+            self._reset()
+        self.f.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_blocks(path, tail=None):
+    """
+    Yield (rows, payload) of the complete blocks of an .ssz file, only the
+    last `tail` ones if given (block headers are read, payloads skipped).
+    """
+    header, offset = read_header(path)
+    decompress = CODECS[header["codec"]][1]
+    size = os.path.getsize(path)
+    spans = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while offset + BLOCK.size <= size:
+            rows, clen = BLOCK.unpack(f.read(BLOCK.size))
+            if offset + BLOCK.size + clen > size:
+                break   # cut short by a crash
+            spans.append((offset + BLOCK.size, rows, clen))
+            offset += BLOCK.size + clen
+            f.seek(offset)
+        for start, rows, clen in spans[-tail:] if tail else spans:
+            f.seek(start)
+            yield rows, decompress(f.read(clen))
+
+
+def decode_varints(buf):
+    """uint64 values of a run of LEB128 varints (uint8 array), vectorized."""
+    import numpy as np
+
+    last = buf < 0x80
+    if last.all():
+        return buf.astype(np.uint64)
+    starts = np.empty(int(last.sum()), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = np.flatnonzero(last)[:-1] + 1
+    # Byte k of a value carries bits 7k..7k+6
+    vid = np.cumsum(last) - last
+    shift = (np.arange(len(buf)) - starts[vid]) * 7
+    bits = (buf & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.add.reduceat(bits, starts)
+
+
+def _unzigzag(z):
+    import numpy as np
+
+    return (z >> np.uint64(1)).astype(np.int64) ^ -(z & np.uint64(1)).astype(np.int64)
+
+
+def _segmented_cumsum(d, seg):
+    """Cumulative sums along the rows of d (columns x rows), restarted at every segment (key per row)."""
+    import numpy as np
+
+    if len(seg) < 2 or (seg[1:] >= seg[:-1]).all():
+        order = None
+        ds = d
+        sk = seg
+    else:
+        order = np.argsort(seg, kind="stable")
+        ds = d[:, order]
+        sk = seg[order]
+    cs = np.cumsum(ds, axis=1)   # int64 wraps around, the subtraction below undoes it
+    first = np.ones(len(sk), dtype=bool)
+    first[1:] = sk[1:] != sk[:-1]
+    starts = np.flatnonzero(first)
+    if len(starts) > 1:
+        owner = np.maximum.accumulate(np.where(first, np.arange(len(sk)), 0))
+        cs -= (cs - ds)[:, owner]
+    if order is None:
+        return cs
+    out = np.empty_like(cs)
+    out[:, order] = cs
+    return out
+
+
+def decode_blocks(blocks):
+    """{column: int64 array} (scaled integers) of (rows, payload) blocks."""
+    import numpy as np
+
+    streams = [[] for _ in COLUMN_NAMES]
+    block_rows = []
+    for rows, payload in blocks:
+        block_rows.append(rows)
+        view = memoryview(payload)
+        pos = 0
+        for parts in streams:
+            (n,) = U32.unpack_from(view, pos)
+            parts.append(view[pos + 4:pos + 4 + n])
+            pos += 4 + n
+    total = sum(block_rows)
+    if total == 0:
+        return {c: np.empty(0, dtype=np.int64) for c in COLUMN_NAMES}
+
+    # Every column holds one varint per row: decode them all in one pass
+    buf = np.frombuffer(b"".join(part for parts in streams for part in parts), dtype=np.uint8)
+    values = _unzigzag(decode_varints(buf))
+    if len(values) != total * len(COLUMN_NAMES):
+        raise ValueError(f"{len(values)} values for {total} rows x {len(COLUMN_NAMES)} columns")
+    deltas = values.reshape(len(COLUMN_NAMES), total)
+
+    block = np.repeat(np.arange(len(block_rows), dtype=np.int64), block_rows)
+    flow = _segmented_cumsum(deltas[FLOW_COL:FLOW_COL + 1], block)[0]
+    ints = _segmented_cumsum(deltas, block * (int(flow.max()) + 1) + flow)
+    ints[FLOW_COL] = flow
+    return dict(zip(COLUMN_NAMES, ints))
+
+
+def open_ssz(path, tail=None):
+    """
+    Decode an .ssz file (or its last `tail` blocks).
+    Returns (header, records): a NumPy structured array with the dtype of
+    ss_binary.open_ssb, so records["cwnd"] etc. work the same way.
+    """
+    import numpy as np
+    from ss_binary import _numpy_dtype
+
+    header, _ = read_header(path)
+    ints = decode_blocks(iter_blocks(path, tail))
+    dtype = _numpy_dtype()
+    records = np.empty(len(ints["flow"]), dtype=dtype)
+    for c in COLUMN_NAMES:
+        scale = header["scales"].get(c)
+        records[c] = ints[c] / scale if scale else ints[c]
+    return header, records
+
+
+def convert_text_log(src, dst, codec=None):
+    """Convert one text ss log into an .ssz file. Returns the record count."""
+    rows = list(iter_text_log(src))
+    algo = rows[0][0] if rows else "unknown"
+    with CompressedRecordWriter(dst, algo, codec, max_rows=1 << 16, max_age=float("inf"),
+                                extra_header={"source": os.path.basename(src)}) as w:
+        for _, wall_epoch, mono, sample in rows:
+            w.append(wall_epoch, mono, sample)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="convert text ss logs to .ssz")
+    parser.add_argument("logs", nargs="+", help="text ss logs (*.log)")
+    parser.add_argument("--out_dir", default=None, help="default: next to each log")
+    parser.add_argument("--codec", choices=list(CODECS), default=DEFAULT_CODEC)
+    args = parser.parse_args()
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    total_in = total_out = 0
+    for src in args.logs:
+        base = os.path.splitext(os.path.basename(src))[0] + ".ssz"
+        dst = os.path.join(args.out_dir or os.path.dirname(src), base)
+        n = convert_text_log(src, dst, args.codec)
+        total_in += os.path.getsize(src)
+        total_out += os.path.getsize(dst)
+        print(f"[OK] {src} -> {dst} ({n} records)")
+
+    if total_out:
+        print(f"text {total_in} bytes -> {args.codec} {total_out} bytes "
+              f"({total_in / total_out:.2f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Long-lived multi-flow ss collector.
+
+Instead of one collect_ss.py process per flow, a single daemon takes one
+kernel dump per tick (ss_sampler dump()) and fans the samples out to every
+registered flow's writer. Flows are added and removed over a local Unix
+control socket, one JSON object per line:
+
+  {"cmd": "register", "port": 5201, "dst": "10.0.0.2", "algo": "cubic",
+   "output": "logs/ss/cubic_rtt10_bw10_run1.log", "format": "text"}
+  {"cmd": "unregister", "output": "logs/ss/cubic_rtt10_bw10_run1.log"}
+  {"cmd": "list"}
+  {"cmd": "stop"}
+
+Every request gets a one-line JSON reply ({"ok": true, ...} or
+{"ok": false, "error": ...}).
+
+Each registered output tracks its matching sockets in a FlowTable
+(flow_table.py): rows carry a per-socket flow id and <output>.flows is
+written when the flow is unregistered.
+
+Usage:
+  python3 ss_daemon.py serve --sock /tmp/ss_daemon.sock --interval 0.5 &
+  python3 ss_daemon.py register --sock /tmp/ss_daemon.sock --port 5201 \
+      --dst 10.0.0.2 --algo cubic --output logs/ss/x.log
+  python3 ss_daemon.py unregister --sock /tmp/ss_daemon.sock --output logs/ss/x.log
+  python3 ss_daemon.py stop --sock /tmp/ss_daemon.sock
+"""
+import argparse
+import datetime
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from flow_table import FlowTable
+from ss_sampler import make_sampler
+from ss_writers import open_writer
+from ticker import DeadlineTicker
+
+DEFAULT_SOCK = "/tmp/ss_daemon.sock"
+
+
+class Flow:
+    """One registered flow: match rule + its own writer and socket table."""
+
+    def __init__(self, port, dst, algo, output, fmt="text", flush_interval=1.0):
+        self.port = int(port)
+        self.dst = dst
+        self.algo = algo.lower()
+        self.output = output
+        self.writer = open_writer(output, self.algo, fmt, flush_interval)
+        self.table = FlowTable()
+        self.records = 0
+
+    def close(self):
+        self.writer.close()
+        self.table.write(self.output + ".flows")
+
+    def matches(self, dst_ip, dport, sample):
+        if dport != self.port or sample["algo"] != self.algo:
+            return False
+        return self.dst is None or dst_ip == self.dst
+
+    def describe(self):
+        return {
+            "port": self.port, "dst": self.dst, "algo": self.algo,
+            "output": self.output, "records": self.records,
+            "sockets": len(self.table.active), "data_flow": self.table.data_flow(),
+        }
+
+
+class Collector:
+    def __init__(self, backend="auto", interval=0.5, spin=0.0):
+        self.sampler = make_sampler(backend)
+        self.interval = interval
+        self.spin = spin
+        self.flows = {}          # output path -> Flow
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    # ---------- control requests ----------
+    def handle(self, req):
+        cmd = req.get("cmd")
+        if cmd == "register":
+            output = req["output"]
+            # Flows are closed under the lock: the sampling loop writes to
+            # them while holding it, so a writer is never closed mid-tick.
+            # A re-registered output is closed before the new writer
+            # truncates it, so the two never share the file.
+            with self.lock:
+                old = self.flows.pop(output, None)
+                if old is not None:
+                    old.close()
+                self.flows[output] = Flow(req["port"], req.get("dst"), req["algo"], output,
+                                          req.get("format", "text"), req.get("flush_interval", 1.0))
+                return {"ok": True, "flows": len(self.flows)}
+
+        if cmd == "unregister":
+            with self.lock:
+                flow = self.flows.pop(req["output"], None)
+                if flow is None:
+                    return {"ok": False, "error": f"not registered: {req['output']}"}
+                flow.close()
+                return {"ok": True, "records": flow.records}
+
+        if cmd == "list":
+            with self.lock:
+                return {"ok": True, "flows": [f.describe() for f in self.flows.values()]}
+
+        if cmd == "stop":
+            self.stopping.set()
+            return {"ok": True}
+
+        return {"ok": False, "error": f"unknown cmd: {cmd}"}
+
+    # ---------- sampling loop ----------
+    def fan_out(self, wall, mono, dump):
+        """Write one dump to every registered flow it matches (caller holds the lock)."""
+        flows = list(self.flows.values())
+        by_port = {}
+        for flow in flows:
+            by_port.setdefault(flow.port, []).append(flow)
+
+        # One dump per tick, fanned out to every flow that matches
+        matched = {flow.output: [] for flow in flows}
+        for dst_ip, dport, sample in dump:
+            for flow in by_port.get(dport, ()):
+                if flow.matches(dst_ip, dport, sample):
+                    # Samples are shared between flows: tag a copy
+                    matched[flow.output].append(dict(sample))
+        for flow in flows:
+            samples = matched[flow.output]
+            flow.table.observe(mono, samples)
+            for s in samples:
+                flow.writer.append(wall, mono, s)
+            flow.records += len(samples)
+            flow.writer.maybe_flush()
+
+    def run(self):
+        ticker = DeadlineTicker(self.interval, spin=self.spin)
+        while not self.stopping.is_set():
+            if self.flows:
+                wall = datetime.datetime.now()
+                mono = time.monotonic()
+                try:
+                    dump = self.sampler.dump()
+                except Exception as e:
+                    print(f"{self.sampler.name} error:", e, file=sys.stderr)
+                    dump = []
+
+                # The kernel dump is taken without the lock; the fan-out holds
+                # it so that unregister cannot close a writer in between
+                with self.lock:
+                    self.fan_out(wall, mono, dump)
+
+            ticker.wait()
+
+        with self.lock:
+            for flow in self.flows.values():
+                flow.close()
+            self.flows.clear()
+        self.sampler.close()
+        return ticker.summary()
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                resp = self.server.collector.handle(json.loads(line))
+            except Exception as e:
+                resp = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(resp) + "\n").encode())
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(args):
+    if os.path.exists(args.sock):
+        os.unlink(args.sock)
+
+    collector = Collector(args.backend, args.interval, args.spin)
+    server = ControlServer(args.sock, ControlHandler)
+    server.collector = collector
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: collector.stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: collector.stopping.set())
+    print(f"[ss_daemon] backend={collector.sampler.name} interval={args.interval}s "
+          f"control={args.sock}", file=sys.stderr)
+
+    try:
+        stats = collector.run()
+    finally:
+        server.shutdown()
+        server.server_close()
+        if os.path.exists(args.sock):
+            os.unlink(args.sock)
+
+    print("[ss_daemon] ticks={ticks} late={late_ticks} missed={missed_ticks} "
+          "max_late={max_late_us:.1f}us".format(**stats), file=sys.stderr)
+
+
+def request(sock_path, req, timeout=5.0):
+    """Send one control request and return the decoded reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(sock_path)
+        s.sendall((json.dumps(req) + "\n").encode())
+        f = s.makefile("rb")
+        return json.loads(f.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-flow ss collector daemon")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("serve")
+    p.add_argument("--sock", default=DEFAULT_SOCK)
+    p.add_argument("--interval", type=float, default=0.5)
+    p.add_argument("--spin", type=float, default=0.0)
+    p.add_argument("--backend", choices=["auto", "netlink", "ss"], default="auto")
+
+    p = sub.add_parser("register")
+    p.add_argument("--sock", default=DEFAULT_SOCK)
+    p.add_argument("--port", type=int, required=True)
+    p.add_argument("--dst", type=str, default=None)
+    p.add_argument("--algo", type=str, required=True)
+    p.add_argument("--output", type=str, required=True)
+    p.add_argument("--format", choices=["text", "ssb", "ssz"], default="text")
+    p.add_argument("--flush_interval", type=float, default=1.0)
+
+    p = sub.add_parser("unregister")
+    p.add_argument("--sock", default=DEFAULT_SOCK)
+    p.add_argument("--output", type=str, required=True)
+
+    for name in ("list", "stop"):
+        p = sub.add_parser(name)
+        p.add_argument("--sock", default=DEFAULT_SOCK)
+
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        serve(args)
+        return
+
+    req = {k: v for k, v in vars(args).items() if k != "sock" and v is not None}
+    if "output" in req:
+        # The daemon may run from another directory
+        req["output"] = os.path.abspath(req["output"])
+    resp = request(args.sock, req)
+    print(json.dumps(resp))
+    if not resp.get("ok"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
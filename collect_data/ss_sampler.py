@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Sampler backends used by collect_ss.py.
+
+Both backends return the same list of per-connection records (one dict per
+matching TCP socket) so the collector does not care where the data came from.
+Every record also carries "sock", the socket's (src, sport, dst, dport,
+inode), which flow_table.FlowTable turns into a flow id:
+
+  - SsSampler      : forks `ss -tiH` and tokenizes the text (the original
+                     implementation, kept as a fallback)
+  - NetlinkSampler : asks the kernel directly over a NETLINK_SOCK_DIAG socket
+                     and decodes the binary struct tcp_info
+"""
+import ipaddress
+import itertools
+import operator
+import os
+import re
+import socket
+import string
+import struct
+import subprocess
+
+# Columns produced by every backend (same order as the ss log header,
+# without wall_time / monotonic which are added by the collector)
+SAMPLE_FIELDS = [
+    "algo",
+    "rtt_ms", "rtt_var_ms", "cwnd", "mss",
+    "pacing_mbps", "ssthresh",
+    "bytes_acked", "bytes_sent", "bytes_received",
+    "segs_out", "segs_in", "unacked", "retrans_total",
+]
+
+# Extra tcp_info fields of every sample (not written to the logs; online
+# consumers and dumps can use them)
+EXTRA_FIELDS = ["min_rtt_ms", "delivery_mbps", "lost", "app_limited", "busy_ms"]
+
+# ====== Tokenizer: the second line of `ss -ti` output ======
+# Example:
+#   ts sack cubic wscale:7,7 rto:204 rtt:12.3/1.2 mss:1448 cwnd:10 ssthresh:7
+#   bytes_sent:23456 bytes_acked:12345 segs_out:123 segs_in:120
+#   send 10.2Mbps pacing_rate 20.4Mbps delivery_rate 9.8Mbps app_limited
+#   busy:120ms unacked:3 retrans:0/2 lost:1 rcv_ssthresh:64088 minrtt:10.1
+# Every token is a flag (ts, app_limited, the algo), key:value or, for the
+# rates in SPACE_KEYS, "key value". tokenize() turns the line into
+# {key: raw value} ("" for flags) with one split and one partition per token,
+# all in C; values are only converted when a field is read.
+SPACE_KEYS = ("send", "pacing_rate", "delivery_rate")
+# First line with -e: "ESTAB 0 0 10.0.0.1:40000 10.0.0.2:5201 uid:0 ino:123 sk:..."
+RE_INODE = re.compile(r"\bino:(\d+)")
+
+ALGOS = {"cubic", "reno", "bbr", "bbr2", "vegas", "yeah", "westwood"}
+
+# Unit suffix -> (base unit, multiply, divide): rates to Mbps, times to ms
+UNITS = {
+    "bps": ("mbps", 1, 1e6), "Kbps": ("mbps", 1, 1000.0), "Mbps": ("mbps", 1, 1),
+    "Gbps": ("mbps", 1000.0, 1), "Tbps": ("mbps", 1e6, 1),
+    "us": ("ms", 1, 1000.0), "ms": ("ms", 1, 1), "s": ("ms", 1000.0, 1), "sec": ("ms", 1000.0, 1),
+}
+# Keys whose unitless values ss prints in ms
+MS_KEYS = {"rto", "ato", "rtt", "lastsnd", "lastrcv", "lastack", "rcv_rtt", "minrtt", "bbr_mrtt"}
+# ss key -> record field, and field names of "a/b" values
+NAMES = {"minrtt": "min_rtt", "pacing_rate": "pacing", "delivery_rate": "delivery"}
+PAIRS = {"rtt": ("rtt_ms", "rtt_var_ms"), "retrans": ("retrans", "retrans_total"),
+         "pacing_rate": ("pacing_mbps", "max_pacing_mbps")}
+
+
+def parse_unit(text):
+    """
+    '10.2Mbps' -> (10.2, 'mbps'), '120ms' -> (120.0, 'ms'), '1448' -> (1448, '').
+    Values with a unit are converted to its base unit (Mbps, ms).
+    Raises ValueError on anything else.
+    """
+    num = text.rstrip(string.ascii_letters)
+    unit = text[len(num):]
+    value = int(num) if num.isdigit() else float(num)
+    if not unit:
+        return value, ""
+    try:
+        base, mul, div = UNITS[unit]
+    except KeyError:
+        raise ValueError(f"unknown unit in {text!r}") from None
+    return value * mul / div, base
+
+
+def normalize_algo(algo):
+    """Normalize bbr2 as bbr, keep everything else lower-case."""
+    algo = algo.lower()
+    if algo.startswith("bbr"):
+        return "bbr"
+    return algo
+
+
+_COLON = itertools.repeat(":")
+_KEY_VALUE = operator.itemgetter(0, 2)
+
+
+def tokenize(info_line):
+    """{key: raw value} of an `ss -ti` info line ("" for flags)."""
+    for key in SPACE_KEYS:
+        info_line = info_line.replace(f" {key} ", f" {key}:")
+    return dict(map(_KEY_VALUE, map(str.partition, info_line.split(), _COLON)))
+
+
+INT_FIELDS = {}   # ss key -> record field of a unitless integer value
+
+
+def _int_field(key):
+    field = INT_FIELDS[key] = NAMES.get(key, key) + ("_ms" if key in MS_KEYS else "")
+    return field
+
+
+def _put_field(rec, key, raw):
+    name = NAMES.get(key, key)
+    if raw.startswith("("):
+        # bbr:(bw:12Mbps,mrtt:10.1,...) -> bbr_bw_mbps, bbr_mrtt_ms, ...;
+        # positional groups (timer:(on,200ms,0), skmem:(r0,...)) stay text
+        inner = raw[1:-1]
+        if ":" not in inner:
+            rec[name] = inner
+        for part in inner.split(","):
+            k, sep, v = part.partition(":")
+            if sep:
+                _put_field(rec, name + "_" + k, v)
+        return
+    base, _, pct = raw.partition("(")   # rwnd_limited:4ms(0.3%)
+    try:
+        if pct:
+            rec[name + "_pct"] = float(pct.rstrip("%)"))
+        if "," in base:                  # wscale:7,7
+            rec[name] = tuple(int(v) for v in base.split(","))
+            return
+        values = [parse_unit(v) for v in base.split("/")]
+    except ValueError:
+        rec[name] = raw
+        return
+    for j, (value, unit) in enumerate(values):
+        if key in PAIRS:
+            field = PAIRS[key][j]
+        else:
+            suffix = "_" + unit if unit else "_ms" if key in MS_KEYS else ""
+            field = name + suffix + (f"_{j}" if j else "")
+        rec[field] = value
+
+
+def parse_info(info_line):
+    """
+    Every field of an `ss -ti` info line as a typed record: numbers as int
+    or float, rates in Mbps (*_mbps), times in ms (*_ms), flags as True,
+    "a/b" values split (rtt_ms / rtt_var_ms, retrans / retrans_total,
+    pacing_mbps / max_pacing_mbps), nested groups flattened (bbr_bw_mbps).
+    Keys are the ss keys otherwise, plus "algo".
+    """
+    rec = {"algo": "unknown"}
+    for key, raw in tokenize(info_line).items():
+        if raw.isdigit():
+            # Most values are plain integers
+            rec[INT_FIELDS.get(key) or _int_field(key)] = int(raw)
+        elif raw:
+            _put_field(rec, key, raw)
+        elif key in ALGOS:
+            if rec["algo"] == "unknown":
+                rec["algo"] = normalize_algo(key)
+        else:
+            rec[NAMES.get(key, key)] = True
+    return rec
+
+
+def parse_info_line(info_line):
+    """
+    Parse the second line of an `ss -ti` entry into a sample dict
+    (SAMPLE_FIELDS + EXTRA_FIELDS). Returns None when RTT or cwnd is missing
+    (nothing worth recording).
+
+    ssthresh and retrans_total keep the values of the original per-field
+    regexes, which matched the first "ssthresh:" / "retrans:" in the line:
+    rcv_ssthresh when there is no snd ssthresh yet, and bytes_retrans
+    (printed before retrans:cur/total) when ss shows it.
+    """
+    t = tokenize(info_line)
+    get = t.get
+    rtt, _, rtt_var = get("rtt", "").partition("/")
+    cwnd = get("cwnd")
+    if not (rtt_var and cwnd):
+        return None
+    try:
+        algo = next(filter(ALGOS.__contains__, t), "unknown")
+        pacing = get("pacing_rate")
+        delivery = get("delivery_rate")
+        busy = get("busy")
+        ssthresh = get("ssthresh") or get("rcv_ssthresh")
+        retrans = get("bytes_retrans") or get("retrans", "0").partition("/")[0]
+        return {
+            "algo": "bbr" if algo.startswith("bbr") else algo,
+            "rtt_ms": float(rtt),
+            "rtt_var_ms": float(rtt_var),
+            "cwnd": int(cwnd),
+            "mss": int(get("mss", 0)),
+            "pacing_mbps": float(parse_unit(pacing.partition("/")[0])[0]) if pacing else 0.0,
+            "ssthresh": int(ssthresh) if ssthresh else -1,
+            "bytes_acked": int(get("bytes_acked", 0)),
+            "bytes_sent": int(get("bytes_sent", 0)),
+            "bytes_received": int(get("bytes_received", 0)),
+            "segs_out": int(get("segs_out", 0)),
+            "segs_in": int(get("segs_in", 0)),
+            "unacked": int(get("unacked", 0)),
+            "retrans_total": int(retrans),
+            "min_rtt_ms": float(get("minrtt", 0.0)),
+            "delivery_mbps": float(parse_unit(delivery)[0]) if delivery else 0.0,
+            "lost": int(get("lost", 0)),
+            "app_limited": "app_limited" in t,
+            "busy_ms": float(parse_unit(busy)[0]) if busy else 0.0,
+        }
+    except ValueError:
+        return None
+
+
+def _split_peer(peer):
+    """'10.0.0.2:5201' / '[::1]:5201' -> ('10.0.0.2', 5201)"""
+    host, _, port = peer.rpartition(":")
+    return host.strip("[]"), int(port)
+
+
+def parse_state_line(state_line):
+    """(src, sport, dst, dport, inode) of the first line of an `ss -tieH` entry, or None."""
+    cols = state_line.split()
+    if len(cols) < 5:
+        return None
+    try:
+        src, sport = _split_peer(cols[3])
+        dst, dport = _split_peer(cols[4])
+    except ValueError:
+        return None
+    m = RE_INODE.search(state_line)
+    return src, sport, dst, dport, int(m.group(1)) if m else 0
+
+
+def iter_dump(lines):
+    """
+    Yield (state line, info line) of every entry of `ss -ti[e]` output (an
+    open file or any iterable of lines): the info line is the indented one
+    after the state line. Header lines, other text (timestamps between
+    snapshots) and entries without an info line are skipped.
+    """
+    state = None
+    for line in lines:
+        if line[:1] in (" ", "\t"):
+            if state is not None and line.strip():
+                yield state, line.strip()
+            state = None
+        elif line.startswith(("State", "Netid")) or not line.strip():
+            state = None
+        else:
+            state = line.rstrip("\n")
+
+
+def parse_dump(path, typed=False):
+    """
+    [(sock, record)] of a saved `ss -tie` dump, several snapshots appended
+    to one file included. record is the sample dict of parse_info_line, or
+    every field (parse_info) with typed=True; sock is parse_state_line's.
+    """
+    parse = parse_info if typed else parse_info_line
+    out = []
+    with open(path) as f:
+        for state, info in iter_dump(f):
+            rec = parse(info)
+            if rec is not None:
+                out.append((parse_state_line(state), rec))
+    return out
+
+
+def load_dump(path):
+    """A saved dump as {column: ndarray}: sport, dport, inode, then SAMPLE_FIELDS + EXTRA_FIELDS."""
+    import numpy as np
+
+    entries = parse_dump(path)
+    cols = {"sport": [], "dport": [], "inode": []}
+    for sock, _ in entries:
+        _, sport, _, dport, inode = sock or (None, 0, None, 0, 0)
+        cols["sport"].append(sport)
+        cols["dport"].append(dport)
+        cols["inode"].append(inode)
+    out = {c: np.array(v, dtype=np.int64) for c, v in cols.items()}
+    for c in SAMPLE_FIELDS + EXTRA_FIELDS:
+        out[c] = np.array([rec[c] for _, rec in entries])
+    return out
+
+
+class SsSampler:
+    """Fork `ss -tiH` once per sample and parse its text output."""
+
+    name = "ss"
+
+    def __init__(self, port=None, dst=None):
+        # H: hide header, t: TCP, i: internal TCP info, e: inode (socket identity)
+        if port is None:
+            # dump(): every socket, numeric peer so it can be matched later
+            self.cmd = ["ss", "-tineH"]
+        else:
+            filter_expr = f"dport = {port}"
+            if dst:
+                filter_expr = f"dst {dst} dport = {port}"
+            self.cmd = ["ss", "-tineH", filter_expr]
+
+    def _run(self):
+        result = subprocess.run(
+            self.cmd, capture_output=True, text=True, check=False
+        )
+        # ss -tiH output format:
+        # Line 0: "ESTAB ..."
+        # Line 1: "\tcubic wscale:... rtt:... cwnd:..."
+        for state, info in iter_dump(result.stdout.splitlines()):
+            rec = parse_info_line(info)
+            if rec is not None:
+                rec["sock"] = parse_state_line(state)
+                yield state, rec
+
+    def sample(self):
+        return [rec for _, rec in self._run()]
+
+    def dump(self):
+        """Return [(dst_ip, dport, sample)] for every connected TCP socket."""
+        out = []
+        for _, rec in self._run():
+            if rec["sock"] is None:
+                continue
+            out.append((rec["sock"][2], rec["sock"][3], rec))
+        return out
+
+    def close(self):
+        pass
+
+
+# ====== NETLINK_SOCK_DIAG definitions (linux/netlink.h, linux/inet_diag.h) ======
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+
+INET_DIAG_INFO = 2
+INET_DIAG_CONG = 4
+
+TCP_LISTEN = 10
+TCP_CLOSE = 7
+TCP_TIME_WAIT = 6
+TCP_SYN_RECV = 3
+# iproute2 ss only prints "ssthresh:" when tcpi_snd_ssthresh is below this
+SS_SSTHRESH_SHOWN = 0xFFFF
+# Same default state set as `ss -t` ("connected" sockets)
+CONNECTED_STATES = 0xFFF & ~(
+    (1 << TCP_LISTEN) | (1 << TCP_CLOSE) | (1 << TCP_TIME_WAIT) | (1 << TCP_SYN_RECV)
+)
+
+NLMSG_HDR = struct.Struct("=IHHII")
+# family, protocol, ext, pad, states, sockid (sport, dport, src, dst, if, cookie)
+# Ports inside the sockid are in network byte order.
+INET_DIAG_REQ_V2 = struct.Struct("=BBBxI" "HH16s16sI8s")
+# family, state, timer, retrans, sockid, expires, rqueue, wqueue, uid, inode
+INET_DIAG_MSG = struct.Struct("=BBBB" "HH16s16sI8s" "IIIII")
+RTATTR = struct.Struct("=HH")
+
+# struct tcp_info fields used here (linux/tcp.h), by byte offset:
+#   7 flags (bit 0: delivery_rate_app_limited),
+#   16 snd_mss, 24 unacked, 32 lost, 36 retrans, 64 rcv_ssthresh, 68 rtt,
+#   72 rttvar, 76 snd_ssthresh,
+#   80 snd_cwnd, 100 total_retrans, 104 pacing_rate, 120 bytes_acked,
+#   128 bytes_received, 136 segs_out, 140 segs_in, 148 min_rtt,
+#   160 delivery_rate, 168 busy_time, 200 bytes_sent, 208 bytes_retrans
+# Older kernels send a shorter struct; missing tail fields read as 0.
+TCP_INFO = struct.Struct("=7xB8xI4xI4xII24xIIIII16xIQ8xQQII4xI8xQQ24xQQ")
+TCP_INFO_NAMES = [
+    "flags", "snd_mss", "unacked", "lost", "retrans",
+    "rcv_ssthresh", "rtt", "rttvar", "snd_ssthresh", "snd_cwnd",
+    "total_retrans", "pacing_rate", "bytes_acked", "bytes_received",
+    "segs_out", "segs_in", "min_rtt", "delivery_rate", "busy_time",
+    "bytes_sent", "bytes_retrans",
+]
+
+
+def _align4(n):
+    return (n + 3) & ~3
+
+
+def decode_tcp_info(payload, algo):
+    """
+    Decode struct tcp_info into the same sample dict as parse_info_line.
+
+    Values follow what `ss` prints so both backends write comparable logs:
+    fields ss omits when zero stay 0, and ssthresh / retrans_total take the
+    same fallbacks as parse_info_line: ssthresh is rcv_ssthresh when ss
+    would not print snd_ssthresh (>= 0xFFFF), and retrans_total is
+    bytes_retrans when non-zero, otherwise the current retrans counter.
+    """
+    if len(payload) < TCP_INFO.size:
+        payload = payload + b"\0" * (TCP_INFO.size - len(payload))
+    ti = dict(zip(TCP_INFO_NAMES, TCP_INFO.unpack_from(payload)))
+
+    if ti["snd_cwnd"] == 0:
+        return None
+
+    if ti["snd_ssthresh"] < SS_SSTHRESH_SHOWN:
+        ssthresh = ti["snd_ssthresh"]
+    elif ti["rcv_ssthresh"]:
+        ssthresh = ti["rcv_ssthresh"]
+    else:
+        ssthresh = -1
+    if ti["bytes_retrans"]:
+        retrans_total = ti["bytes_retrans"]
+    else:
+        retrans_total = ti["retrans"]
+
+    return {
+        "algo": normalize_algo(algo),
+        "rtt_ms": ti["rtt"] / 1000.0,
+        "rtt_var_ms": ti["rttvar"] / 1000.0,
+        "cwnd": ti["snd_cwnd"],
+        "mss": ti["snd_mss"],
+        # pacing_rate is bytes/s; ~0 means "unlimited" and ss hides it
+        "pacing_mbps": 0.0 if ti["pacing_rate"] >= 2 ** 63 else ti["pacing_rate"] * 8 / 1e6,
+        "ssthresh": ssthresh,
+        "bytes_acked": ti["bytes_acked"],
+        "bytes_sent": ti["bytes_sent"],
+        "bytes_received": ti["bytes_received"],
+        "segs_out": ti["segs_out"],
+        "segs_in": ti["segs_in"],
+        "unacked": ti["unacked"],
+        "retrans_total": retrans_total,
+        # min_rtt is ~0 until the first RTT sample; ss prints busy in whole ms
+        "min_rtt_ms": 0.0 if ti["min_rtt"] == 0xFFFFFFFF else ti["min_rtt"] / 1000.0,
+        "delivery_mbps": ti["delivery_rate"] * 8 / 1e6,
+        "lost": ti["lost"],
+        "app_limited": bool(ti["flags"] & 1),
+        "busy_ms": float(ti["busy_time"] // 1000),
+    }
+
+
+class NetlinkSampler:
+    """
+    Dump TCP sockets through NETLINK_SOCK_DIAG and decode tcp_info.
+
+    One request per address family per sample, no fork and no text parsing.
+    Filtering on destination port / address is done on the decoded sockid.
+    """
+
+    name = "netlink"
+
+    def __init__(self, port=None, dst=None):
+        self.port = port
+        self.dst = None
+        families = [socket.AF_INET, socket.AF_INET6]
+        if dst:
+            addr = ipaddress.ip_address(dst)
+            self.dst = addr.packed.ljust(16, b"\0")
+            families = [socket.AF_INET if addr.version == 4 else socket.AF_INET6]
+
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG)
+        self.sock.bind((0, 0))
+        self.seq = 0
+        self.requests = [(fam, self._build_request(fam)) for fam in families]
+        self.buf = bytearray(1 << 16)
+
+    def _build_request(self, family):
+        ext = (1 << (INET_DIAG_INFO - 1)) | (1 << (INET_DIAG_CONG - 1))
+        req = INET_DIAG_REQ_V2.pack(
+            family, socket.IPPROTO_TCP, ext, CONNECTED_STATES,
+            0, 0, b"\0" * 16, b"\0" * 16, 0, b"\xff" * 8,
+        )
+        return bytearray(NLMSG_HDR.pack(
+            NLMSG_HDR.size + len(req), SOCK_DIAG_BY_FAMILY,
+            NLM_F_REQUEST | NLM_F_DUMP, 0, 0,
+        ) + req)
+
+    def _dump(self, request):
+        self.seq += 1
+        struct.pack_into("=I", request, 8, self.seq)
+        self.sock.send(request)
+
+        while True:
+            n = self.sock.recv_into(self.buf)
+            view = memoryview(self.buf)[:n]
+            off = 0
+            while off + NLMSG_HDR.size <= n:
+                msg_len, msg_type, _, _, _ = NLMSG_HDR.unpack_from(view, off)
+                if msg_len < NLMSG_HDR.size:
+                    return
+                if msg_type == NLMSG_DONE:
+                    return
+                if msg_type == NLMSG_ERROR:
+                    (err,) = struct.unpack_from("=i", view, off + NLMSG_HDR.size)
+                    if err:
+                        raise OSError(-err, os.strerror(-err))
+                    return
+                yield view[off + NLMSG_HDR.size:off + msg_len]
+                off += _align4(msg_len)
+
+    def iter_sockets(self):
+        """Yield (inet_diag_msg tuple, {attr_type: payload}) for every socket."""
+        for family, request in self.requests:
+            for msg in self._dump(request):
+                diag = INET_DIAG_MSG.unpack_from(msg)
+                attrs = {}
+                off = _align4(INET_DIAG_MSG.size)
+                while off + RTATTR.size <= len(msg):
+                    rta_len, rta_type = RTATTR.unpack_from(msg, off)
+                    if rta_len < RTATTR.size:
+                        break
+                    attrs[rta_type] = msg[off + RTATTR.size:off + rta_len]
+                    off += _align4(rta_len)
+                yield diag, attrs
+
+    @staticmethod
+    def _decode(diag, attrs):
+        if INET_DIAG_INFO not in attrs:
+            return None
+        cong = attrs.get(INET_DIAG_CONG)
+        algo = bytes(cong).split(b"\0", 1)[0].decode() if cong is not None else "unknown"
+        rec = decode_tcp_info(bytes(attrs[INET_DIAG_INFO]), algo)
+        if rec is not None:
+            family, src, dst = diag[0], diag[6], diag[7]
+            n = 4 if family == socket.AF_INET else 16
+            rec["sock"] = (socket.inet_ntop(family, src[:n]), socket.ntohs(diag[4]),
+                           socket.inet_ntop(family, dst[:n]), socket.ntohs(diag[5]), diag[14])
+        return rec
+
+    def sample(self):
+        samples = []
+        for diag, attrs in self.iter_sockets():
+            dport, dst = socket.ntohs(diag[5]), diag[7]
+            if self.port is not None and dport != self.port:
+                continue
+            if self.dst is not None and dst != self.dst:
+                continue
+            rec = self._decode(diag, attrs)
+            if rec is not None:
+                samples.append(rec)
+        return samples
+
+    def dump(self):
+        """Return [(dst_ip, dport, sample)] for every connected TCP socket."""
+        out = []
+        for diag, attrs in self.iter_sockets():
+            rec = self._decode(diag, attrs)
+            if rec is None:
+                continue
+            out.append((rec["sock"][2], rec["sock"][3], rec))
+        return out
+
+    def close(self):
+        self.sock.close()
+
+
+BACKENDS = {
+    "ss": SsSampler,
+    "netlink": NetlinkSampler,
+}
+
+
+def make_sampler(backend, port=None, dst=None):
+    """
+    Build a sampler by name; port=None covers every socket (for dump()).
+    "auto" prefers netlink and falls back to `ss` when the kernel socket
+    cannot be opened (non-Linux, no sock_diag, ...).
+    """
+    if backend == "auto":
+        try:
+            return NetlinkSampler(port, dst)
+        except OSError:
+            return SsSampler(port, dst)
+    return BACKENDS[backend](port, dst)
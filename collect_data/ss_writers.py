@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Per-flow output writers shared by collect_ss.py and ss_daemon.py.
+
+Every writer takes (wall datetime, monotonic seconds, sample dict) from a
+sampler backend (ss_sampler.py) and appends one record. The flow id set by
+flow_table.FlowTable is written as the last column (0 when untracked).
+"""
+from ss_binary import BufferedRecordWriter
+from ss_compressed import CompressedRecordWriter
+
+# Note: the algo field is ground truth and should NOT be used as a feature
+TEXT_HEADER = (
+    "wall_time monotonic algo "
+    "rtt_ms rtt_var_ms cwnd mss "
+    "pacing_mbps ssthresh "
+    "bytes_acked bytes_sent bytes_received "
+    "segs_out segs_in unacked retrans_total flow\n"
+)
+
+
+class TextLogWriter:
+    """The original space-separated log, flushed after every line."""
+
+    def __init__(self, path):
+        self.f = open(path, "w")
+        self.f.write(TEXT_HEADER)
+        self.f.flush()
+
+    def append(self, wall, mono, s):
+        line = (
+            f"{wall.isoformat()} {mono:.9f} {s['algo']} "
+            f"{s['rtt_ms']:.3f} {s['rtt_var_ms']:.3f} {s['cwnd']} {s['mss']} "
+            f"{s['pacing_mbps']:.6f} {s['ssthresh']} "
+            f"{s['bytes_acked']} {s['bytes_sent']} {s['bytes_received']} "
+            f"{s['segs_out']} {s['segs_in']} {s['unacked']} {s['retrans_total']} {s.get('flow', 0)}\n"
+        )
+        self.f.write(line)
+        self.f.flush()
+
+    def maybe_flush(self, now=None):
+        pass
+
+    def close(self):
+        self.f.close()
+
+
+class BinaryLogWriter(BufferedRecordWriter):
+    """Buffered .ssb records (see ss_binary.py)."""
+
+    def append(self, wall, mono, s):
+        super().append(wall.timestamp(), mono, s)
+
+
+class CompressedLogWriter(CompressedRecordWriter):
+    """Delta-coded, block-compressed samples (see ss_compressed.py)."""
+
+    def append(self, wall, mono, s):
+        super().append(wall.timestamp(), mono, s)
+
+
+def open_writer(path, algo, fmt="text", flush_interval=1.0):
+    if fmt == "ssb":
+        return BinaryLogWriter(path, algo, max_age=flush_interval)
+    if fmt == "ssz":
+        return CompressedLogWriter(path, algo, max_age=flush_interval)
+    if fmt == "text":
+        return TextLogWriter(path)
+    raise ValueError(f"unknown output format: {fmt}")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Drift-free periodic scheduling for the ss collectors.
+
+Ticks are scheduled at absolute monotonic deadlines t0 + k * interval, so the
+time spent sampling and writing does not add up into the period. If the
+caller falls more than one period behind, the skipped deadlines are counted
+as missed and the schedule jumps to the most recent one.
+
+With spin > 0 the ticker sleeps until `spin` seconds before the deadline and
+busy-waits the rest, which keeps 1-10 ms periods on time at the cost of some
+CPU.
+"""
+import time
+
+
+class DeadlineTicker:
+    def __init__(self, interval, spin=0.0, late_threshold=None):
+        self.interval = interval
+        self.spin = spin
+        # A tick counts as "late" once it fires this many seconds after its deadline
+        if late_threshold is None:
+            late_threshold = interval / 10.0
+        self.late_threshold = late_threshold
+
+        self.t0 = time.monotonic()
+        self.k = 0
+
+        # Running stats (constant memory)
+        self.ticks = 0
+        self.late_ticks = 0
+        self.missed = 0
+        self.late_sum = 0.0
+        self.late_max = 0.0
+
+    def wait(self):
+        """
+        Block until the next deadline.
+        Returns (tick_index, deadline, fired_at, missed) on the monotonic clock.
+        """
+        self.k += 1
+        deadline = self.t0 + self.k * self.interval
+        now = time.monotonic()
+
+        missed = 0
+        if now >= deadline + self.interval:
+            # Fell behind: skip whole periods and fire for the latest deadline
+            missed = int((now - deadline) // self.interval)
+            self.k += missed
+            deadline = self.t0 + self.k * self.interval
+
+        remaining = deadline - now
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+        late = now - deadline
+        self.ticks += 1
+        self.missed += missed
+        self.late_sum += late
+        if late > self.late_max:
+            self.late_max = late
+        if late > self.late_threshold:
+            self.late_ticks += 1
+
+        return self.k, deadline, now, missed
+
+    def summary(self):
+        mean_late = self.late_sum / self.ticks if self.ticks else 0.0
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "missed_ticks": self.missed,
+            "mean_late_us": mean_late * 1e6,
+            "max_late_us": self.late_max * 1e6,
+        }
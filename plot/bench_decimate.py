@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark decimation (feature_pipeline/decimate.py) on synthetic long traces.
+
+Writes one .ssb trace per algo with --points samples (1 ms sampling, a
+cwnd sawtooth plus noise) into a temp log root, then times:
+
+  - one plot.py condition (3 figures) with every sample vs --max_points
+  - building the multi-resolution pyramid, and view() over random zoom windows
+  - the time-series features exact vs decimated, and how much they move
+
+Example:
+  python3 bench_decimate.py --points 2000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import plot
+from feature_pipeline import dataset, decimate
+from feature_pipeline.timeseries import TRACE_COLS, TS_FEATURES, trace_features
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--points", type=int, default=2_000_000, help="samples per trace")
+parser.add_argument("--max_points", type=int, default=4000)
+parser.add_argument("--zooms", type=int, default=200, help="random view() windows")
+parser.add_argument("--skip_full", action="store_true", help="skip the all-samples render")
+args = parser.parse_args()
+
+
+def write_trace(path, algo, n, rng):
+    import ss_binary
+
+    rec = np.zeros(n, dtype=ss_binary._numpy_dtype())
+    t = np.arange(n) * 1e-3
+    period = {"reno": 4000, "cubic": 3000, "vegas": 9000, "bbr": 8000}[algo]
+    rec["wall_time"] = 1.7e9 + t
+    rec["monotonic"] = 1000.0 + t
+    rec["cwnd"] = 20 + (np.arange(n) % period) // 10 + rng.integers(0, 3, n)
+    rec["mss"] = 1460
+    rec["rtt_ms"] = 10 + 5 * (np.arange(n) % period) / period + rng.random(n)
+    rec["rtt_var_ms"] = rng.random(n)
+    rec["pacing_mbps"] = 50 + 10 * np.sin(t * 2 * np.pi / 8) + rng.random(n)
+    rec["bytes_acked"] = np.arange(n) * 1200
+    rec["bytes_sent"] = np.arange(n) * 1210
+    rec["retrans_total"] = np.arange(n) // 5000
+    with open(path, "wb") as f:
+        f.write(ss_binary._encode_header(algo))
+        f.write(rec.tobytes())
+
+
+def timed(fn, *a):
+    t0 = time.perf_counter()
+    out = fn(*a)
+    return out, time.perf_counter() - t0
+
+
+tmp = tempfile.mkdtemp(prefix="bench_decimate_")
+try:
+    os.environ["DATASET_CACHE"] = os.path.join(tmp, "cache")
+    rng = np.random.default_rng(0)
+    paths = {}
+    for algo in plot.algos:
+        paths[algo] = os.path.join(tmp, f"{algo}_rtt10_bw10_run1.ssb")
+        write_trace(paths[algo], algo, args.points, rng)
+    print(f"{len(paths)} traces x {args.points} samples in {tmp}")
+
+    cond = (10, 10, 1)
+    _, t_pyr = timed(lambda: [decimate.pyramid(p) for p in paths.values()])
+    print(f"pyramid build     {t_pyr:8.2f} s  (4 traces, cached on disk after this)")
+    for label, max_points in [("all samples", 0), (f"max_points={args.max_points}", args.max_points)]:
+        if max_points == 0 and args.skip_full:
+            continue
+        task = (cond, paths, tmp, plot.METRICS, (max_points, None))
+        _, dt = timed(plot.render_condition, task)
+        print(f"render {label:18s} {dt:8.2f} s  (3 figures)")
+
+    # Zoom windows of every size, from the whole trace down to 1 s
+    path = paths["reno"]
+    span = args.points * 1e-3
+    lat, pts = [], []
+    for _ in range(args.zooms):
+        width = span * 10 ** rng.uniform(-np.log10(span), 0)
+        t0 = 1000.0 + rng.uniform(0, span - width)
+        (t, _), dt = timed(decimate.view, path, "cwnd_bytes", t0, t0 + width, args.max_points)
+        lat.append(dt)
+        pts.append(len(t))
+    lat = np.array(lat) * 1e3
+    print(f"view() zoom       p50 {np.percentile(lat, 50):.2f} ms  p99 {np.percentile(lat, 99):.2f} ms  "
+          f"max points {max(pts)}")
+
+    cols, _ = dataset.load_trace_columns(path)
+    tr = {c: np.asarray(cols[c], dtype=np.float64) for c in TRACE_COLS}
+    exact, t_exact = timed(trace_features, tr, 1.0)
+    dec, t_dec = timed(trace_features, tr, 1.0, 20000)
+    # Features that are ~0 here (goodput std of a constant rate) only show round-off
+    rel = {k: abs(dec[k] - exact[k]) / abs(exact[k]) for k in TS_FEATURES if abs(exact[k]) > 1e-9}
+    worst = max(rel, key=rel.get)
+    print(f"ts features       exact {t_exact:.2f} s  decimated(20000) {t_dec:.3f} s  "
+          f"rel. change median {np.median(list(rel.values())):.2%}, max {rel[worst]:.1%} ({worst})")
+finally:
+    shutil.rmtree(tmp)
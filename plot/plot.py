@@ -1,9 +1,42 @@
 #!/usr/bin/env python3
+"""
+Plot cwnd / pacing / RTT variation over time, one figure per metric and
+(rtt, bw, run) condition with the four algorithms overlaid.
+
+Runs come from a run catalog query (--where, default the RTT_MS / BW_MBIT /
+RUN condition below) under --log_root. Each condition is one task in a
+process pool: its traces are loaded once (memory-mapped from the dataset
+cache) and every metric is drawn on the same reused Agg figure.
+Long traces are decimated before they reach matplotlib: at most
+--max_points real samples per line (min/max per bucket, from the trace's
+multi-resolution pyramid in the dataset cache), also for a --t_range zoom.
+<out_dir>/.plot_manifest.json remembers the inputs of every figure, so only
+figures whose traces changed (or that are missing) are rendered again.
+
+Example:
+  python3 plot.py                                                  # rtt10 / bw10 / run1
+  python3 plot.py --log_root ../collect_data/logs --where "rtt>=10" --out_dir figs
+  python3 plot.py --t_range 5 7.5                                  # zoom, seconds from start
+"""
+import argparse
+import hashlib
+import json
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-LOG_SS_DIR = "logs_10_10/ss"
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+# feature_pipeline (run catalog, dataset cache) lives with build_features; it
+# also puts collect_data (ss_binary.py) on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build_features"))
+from feature_pipeline import Catalog, dataset, decimate  # noqa: E402
+
+LOG_ROOT = "logs_10_10"
 RTT_MS = 10
 BW_MBIT = 10
 RUN = 1
@@ -16,90 +49,145 @@ colors = {
     "vegas": "C3",
 }
 
-SS_COLS = [
-    "wall_time", "monotonic", "algo",
-    "rtt_ms", "rtt_var_ms",
-    "cwnd", "mss", "pacing_mbps",
-    "ssthresh",
-    "bytes_acked", "bytes_sent", "bytes_received",
-    "segs_out", "segs_in", "unacked", "retrans_total",
+# (series, ylabel, title_prefix, filename_prefix); cwnd_bytes is cwnd * mss
+METRICS = [
+    ("cwnd_bytes", "cwnd (bytes)", "cwnd", "cwnd"),
+    ("pacing_mbps", "pacing (Mbps)", "pacing", "pacing"),
+    ("rtt_var_ms", "RTT var (ms)", "RTT variation", "rttvar"),
 ]
 
+# Bump when the look of the figures changes, so every figure is redrawn
+PLOT_VERSION = 2
+MANIFEST = ".plot_manifest.json"
+
 plt.rcParams["figure.dpi"] = 150
 plt.rcParams["font.size"] = 10
 
+# One figure per worker process, cleared between plots
+_FIG = None
 
-def load_ss_log(path):
-    if not os.path.exists(path):
-        raise FileNotFoundError(path)
 
-    with open(path, "r") as f:
-        first_line = f.readline()
+def figure_name(prefix, cond, t_range=None):
+    rtt, bw, run = cond
+    zoom = f"_t{t_range[0]:g}-{t_range[1]:g}" if t_range else ""
+    return f"{prefix}_rtt{rtt}_bw{bw}_run{run}{zoom}.png"
 
-    if first_line.startswith("wall_time"):
-        df = pd.read_csv(path, delim_whitespace=True, skiprows=1, names=SS_COLS)
-    else:
-        df = pd.read_csv(path, delim_whitespace=True, names=SS_COLS)
 
-    return df
+def signature(runs, metric, view):
+    """Hash of everything a figure depends on: the traces' stat, view options and plot version."""
+    blob = json.dumps([PLOT_VERSION, metric, view, sorted((a, os.path.basename(r["ss_path"]), r["ss_mtime_ns"],
+                                                           r["ss_size"]) for a, r in runs.items())])
+    return hashlib.sha1(blob.encode()).hexdigest()
 
 
-def plot_line_metric(metric, ylabel, title_prefix, filename_prefix):
-    plt.figure(figsize=(10, 3))
+def render_condition(task):
+    """Worker: load the traces of one condition once and draw the requested metrics."""
+    global _FIG
+    cond, paths, out_dir, metrics, (max_points, t_range) = task
+    rtt, bw, run = cond
+    starts = {}
     for algo in algos:
-        fname = f"{algo}_rtt{RTT_MS}_bw{BW_MBIT}_run{RUN}.log"
-        path = os.path.join(LOG_SS_DIR, fname)
-        if not os.path.exists(path):
-            print(f"[WARN] file not found: {path}")
-            continue
-
-        df = load_ss_log(path)
-        t = df["monotonic"] - df["monotonic"].iloc[0]
-
-        if metric == "cwnd":
-            y = df["cwnd"] * df["mss"]  # seg → bytes
+        if algo in paths:
+            cols, meta = dataset.load_trace_columns(paths[algo])
+            if meta["rows"]:
+                starts[algo] = float(cols["monotonic"][0])
         else:
-            y = df[metric]
-
-        plt.plot(t, y, label=algo, color=colors.get(algo, None), alpha=0.85)
-
-    plt.xlabel("Time (s)")
-    plt.ylabel(ylabel)
-    plt.title(f"{title_prefix} (rtt={RTT_MS} ms, bw={BW_MBIT} Mbps, run={RUN})")
-    plt.legend(title="algo")
-    plt.grid(alpha=0.3)
-    plt.tight_layout()
-
-    out = f"{filename_prefix}_rtt{RTT_MS}_bw{BW_MBIT}_run{RUN}.png"
-    plt.savefig(out)
-    print(f"[OK] Saved: {out}")
-    plt.close()
+            print(f"[WARN] no run in catalog: {algo}_rtt{rtt}_bw{bw}_run{run}")
+
+    if _FIG is None:
+        _FIG = plt.figure(figsize=(10, 3))
+    written = []
+    for metric, ylabel, title_prefix, filename_prefix in metrics:
+        _FIG.clf()
+        ax = _FIG.add_subplot()
+        for algo, start in starts.items():
+            t0, t1 = (start + t_range[0], start + t_range[1]) if t_range else (None, None)
+            t, y = decimate.view(paths[algo], metric, t0, t1, max_points or float("inf"))
+            ax.plot(t - start, y, label=algo, color=colors.get(algo, None), alpha=0.85)
+
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel(ylabel)
+        ax.set_title(f"{title_prefix} (rtt={rtt} ms, bw={bw} Mbps, run={run})")
+        ax.legend(title="algo")
+        ax.grid(alpha=0.3)
+        _FIG.tight_layout()
+
+        out = os.path.join(out_dir, figure_name(filename_prefix, cond, t_range))
+        _FIG.savefig(out)
+        written.append(out)
+    return written
+
+
+def plan(rows, out_dir, manifest, force=False, max_points=4000, t_range=None):
+    """Group catalog rows by condition and keep the figures that need drawing."""
+    conds = {}
+    for r in rows:
+        # .ssb and .log of the same run hold the same trace: keep one
+        conds.setdefault((r["rtt"], r["bw"], r["run"]), {})[r["algo"]] = r
+
+    tasks, new_manifest, skipped = [], {}, 0
+    for cond in sorted(conds):
+        runs = conds[cond]
+        todo = []
+        for spec in METRICS:
+            name = figure_name(spec[3], cond, t_range)
+            sig = signature(runs, spec[0], [max_points, t_range])
+            new_manifest[name] = sig
+            if not force and manifest.get(name) == sig and os.path.exists(os.path.join(out_dir, name)):
+                skipped += 1
+            else:
+                todo.append(spec)
+        if todo:
+            tasks.append((cond, {a: r["ss_path"] for a, r in runs.items()}, out_dir, todo,
+                          (max_points, t_range)))
+    return tasks, new_manifest, skipped
 
 
 def main():
-    # 1️⃣ cwnd(bytes)
-    plot_line_metric(
-        metric="cwnd",
-        ylabel="cwnd (bytes)",
-        title_prefix="cwnd",
-        filename_prefix="cwnd"
-    )
-
-    # 2️⃣ pacing rate (Mbps)
-    plot_line_metric(
-        metric="pacing_mbps",
-        ylabel="pacing (Mbps)",
-        title_prefix="pacing",
-        filename_prefix="pacing"
-    )
-
-    # 3️⃣ RTT variation (ms)
-    plot_line_metric(
-        metric="rtt_var_ms",
-        ylabel="RTT var (ms)",
-        title_prefix="RTT variation",
-        filename_prefix="rttvar"
-    )
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log_root", default=LOG_ROOT, help="directory with ss/")
+    parser.add_argument("--where", nargs="+", default=[f"rtt={RTT_MS}", f"bw={BW_MBIT}", f"run={RUN}"],
+                        help="run catalog conditions, e.g. rtt>=100 bw=500 (default: the RTT_MS/BW_MBIT/RUN run)")
+    parser.add_argument("--out_dir", default=".")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="redraw figures even if their inputs did not change")
+    parser.add_argument("--max_points", type=int, default=4000,
+                        help="decimate each line to about this many samples (0: plot every sample)")
+    parser.add_argument("--t_range", type=float, nargs=2, default=None, metavar=("T0", "T1"),
+                        help="only this time range (s from the start of each trace)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    cat = Catalog.for_dirs(os.path.join(args.log_root, "ss"))
+    rows = cat.query(*args.where, order="format")
+    cat.close()
+    if not rows:
+        print(f"[WARN] no run in {args.log_root} matches {' '.join(args.where)}")
+        return
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest_path = os.path.join(args.out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    tasks, new_manifest, skipped = plan(rows, args.out_dir, manifest, args.force, args.max_points, args.t_range)
+
+    if args.jobs == 1 or len(tasks) <= 1:
+        results = list(map(render_condition, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(render_condition, tasks))
+    for written in results:
+        for out in written:
+            print(f"[OK] Saved: {out}")
+
+    manifest.update(new_manifest)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    n = sum(len(w) for w in results)
+    print(f"[OK] {n} figures drawn, {skipped} unchanged, {len(new_manifest) // len(METRICS)} conditions "
+          f"in {time.perf_counter() - t0:.2f} s")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark flat_forest.py against the sklearn forest in rf_congctrl.pkl.
+
+For each batch size, times predict_proba of sklearn (n_jobs=1 and -1) and of
+the flattened forest, and checks the flat output is bit-identical. Then
+shows size / speed / label agreement of a few pruned and quantized forests.
+
+Example:
+  python3 bench_flat_forest.py --batch 1 8 64 1024
+"""
+import argparse
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import flat_forest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bundle", default=os.path.join(HERE, "rf_congctrl.pkl"))
+parser.add_argument("--csv", default=os.path.join(HERE, "..", "build_features", "features_no_cond.csv"))
+parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 64, 1024])
+parser.add_argument("--repeat", type=float, default=1.0, help="seconds per measurement")
+args = parser.parse_args()
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def per_call(fn, X):
+    """Median seconds per call over ~args.repeat seconds."""
+    fn(X)
+    times = []
+    t_end = time.perf_counter() + args.repeat
+    while time.perf_counter() < t_end or len(times) < 3:
+        t0 = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+bundle = joblib.load(args.bundle)
+rf = bundle["model"]
+X_all = pd.read_csv(args.csv)[bundle["feature_cols"]].to_numpy(dtype=np.float64)
+flat = flat_forest.flatten(rf)
+
+print(f"forest: {len(flat['roots'])} trees, {len(flat['feature'])} nodes, "
+      f"{flat_forest.nbytes(flat) / 1024:.0f} KiB flat")
+print(f"{'batch':>6s} {'sk n_jobs=1':>12s} {'sk n_jobs=-1':>12s} {'flat':>10s} {'speedup':>8s}  identical")
+for b in args.batch:
+    X = X_all[np.arange(b) % len(X_all)]
+    rf.n_jobs = 1
+    t_sk1 = per_call(rf.predict_proba, X)
+    ref = rf.predict_proba(X)
+    rf.n_jobs = -1
+    t_skn = per_call(rf.predict_proba, X)
+    t_flat = per_call(lambda A: flat_forest.predict_proba(flat, A), X)
+    same = np.array_equal(ref, flat_forest.predict_proba(flat, X))
+    print(f"{b:6d} {t_sk1 * 1e3:10.2f}ms {t_skn * 1e3:10.2f}ms {t_flat * 1e3:8.3f}ms "
+          f"{min(t_sk1, t_skn) / t_flat:7.1f}x  {same}")
+
+print("\npruned / quantized (vs full forest labels on the CSV):")
+print(f"{'variant':28s} {'nodes':>7s} {'KiB':>6s} {'ms@64':>7s} {'agree':>7s}")
+ref_labels = rf.predict(X_all)
+X64 = X_all[np.arange(64) % len(X_all)]
+variants = [
+    ("full float64", {}),
+    ("leaves float16", {"leaf_dtype": "float16"}),
+    ("leaves uint8", {"leaf_dtype": "uint8"}),
+    ("depth 8", {"max_depth": 8}),
+    ("depth 8 + uint8", {"max_depth": 8, "leaf_dtype": "uint8"}),
+    ("100 trees", {"n_trees": 100}),
+    ("100 trees depth 8 + uint8", {"n_trees": 100, "max_depth": 8, "leaf_dtype": "uint8"}),
+]
+for label, kw in variants:
+    f = flat_forest.prune(flat, **kw) if kw else flat
+    agree = np.mean(flat_forest.predict(f, X_all) == ref_labels)
+    t = per_call(lambda A: flat_forest.predict_proba(f, A), X64)
+    print(f"{label:28s} {len(f['feature']):7d} {flat_forest.nbytes(f) / 1024:6.0f} {t * 1e3:7.3f} {agree:7.2%}")
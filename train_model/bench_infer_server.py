@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Load generator for infer_server.py.
+
+Starts the server (unless --no_spawn points at a running one), then runs
+--clients closed-loop clients for --duration seconds, each sending one-row
+predict requests taken from the test feature CSV. Prints client-side p50/p99
+latency and throughput, the server's own metrics, and as a baseline the
+per-call latency of the bundle used directly with n_jobs=-1 (what
+predict_on_test.py does, one row at a time).
+
+Example:
+  python3 bench_infer_server.py --clients 1 8 32 --max_wait_ms 2
+  python3 bench_infer_server.py --http 8765 --clients 16
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bundle", default=os.path.join(HERE, "rf_congctrl.pkl"))
+parser.add_argument("--csv", default=os.path.join(HERE, "..", "build_features", "features_no_cond_test.csv"))
+parser.add_argument("--sock", default="/tmp/rf_infer_bench.sock")
+parser.add_argument("--http", type=int, default=None, help="use HTTP on this port instead of the socket")
+parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+parser.add_argument("--rows", type=int, default=1, help="rows per request")
+parser.add_argument("--duration", type=float, default=5.0, help="seconds per client count")
+parser.add_argument("--max_batch", type=int, default=256)
+parser.add_argument("--max_wait_ms", type=float, default=2.0)
+parser.add_argument("--model_jobs", type=int, default=1)
+parser.add_argument("--no_spawn", action="store_true", help="use an already running server")
+parser.add_argument("--baseline_calls", type=int, default=50, help="direct predict calls (0 to skip)")
+args = parser.parse_args()
+
+
+def load_rows(path, feature_cols):
+    with open(path, newline="") as f:
+        return [[float(r[c]) for c in feature_cols] for r in csv.DictReader(f)]
+
+
+class SockClient:
+    def __init__(self):
+        self.s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.s.connect(args.sock)
+        self.f = self.s.makefile("rb")
+
+    def call(self, req):
+        self.s.sendall((json.dumps(req) + "\n").encode())
+        return json.loads(self.f.readline())
+
+    def close(self):
+        self.s.close()
+
+
+class HttpClient:
+    def __init__(self):
+        self.c = http.client.HTTPConnection("127.0.0.1", args.http)
+
+    def call(self, req):
+        if req["cmd"] == "metrics":
+            self.c.request("GET", "/metrics")
+        else:
+            self.c.request("POST", "/" + req["cmd"], json.dumps(req), {"Content-Type": "application/json"})
+        return json.loads(self.c.getresponse().read())
+
+    def close(self):
+        self.c.close()
+
+
+Client = HttpClient if args.http else SockClient
+
+
+def wait_ready(timeout=60.0):
+    t_end = time.time() + timeout
+    while time.time() < t_end:
+        try:
+            c = Client()
+            c.call({"cmd": "metrics"})
+            c.close()
+            return
+        except (OSError, ValueError):
+            time.sleep(0.1)
+    raise SystemExit("server did not come up")
+
+
+def run_clients(n_clients, rows):
+    stop = threading.Event()
+    lat = [[] for _ in range(n_clients)]
+    errors = [0]
+
+    def client(i):
+        c = Client()
+        k = i
+        while not stop.is_set():
+            batch = [rows[(k + j) % len(rows)] for j in range(args.rows)]
+            k += args.rows
+            t0 = time.perf_counter()
+            resp = c.call({"cmd": "predict", "rows": batch})
+            lat[i].append(time.perf_counter() - t0)
+            if not resp.get("ok"):
+                errors[0] += 1
+        c.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    all_lat = np.concatenate([np.array(x) for x in lat]) * 1e3
+    return all_lat, elapsed, errors[0]
+
+
+def baseline(rows):
+    """Per-call latency of the bundle used directly, one row per call."""
+    import joblib
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = joblib.load(args.bundle)["model"]
+    X = np.asarray(rows)
+    model.predict(X[:1])   # warm up the thread pool
+    lat = []
+    for i in range(args.baseline_calls):
+        t0 = time.perf_counter()
+        model.predict(X[i % len(X):i % len(X) + 1])
+        lat.append(time.perf_counter() - t0)
+    lat = np.array(lat) * 1e3
+    print(f"{'direct':>8s} {'':>8s} {np.percentile(lat, 50):10.2f} {np.percentile(lat, 99):10.2f} "
+          f"{1e3 / lat.mean():10.0f}   (model.predict, 1 row/call, n_jobs={model.n_jobs})")
+
+
+def main():
+    import joblib
+
+    feature_cols = list(joblib.load(args.bundle)["feature_cols"])
+    rows = load_rows(args.csv, feature_cols)
+
+    server = None
+    if not args.no_spawn:
+        cmd = [sys.executable, os.path.join(HERE, "infer_server.py"), "--bundle", args.bundle,
+               "--max_batch", str(args.max_batch), "--max_wait_ms", str(args.max_wait_ms),
+               "--model_jobs", str(args.model_jobs)]
+        cmd += ["--sock", "", "--http", str(args.http)] if args.http else ["--sock", args.sock]
+        server = subprocess.Popen(cmd, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        print(f"{'clients':>8s} {'requests':>8s} {'p50_ms':>10s} {'p99_ms':>10s} {'req/s':>10s}  server batch")
+        for n in args.clients:
+            c = Client()
+            c.call({"cmd": "reset"})
+            lat, elapsed, errors = run_clients(n, rows)
+            m = c.call({"cmd": "metrics"})["metrics"]
+            c.close()
+            note = f"  ({errors} errors)" if errors else ""
+            print(f"{n:8d} {len(lat):8d} {np.percentile(lat, 50):10.2f} {np.percentile(lat, 99):10.2f} "
+                  f"{len(lat) / elapsed:10.0f}  mean {m.get('batch_rows_mean', 0):.1f} rows, "
+                  f"server p50 {m.get('latency_ms_p50', 0):.2f} / p99 {m.get('latency_ms_p99', 0):.2f} ms{note}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.baseline_calls:
+        baseline(rows)
+
+
+if __name__ == "__main__":
+    main()
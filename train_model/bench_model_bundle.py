@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load time and memory of the bundle directory (model_bundle.py) against the
+joblib pickle, each in a fresh interpreter:
+
+  - load     : wall time of the import plus load, and of the load alone,
+               best of --repeat child processes
+  - predict  : both give the same predict_proba on the rows of --csv
+  - sharing  : --procs processes load the bundle and touch every array;
+               from /proc/<pid>/smaps, the pages of the .npy maps are
+               shared between them (Pss well below Rss) while the
+               unpickled model is private to each process
+
+Example:
+  python3 bench_model_bundle.py --csv ../build_features/features_no_cond_test.csv --procs 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bundle", default=os.path.join(HERE, "rf_congctrl.bundle"))
+parser.add_argument("--pkl", default=os.path.join(HERE, "rf_congctrl.pkl"))
+parser.add_argument("--csv", default=os.path.join(HERE, "..", "build_features", "features_no_cond_test.csv"))
+parser.add_argument("--repeat", type=int, default=5, help="best of N child processes")
+parser.add_argument("--procs", type=int, default=4, help="processes for the sharing test")
+args = parser.parse_args()
+
+# Run in each child: time import + load, then optionally predict and report smaps
+CHILD = r"""
+import sys, time, json, os
+t0 = time.perf_counter()
+import warnings
+warnings.filterwarnings("ignore")
+import model_bundle
+t1 = time.perf_counter()
+bundle = model_bundle.load_bundle(sys.argv[1], sys.argv[2])
+t2 = time.perf_counter()
+out = {"total_ms": (t2 - t0) * 1e3, "load_ms": (t2 - t1) * 1e3}
+if sys.argv[3]:
+    import numpy as np
+    X = np.loadtxt(sys.argv[3], delimiter=",", skiprows=1, usecols=json.loads(sys.argv[4]), ndmin=2)
+    out["proba"] = bundle["model"].predict_proba(X).tolist()
+if sys.argv[5] == "hold":
+    import numpy as np
+    flat = getattr(bundle["model"], "flat", None)
+    if flat is not None:
+        for a in flat.values():
+            int(np.asarray(a).view(np.uint8).sum())   # touch every page
+    print("ready", flush=True)
+    sys.stdin.readline()   # measure once every process has its copy / mapping
+    rss = pss = 0
+    maps = ""
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            parts = line.split()
+            if not line[0].isupper():
+                maps = parts[-1] if len(parts) >= 6 else ""
+            elif maps.endswith(".npy") and parts[0] in ("Rss:", "Pss:"):
+                if parts[0] == "Rss:":
+                    rss += int(parts[1])
+                else:
+                    pss += int(parts[1])
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    out.update(npy_rss_kb=rss, npy_pss_kb=pss, rss_kb=int(status["VmRSS"].split()[0]))
+    print(json.dumps(out), flush=True)
+    sys.stdin.readline()
+else:
+    print(json.dumps(out), flush=True)
+"""
+
+
+def child(path, engine, csv="", cols="[]", hold=""):
+    cmd = [sys.executable, "-c", CHILD, path, engine, csv, cols, hold]
+    return subprocess.Popen(cmd, cwd=HERE, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+
+def run(path, engine, **kw):
+    p = child(path, engine, **kw)
+    out, _ = p.communicate("")
+    return json.loads(out)
+
+
+with open(args.csv) as f:
+    header = f.readline().strip().split(",")
+with open(os.path.join(args.bundle, "bundle.json")) as f:
+    cols = json.dumps([header.index(c) for c in json.load(f)["feature_cols"]])
+
+print(f"{'bundle':28s} {'engine':7s} {'import+load ms':>14s} {'load ms':>8s}")
+for path, engine in [(args.pkl, "sklearn"), (args.pkl, "flat"), (args.bundle, "flat")]:
+    runs = [run(path, engine) for _ in range(args.repeat)]
+    print(f"{os.path.basename(path):28s} {engine:7s} {min(r['total_ms'] for r in runs):14.1f} "
+          f"{min(r['load_ms'] for r in runs):8.1f}")
+
+ref = run(args.pkl, "sklearn", csv=args.csv, cols=cols)["proba"]
+got = run(args.bundle, "flat", csv=args.csv, cols=cols)["proba"]
+assert ref == got, "bundle predictions differ from the pickle's"
+print(f"[OK] predict_proba identical to the sklearn pickle on {len(ref)} rows")
+
+for path, engine in [(args.bundle, "flat"), (args.pkl, "sklearn")]:
+    procs = [child(path, engine, hold="hold") for _ in range(args.procs)]
+    for p in procs:
+        p.stdout.readline()   # loaded
+    stats = []
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+        stats.append(json.loads(p.stdout.readline()))
+    for p in procs:
+        p.communicate("\n")
+    rss = sum(s["rss_kb"] for s in stats) / len(stats)
+    line = f"{args.procs} x {os.path.basename(path):20s}: RSS {rss / 1024:.1f} MiB per process"
+    if stats[0]["npy_rss_kb"]:
+        line += (f", .npy maps Rss {stats[0]['npy_rss_kb']} KiB / Pss {stats[0]['npy_pss_kb']} KiB "
+                 f"(shared by {stats[0]['npy_rss_kb'] / max(stats[0]['npy_pss_kb'], 1):.1f} processes)")
+    print(line)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup budget of predict.py: it is meant to be called once per run from
+shell loops, so the time to the first prediction is what counts.
+
+  - wall     : best of --repeat runs of `predict.py <csv>` (flat engine,
+               bundle directory), against the same call with --engine sklearn
+               (pickle) and the old predict_on_test.py startup (pandas,
+               matplotlib, sklearn and joblib.load of the pickle)
+  - imports  : `python -X importtime predict.py <csv>`: the heaviest top-level
+               imports, and none of --forbid may be imported at all
+
+Exits with status 1 and a [FAIL] line when predict.py is over --budget_ms
+or imports a forbidden module, so it can guard the budget in CI.
+
+Example:
+  python3 bench_predict_startup.py --budget_ms 150
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--csv", default=os.path.join(HERE, "..", "build_features", "features_no_cond_test.csv"))
+parser.add_argument("--repeat", type=int, default=10, help="best of N runs")
+parser.add_argument("--budget_ms", type=float, default=150.0, help="max wall time of predict.py")
+parser.add_argument("--forbid", nargs="+", default=["pandas", "matplotlib", "sklearn", "joblib", "scipy"])
+args = parser.parse_args()
+
+PREDICT = os.path.join(HERE, "predict.py")
+OLD_STARTUP = ("import pandas, joblib, warnings; import matplotlib.pyplot; import sklearn.metrics; "
+               "warnings.filterwarnings('ignore'); joblib.load('rf_congctrl.pkl')")
+
+CASES = [
+    ("python (empty)", [sys.executable, "-c", "pass"]),
+    ("predict.py", [sys.executable, PREDICT, args.csv]),
+    ("predict.py --engine sklearn", [sys.executable, PREDICT, args.csv, "--engine", "sklearn"]),
+    ("old startup (no predict)", [sys.executable, "-c", OLD_STARTUP]),
+]
+
+
+def wall(cmd):
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+print(f"{'command':30s} {'best ms':>8s}")
+times = {}
+for name, cmd in CASES:
+    times[name] = wall(cmd)
+    print(f"{name:30s} {times[name]:8.1f}")
+
+# -X importtime: "import time: self [us] | cumulative | <indent>name", indent = nesting level
+res = subprocess.run([sys.executable, "-X", "importtime", PREDICT, args.csv], cwd=HERE,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+modules, top = set(), []
+for line in res.stderr.splitlines():
+    if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+        continue
+    _, cum, name = line.split("|")
+    modules.add(name.strip())
+    if not name[1:].startswith(" "):
+        top.append((int(cum), name.strip()))
+top.sort(reverse=True)
+print("heaviest top-level imports: " + ", ".join(f"{n} {c / 1e3:.1f} ms" for c, n in top[:6]))
+
+bad = sorted(m for m in modules if m.split(".")[0] in args.forbid)
+ok = True
+if bad:
+    print(f"[FAIL] predict.py imports {', '.join(sorted({m.split('.')[0] for m in bad}))}")
+    ok = False
+else:
+    print(f"[OK] predict.py imports none of {', '.join(args.forbid)}")
+if times["predict.py"] > args.budget_ms:
+    print(f"[FAIL] predict.py took {times['predict.py']:.0f} ms, budget {args.budget_ms:.0f} ms")
+    ok = False
+else:
+    print(f"[OK] predict.py {times['predict.py']:.0f} ms within the {args.budget_ms:.0f} ms budget "
+          f"({times['old startup (no predict)'] / times['predict.py']:.1f}x faster than the old startup)")
+sys.exit(0 if ok else 1)
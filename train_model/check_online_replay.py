@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Replay check of online_classify.py: per-connection state on old ss logs
+(control, data and stale sockets mixed in one file, no flow column).
+
+  - every replayed log gives exactly one event, with a label
+  - the final ip_tp_mbps estimate of the data connection is within --tol of
+    build_features.py's ts_goodput_mean (same bytes_acked, data connection
+    picked by timeseries.select_data_flow); iperf3's ip_tp_mbps is printed
+    next to it, it counts what the sender wrote into its socket buffer and
+    is not reachable from ss samples
+
+Exits non-zero on any mismatch.
+
+Example:
+  python3 check_online_replay.py
+  python3 check_online_replay.py --logs ../collect_data_test/ss/cubic_rtt30_bw75_run1.log
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOG_ROOT = os.path.join(HERE, "..", "collect_data_test")
+
+import model_bundle  # noqa: E402
+from online_classify import ONLINE_FEATURES, OnlineClassifier, iter_log_connections, replay  # noqa: E402
+from feature_pipeline import parse_name  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--logs", nargs="+", default=sorted(glob.glob(os.path.join(LOG_ROOT, "ss", "*.log"))))
+parser.add_argument("--json_dir", default=os.path.join(LOG_ROOT, "iperf"))
+parser.add_argument("--tol", type=float, default=0.05, help="max relative error of ip_tp_mbps")
+args = parser.parse_args()
+
+bundle = model_bundle.load_bundle()
+ok = True
+
+# 1. One labelled event per log
+events = []
+replay(OnlineClassifier(bundle, emit=lambda line: events.append(json.loads(line))), args.logs, every=1.0)
+names = sorted(os.path.splitext(os.path.basename(p))[0] for p in args.logs)
+unlabelled = [e["flow"] for e in events if e["label"] is None]
+if sorted(e["flow"] for e in events) != names or unlabelled:
+    print(f"[FAIL] replay: {len(events)} events for {len(names)} logs, {len(unlabelled)} without a label")
+    ok = False
+else:
+    print(f"[OK] replay: one labelled event per log ({len(events)})")
+
+# 2. ip_tp_mbps of the data connection against build_features.py
+tmp = tempfile.mkdtemp(prefix="check_online_")
+try:
+    ss_dir, json_dir = os.path.join(tmp, "ss"), os.path.join(tmp, "iperf")
+    os.makedirs(ss_dir)
+    os.makedirs(json_dir)
+    for log in args.logs:
+        key = os.path.splitext(os.path.basename(log))[0]
+        os.symlink(os.path.abspath(log), os.path.join(ss_dir, key + ".log"))
+        os.symlink(os.path.abspath(os.path.join(args.json_dir, key + ".json")), os.path.join(json_dir, key + ".json"))
+    prefix = os.path.join(tmp, "f")
+    subprocess.run([sys.executable, os.path.join(HERE, "..", "build_features", "build_features.py"),
+                    "--ss_dir", ss_dir, "--json_dir", json_dir, "--out_prefix", prefix,
+                    "--features", "ts_goodput_mean", "ip_tp_mbps", "--jobs", "1"],
+                   check=True, stdout=subprocess.DEVNULL, env=dict(os.environ, DATASET_CACHE=os.path.join(tmp, "c")))
+    with open(prefix + "_with_cond.csv", newline="") as f:
+        expected = {(r["algo"], int(r["rtt_setting"]), int(r["bw_setting"]), int(r["run"])): r
+                    for r in csv.DictReader(f)}
+finally:
+    shutil.rmtree(tmp)
+
+worst = (0.0, None)
+for log in args.logs:
+    name = os.path.splitext(os.path.basename(log))[0]
+    clf = OnlineClassifier(bundle)
+    for t, samples in iter_log_connections(log):
+        clf.feed(t, [((name, conn), s) for conn, s in samples])
+    tp = ONLINE_FEATURES["ip_tp_mbps"](clf.flows[clf.data_connections()[name]])
+    r = expected[parse_name(name + ".log")]
+    err = abs(tp / float(r["ts_goodput_mean"]) - 1)
+    if len(args.logs) == 1:
+        print(f"  {name}: online ip_tp_mbps {tp:.3f}, build_features ts_goodput_mean "
+              f"{float(r['ts_goodput_mean']):.3f}, iperf3 ip_tp_mbps {float(r['ip_tp_mbps']):.3f}")
+    if err >= worst[0]:
+        worst = (err, name)
+if worst[0] > args.tol:
+    print(f"[FAIL] ip_tp_mbps: {worst[1]} is {worst[0]:.1%} off ts_goodput_mean (> {args.tol:.0%})")
+    ok = False
+else:
+    print(f"[OK] ip_tp_mbps within {worst[0]:.2%} of build_features ts_goodput_mean on {len(args.logs)} logs")
+
+sys.exit(0 if ok else 1)
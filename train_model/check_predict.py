@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check that `predict.py --ss` scores a run on the same features as
+build_features.py.
+
+  --json_dir : every bundle feature of every log equals the build_features.py
+               CSV value, and the predictions equal those of predict.py on
+               that CSV
+  ss only    : the ss_* columns still equal the CSV; the estimated ip_* are
+               sane (throughput in (0, 1.1 * bw_setting], mean RTT median
+               error under --rtt_tol against iperf3)
+
+Exits non-zero on any mismatch.
+
+Example:
+  python3 check_predict.py
+  python3 check_predict.py --logs ../collect_data/logs/ss/bbr_rtt10_bw10_run1.log
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "build_features"))
+
+import predict  # noqa: E402
+from feature_pipeline import parse_name  # noqa: E402
+
+LOG_ROOT = os.path.join(HERE, "..", "collect_data", "logs")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--logs", nargs="+", default=sorted(glob.glob(os.path.join(LOG_ROOT, "ss", "*.log"))))
+parser.add_argument("--json_dir", default=os.path.join(LOG_ROOT, "iperf"))
+parser.add_argument("--bundle", default=os.path.join(HERE, "rf_congctrl.bundle"))
+parser.add_argument("--rtt_tol", type=float, default=0.15, help="max median relative error of ip_mean_rtt_ms")
+args = parser.parse_args()
+
+with open(os.path.join(args.bundle, "bundle.json")) as f:
+    cols = list(json.load(f)["feature_cols"])
+
+
+def run(cmd):
+    return subprocess.run([sys.executable] + cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+# build_features.py over just these logs (and their iperf3 JSON)
+tmp = tempfile.mkdtemp(prefix="check_predict_")
+ok = True
+try:
+    ss_dir, json_dir = os.path.join(tmp, "ss"), os.path.join(tmp, "iperf")
+    os.makedirs(ss_dir)
+    os.makedirs(json_dir)
+    for log in args.logs:
+        key = os.path.splitext(os.path.basename(log))[0]
+        os.symlink(os.path.abspath(log), os.path.join(ss_dir, os.path.basename(log)))
+        os.symlink(os.path.abspath(os.path.join(args.json_dir, key + ".json")),
+                   os.path.join(json_dir, key + ".json"))
+    prefix = os.path.join(tmp, "f")
+    run([os.path.join(HERE, "..", "build_features", "build_features.py"), "--ss_dir", ss_dir,
+         "--json_dir", json_dir, "--out_prefix", prefix, "--bundle", args.bundle, "--jobs", "1"])
+
+    expected = {}
+    with open(prefix + "_with_cond.csv", newline="") as f:
+        for r in csv.DictReader(f):
+            expected[(r["algo"], int(r["rtt_setting"]), int(r["bw_setting"]), int(r["run"]))] = r
+
+    def by_run(rows):
+        return {parse_name(m["log"]): dict(zip(cols, x)) for m, x in rows}
+
+    # 1. With the iperf3 JSON: every column identical
+    got = by_run(predict.iter_ss(args.logs, cols, json_dir))
+    bad = [(k, c) for k, r in expected.items() for c in cols if k not in got or got[k][c] != float(r[c])]
+    if len(got) != len(expected) or bad:
+        print(f"[FAIL] --json_dir: {len(got)} logs vs {len(expected)} CSV rows, {len(bad)} values differ")
+        for k, c in bad[:5]:
+            print(f"  {k} {c}: {got.get(k, {}).get(c)} != {expected[k][c]}")
+        ok = False
+    else:
+        print(f"[OK] --json_dir: {len(got)} logs, {len(cols)} features identical to build_features.py")
+
+    from_csv = run([os.path.join(HERE, "predict.py"), prefix + "_with_cond.csv", "--bundle", args.bundle])
+    from_ss = run([os.path.join(HERE, "predict.py"), "--ss"] + args.logs
+                  + ["--json_dir", json_dir, "--bundle", args.bundle])
+    labels_csv = sorted((p["algo"], p["label"], p["confidence"]) for p in map(json.loads, from_csv.splitlines()))
+    labels_ss = sorted((p["algo"], p["label"], p["confidence"]) for p in map(json.loads, from_ss.splitlines()))
+    if labels_csv != labels_ss:
+        print("[FAIL] predictions of --ss --json_dir differ from the CSV ones")
+        ok = False
+    else:
+        print(f"[OK] predictions of --ss --json_dir equal the CSV ones ({len(labels_ss)} runs)")
+
+    # 2. ss logs only: ss_* identical, ip_* estimated
+    got = by_run(predict.iter_ss(args.logs, cols))
+    ss_cols = [c for c in cols if c.startswith("ss_")]
+    bad = [(k, c) for k, r in expected.items() for c in ss_cols if got[k][c] != float(r[c])]
+    tp_bad = [k for k in expected if "ip_tp_mbps" in cols and not 0 < got[k]["ip_tp_mbps"] <= 1.1 * k[2]]
+    rtt_err = statistics.median(abs(got[k]["ip_mean_rtt_ms"] / float(r["ip_mean_rtt_ms"]) - 1)
+                                for k, r in expected.items()) if "ip_mean_rtt_ms" in cols else 0.0
+    if bad:
+        print(f"[FAIL] ss only: {len(bad)} ss_* values differ from build_features.py, e.g. {bad[:3]}")
+        ok = False
+    if tp_bad:
+        print(f"[FAIL] ss only: ip_tp_mbps out of (0, 1.1 * bw] for {len(tp_bad)} logs, e.g. {tp_bad[:3]}")
+        ok = False
+    if rtt_err > args.rtt_tol:
+        print(f"[FAIL] ss only: ip_mean_rtt_ms median error {rtt_err:.1%} > {args.rtt_tol:.0%}")
+        ok = False
+    if not (bad or tp_bad or rtt_err > args.rtt_tol):
+        print(f"[OK] ss only: {', '.join(ss_cols)} identical; ip_* estimated "
+              f"(mean RTT median error {rtt_err:.1%})")
+finally:
+    shutil.rmtree(tmp)
+
+sys.exit(0 if ok else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Classify the congestion control of the TCP flows in packet captures.
+
+Each capture (pcap or pcapng, e.g. `tcpdump -s 128 -w x.pcap`) is read in
+chunks and every connection is reconstructed from its packets
+(build_features/feature_pipeline/pcap.py); the bundle's feature_cols are
+computed from the reconstructed sender state, sampled every --interval
+seconds like collect_ss.py, and all flows are scored in one batch. One JSON
+line per flow:
+
+  {"capture": "x.pcap", "flow": "10.0.0.1:40712", "peer": "10.0.0.2:5201",
+   "label": "cubic", "confidence": 0.87, "packets": 41234, "bytes_acked": 61843968,
+   "duration_s": 30.2}
+
+A summary (packets, MB/s, flows) goes to stderr. The capture should be taken
+near the sender: RTT is measured from data to ack at the capture point.
+
+Example:
+  python3 classify_pcap.py trace.pcap --port 5201
+  python3 classify_pcap.py *.pcapng --csv flows.csv --engine sklearn
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import model_bundle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "build_features"))
+from feature_pipeline import pcap  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("captures", nargs="+", help="pcap / pcapng files")
+    parser.add_argument("--bundle", default=None,
+                        help="model bundle (model_bundle.py); default rf_congctrl.bundle, .pkl for --engine sklearn")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="flat",
+                        help="flat: array-backed evaluator (flat_forest.py), same predictions")
+    parser.add_argument("--interval", type=float, default=0.5, help="trace sampling interval (s)")
+    parser.add_argument("--port", type=int, nargs="+", default=None, help="only connections on these ports")
+    parser.add_argument("--min_bytes", type=int, default=1 << 20, help="skip flows that acked less")
+    parser.add_argument("--chunk", type=int, default=16, help="read size (MB)")
+    parser.add_argument("--csv", default=None, help="also write the features of every flow here")
+    parser.add_argument("--out", default=None, help="write predictions here instead of stdout")
+    args = parser.parse_args()
+
+    # The bundle was fitted on a DataFrame; rows here are plain arrays
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = model_bundle.load_bundle(args.bundle, args.engine)
+    cols = list(bundle["feature_cols"])
+    classes = bundle["label_encoder"].classes_
+
+    t0 = time.perf_counter()
+    rows, packets, size = [], 0, 0
+    for path in args.captures:
+        flows, cap = pcap.capture_features(path, cols, args.interval, args.min_bytes, args.port, args.chunk << 20)
+        rows += [(path, flow, feats) for flow, feats in flows]
+        packets += cap.packets
+        size += cap.bytes
+    read_s = time.perf_counter() - t0
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        if rows:
+            X = np.array([[feats[c] for c in cols] for _, _, feats in rows], dtype=np.float64)
+            proba = bundle["model"].predict_proba(X)
+            for (path, flow, _), p in zip(rows, proba):
+                k = int(np.argmax(p))
+                out.write(json.dumps({
+                    "capture": os.path.basename(path), "flow": flow["src"], "peer": flow["dst"],
+                    "label": str(classes[k]), "confidence": round(float(p[k]), 4),
+                    "packets": flow["packets"], "bytes_acked": flow["bytes_acked"],
+                    "duration_s": round(flow["duration_s"], 3),
+                }) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["capture", "flow", "peer"] + cols)
+            for path, flow, feats in rows:
+                w.writerow([os.path.basename(path), flow["src"], flow["dst"]] + [feats[c] for c in cols])
+
+    print(f"[pcap] {len(args.captures)} captures, {packets} packets, {size / 1e6:.1f} MB in {read_s:.2f} s "
+          f"({size / 1e6 / max(read_s, 1e-9):.0f} MB/s), {len(rows)} flows scored", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Array-backed evaluator for the rf_congctrl random forest.
+
+flatten() copies every tree of a fitted RandomForestClassifier into one set
+of contiguous NumPy arrays (all trees concatenated, child indices global):
+
+  feature   int32   split feature of each node (0 for leaves)
+  threshold float32 split threshold, rounded down to float32 (see below)
+  children  int32   (n_nodes, 2) left / right child; leaves point to themselves
+  value     float64 per-node class probabilities (n_nodes, n_classes)
+  roots     int32   root node of each tree
+
+predict_proba() then walks all trees for a whole batch at once: every
+(row, tree) pair starts at its root and all of them advance one level per
+step with a few array gathers (child = children[node, x > threshold]);
+pairs that reached a leaf drop out of the active set, so deep trees only
+cost for the rows that actually go deep.
+
+The result is bit-identical to sklearn: sklearn casts X to float32 and tests
+x <= threshold (float64), which for a float32 x is the same as x <= the
+largest float32 not above the threshold; leaf values are normalized exactly
+like DecisionTreeClassifier.predict_proba; and the per-tree probabilities
+are summed in tree order before dividing by n_trees.
+
+prune() gives smaller, approximate forests: keep the first n_trees trees,
+cut them at max_depth (inner nodes become leaves with their own class
+distribution) and/or store leaf values as float16 / uint8.
+
+Example:
+  python3 flat_forest.py rf_congctrl.pkl            # -> rf_congctrl_flat.npz
+  python3 flat_forest.py rf_congctrl.pkl --max_depth 8 --leaf_dtype uint8
+"""
+import argparse
+import os
+
+import numpy as np
+
+ARRAYS = ["feature", "threshold", "children", "value", "roots", "classes"]
+LEAF_DTYPES = {"float64": np.float64, "float32": np.float32, "float16": np.float16, "uint8": np.uint8}
+
+
+def _floor_f32(x):
+    """Largest float32 <= x, elementwise."""
+    f = x.astype(np.float32)
+    over = f.astype(np.float64) > x
+    f[over] = np.nextafter(f[over], np.float32(-np.inf))
+    return f
+
+
+def flatten(rf):
+    """Fitted RandomForestClassifier -> dict of flat arrays."""
+    n_classes = len(rf.classes_)
+    feature, threshold, children, value, roots = [], [], [], [], []
+    base = 0
+    for est in rf.estimators_:
+        t = est.tree_
+        n = t.node_count
+        idx = np.arange(n, dtype=np.int64)
+        leaf = t.children_left == -1
+        roots.append(base)
+        feature.append(np.where(leaf, 0, t.feature))
+        threshold.append(np.where(leaf, np.inf, t.threshold))
+        children.append(np.stack([np.where(leaf, idx, t.children_left),
+                                  np.where(leaf, idx, t.children_right)], axis=1) + base)
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        v = t.value[:, 0, :n_classes].copy()
+        norm = v.sum(axis=1)
+        norm[norm == 0.0] = 1.0
+        v /= norm[:, None]
+        value.append(v)
+        base += n
+
+    return {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": _floor_f32(np.concatenate(threshold)),
+        "children": np.concatenate(children).astype(np.int32),
+        "value": np.concatenate(value),
+        "roots": np.array(roots, dtype=np.int32),
+        "classes": np.asarray(rf.classes_),
+    }
+
+
+def leaf_values(flat):
+    """Leaf values as float64 probabilities, undoing uint8 quantization."""
+    v = flat["value"]
+    if v.dtype == np.uint8:
+        return v.astype(np.float64) / 255.0
+    return v.astype(np.float64, copy=False)
+
+
+def apply(flat, X):
+    """Leaf index reached by each row in each tree: (n_rows, n_trees)."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    n_rows, n_feat = X.shape
+    n_trees = len(flat["roots"])
+    feature, threshold = flat["feature"], flat["threshold"]
+    children = flat["children"].ravel()   # node * 2 + (go right)
+    is_leaf = flat["children"][:, 0] == np.arange(len(feature))
+    xs = X.ravel()
+
+    leaf = np.tile(flat["roots"], n_rows)                       # result, (row, tree) order
+    pos = np.arange(n_rows * n_trees)                           # active pairs
+    node = leaf.astype(np.intp)
+    x_off = np.repeat(np.arange(n_rows, dtype=np.intp) * n_feat, n_trees)
+    while len(pos):
+        right = xs[x_off + feature[node]] > threshold[node]
+        node = children[2 * node + right]
+        leaf[pos] = node
+        live = ~is_leaf[node]
+        pos, node, x_off = pos[live], node[live], x_off[live]
+    return leaf.reshape(n_rows, n_trees)
+
+
+def predict_proba(flat, X):
+    node = apply(flat, X)
+    # Summing over the leading (tree) axis adds the trees one after the
+    # other, the same order as sklearn's accumulation
+    proba = np.take(leaf_values(flat), node.T, axis=0).sum(axis=0)
+    proba /= node.shape[1]
+    return proba
+
+
+def predict(flat, X):
+    return flat["classes"].take(np.argmax(predict_proba(flat, X), axis=1), axis=0)
+
+
+class FlatModel:
+    """Drop-in for the sklearn model in a bundle (predict / predict_proba)."""
+
+    def __init__(self, flat):
+        self.flat = flat
+        self.classes_ = flat["classes"]
+
+    @classmethod
+    def from_sklearn(cls, rf):
+        return cls(flatten(rf))
+
+    def predict_proba(self, X):
+        return predict_proba(self.flat, X)
+
+    def predict(self, X):
+        return predict(self.flat, X)
+
+
+def prune(flat, n_trees=None, max_depth=None, leaf_dtype="float64"):
+    """
+    Approximate, smaller forest: first n_trees trees, cut at max_depth,
+    leaf values stored as leaf_dtype. Unreachable nodes are dropped.
+    """
+    roots = flat["roots"][:n_trees] if n_trees else flat["roots"]
+    left, right = flat["children"][:, 0], flat["children"][:, 1]
+
+    # Breadth-first from the kept roots, stopping at max_depth
+    keep, is_leaf = [], []
+    frontier = list(roots)
+    depth = 0
+    while frontier:
+        nxt = []
+        for n in frontier:
+            leaf = left[n] == n or (max_depth is not None and depth >= max_depth)
+            keep.append(n)
+            is_leaf.append(leaf)
+            if not leaf:
+                nxt += [left[n], right[n]]
+        frontier = nxt
+        depth += 1
+
+    keep = np.array(keep, dtype=np.int64)
+    is_leaf = np.array(is_leaf)
+    remap = np.full(len(left), -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+    new_idx = np.arange(len(keep))
+
+    value = flat["value"][keep].astype(np.float64)
+    dtype = LEAF_DTYPES[leaf_dtype]
+    if dtype == np.uint8:
+        value = np.round(value * 255.0).astype(np.uint8)
+    else:
+        value = value.astype(dtype)
+
+    return {
+        "feature": np.where(is_leaf, 0, flat["feature"][keep]).astype(np.int32),
+        "threshold": np.where(is_leaf, np.float32(np.inf), flat["threshold"][keep]).astype(np.float32),
+        "children": np.stack([np.where(is_leaf, new_idx, remap[left[keep]]),
+                              np.where(is_leaf, new_idx, remap[right[keep]])], axis=1).astype(np.int32),
+        "value": value,
+        "roots": remap[roots].astype(np.int32),
+        "classes": flat["classes"],
+    }
+
+
+def nbytes(flat):
+    return sum(flat[k].nbytes for k in ARRAYS)
+
+
+def save(path, flat, **meta):
+    """npz with the arrays plus scalar metadata (feature_cols, label names...)."""
+    np.savez(path, **flat, **{k: np.asarray(v) for k, v in meta.items()})
+
+
+def load(path):
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+
+def export_bundle(bundle, out_path, X_check=None, **prune_args):
+    """
+    Flatten bundle["model"] and save it next to the label names and
+    feature_cols. With X_check, verify the predictions against sklearn first.
+    Returns (flat, identical, agreement): whether predict_proba is
+    bit-identical and the fraction of equal labels (None when not checked).
+    """
+    rf = bundle["model"]
+    flat = flatten(rf)
+    if prune_args:
+        flat = prune(flat, **prune_args)
+
+    identical = agreement = None
+    if X_check is not None:
+        X_check = np.asarray(X_check, dtype=np.float64)
+        ref = rf.predict_proba(X_check)
+        got = predict_proba(flat, X_check)
+        identical = bool(np.array_equal(ref, got))
+        agreement = float(np.mean(ref.argmax(axis=1) == got.argmax(axis=1)))
+        if not prune_args and not identical:
+            raise AssertionError("flattened forest does not match sklearn")
+
+    save(out_path, flat,
+         label_names=np.asarray(bundle["label_encoder"].classes_).astype(str),
+         feature_cols=np.asarray(bundle["feature_cols"]).astype(str))
+    return flat, identical, agreement
+
+
+def main():
+    import joblib
+    import warnings
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bundle", help="model bundle from train_rf.py (rf_congctrl.pkl)")
+    parser.add_argument("--out", default=None, help="default: <bundle>_flat.npz")
+    parser.add_argument("--check_csv", default=None, help="feature CSV to verify predictions on")
+    parser.add_argument("--n_trees", type=int, default=None, help="prune: keep the first N trees")
+    parser.add_argument("--max_depth", type=int, default=None, help="prune: cut trees at this depth")
+    parser.add_argument("--leaf_dtype", choices=list(LEAF_DTYPES), default="float64",
+                        help="quantize leaf probabilities")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = joblib.load(args.bundle)
+    out = args.out or os.path.splitext(args.bundle)[0] + "_flat.npz"
+
+    X = None
+    if args.check_csv:
+        import pandas as pd
+
+        X = pd.read_csv(args.check_csv)[bundle["feature_cols"]].to_numpy(dtype=np.float64)
+
+    prune_args = {}
+    if args.n_trees or args.max_depth is not None or args.leaf_dtype != "float64":
+        prune_args = {"n_trees": args.n_trees, "max_depth": args.max_depth, "leaf_dtype": args.leaf_dtype}
+    flat, identical, agreement = export_bundle(bundle, out, X, **prune_args)
+
+    print(f"[OK] {len(flat['roots'])} trees, {len(flat['feature'])} nodes, "
+          f"{nbytes(flat) / 1024:.0f} KiB -> {out}")
+    if identical is not None:
+        print(f"[OK] on {len(X)} rows: predict_proba identical to sklearn: {identical}, "
+              f"same label: {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Long-running inference server for the rf_congctrl.pkl bundle.
+
+The bundle is loaded once. Concurrent requests are queued and a single
+worker thread micro-batches them: it takes the first waiting request, keeps
+collecting until --max_batch rows or --max_wait_ms have passed, and runs one
+predict_proba over the whole batch (300 trees cost about the same for 1 row
+or 200 rows, so batching is where the throughput comes from).
+
+Requests are JSON, one object per line on the Unix socket (same framing as
+ss_daemon.py) or one POST body over HTTP (--http PORT):
+
+  {"cmd": "predict", "rows": [[ss_rtt_ms, ss_rtt_var_ms, ...], ...]}
+  {"cmd": "predict", "rows": [{"ss_rtt_ms": 12.1, ...}, ...]}
+      -> {"ok": true, "labels": ["bbr", ...], "confidence": [0.93, ...]}
+  {"cmd": "metrics"}  -> latency p50/p99 (ms), throughput, batch sizes
+  {"cmd": "stop"}
+
+HTTP: POST /predict with {"rows": ...}, GET /metrics, POST /reset (clears metrics).
+
+Usage:
+  python3 infer_server.py --sock /tmp/rf_infer.sock --max_wait_ms 2 &
+  python3 bench_infer_server.py --sock /tmp/rf_infer.sock --clients 32
+"""
+import argparse
+import collections
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import model_bundle
+
+DEFAULT_SOCK = "/tmp/rf_infer.sock"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Pending:
+    __slots__ = ("X", "t_enq", "done", "result")
+
+    def __init__(self, X):
+        self.X = X
+        self.t_enq = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+
+
+class Batcher:
+    """Queue of requests served by one worker thread in micro-batches."""
+
+    def __init__(self, bundle, max_batch=256, max_wait_ms=2.0, model_jobs=1, window=100000):
+        self.model = bundle["model"]
+        self.classes = [str(c) for c in bundle["label_encoder"].classes_]
+        self.feature_cols = list(bundle["feature_cols"])
+        if hasattr(self.model, "n_jobs"):
+            self.model.n_jobs = model_jobs
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.q = queue.Queue()
+        self.stopping = threading.Event()
+
+        self.lock = threading.Lock()
+        self.latencies = collections.deque(maxlen=window)   # seconds, per request
+        self.batch_sizes = collections.deque(maxlen=window)  # rows per model call
+        self.n_requests = 0
+        self.n_rows = 0
+        self.t_start = time.time()
+
+    def to_matrix(self, rows):
+        if rows and isinstance(rows[0], dict):
+            rows = [[r[c] for c in self.feature_cols] for r in rows]
+        X = np.asarray(rows, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_cols):
+            raise ValueError(f"expected rows of {len(self.feature_cols)} features {self.feature_cols}")
+        return X
+
+    def predict(self, rows, timeout=30.0):
+        """Called from request threads: enqueue and wait for the batch result."""
+        p = Pending(self.to_matrix(rows))
+        self.q.put(p)
+        if not p.done.wait(timeout):
+            raise TimeoutError("inference timed out")
+        if isinstance(p.result, Exception):
+            raise p.result
+        return p.result
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                first = self.q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            n = len(first.X)
+            deadline = time.perf_counter() + self.max_wait
+            while n < self.max_batch:
+                left = deadline - time.perf_counter()
+                try:
+                    p = self.q.get(timeout=left) if left > 0 else self.q.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(p)
+                n += len(p.X)
+            self._serve(batch, n)
+
+    def _serve(self, batch, n):
+        try:
+            X = batch[0].X if len(batch) == 1 else np.concatenate([p.X for p in batch])
+            proba = self.model.predict_proba(X)
+            best = proba.argmax(axis=1)
+            conf = proba[np.arange(len(best)), best]
+            i = 0
+            for p in batch:
+                k = len(p.X)
+                p.result = ([self.classes[j] for j in best[i:i + k]],
+                            [round(float(c), 4) for c in conf[i:i + k]])
+                i += k
+        except Exception as e:
+            for p in batch:
+                p.result = e
+        now = time.perf_counter()
+        with self.lock:
+            for p in batch:
+                self.latencies.append(now - p.t_enq)
+            self.batch_sizes.append(n)
+            self.n_requests += len(batch)
+            self.n_rows += n
+        for p in batch:
+            p.done.set()
+
+    def metrics(self):
+        with self.lock:
+            lat = np.array(self.latencies) * 1e3
+            sizes = np.array(self.batch_sizes)
+            n_req, n_rows = self.n_requests, self.n_rows
+        elapsed = time.time() - self.t_start
+        out = {
+            "requests": n_req, "rows": n_rows, "uptime_s": round(elapsed, 1),
+            "req_per_s": round(n_req / elapsed, 1), "rows_per_s": round(n_rows / elapsed, 1),
+            "max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1e3,
+        }
+        if len(lat):
+            out.update({
+                "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+                "latency_ms_p99": round(float(np.percentile(lat, 99)), 3),
+                "batch_rows_mean": round(float(sizes.mean()), 2),
+                "batch_rows_max": int(sizes.max()),
+            })
+        return out
+
+    def reset_metrics(self):
+        with self.lock:
+            self.latencies.clear()
+            self.batch_sizes.clear()
+            self.n_requests = self.n_rows = 0
+            self.t_start = time.time()
+
+    def handle(self, req):
+        cmd = req.get("cmd")
+        if cmd == "predict":
+            labels, conf = self.predict(req["rows"])
+            return {"ok": True, "labels": labels, "confidence": conf}
+        if cmd == "metrics":
+            return {"ok": True, "metrics": self.metrics()}
+        if cmd == "reset":
+            self.reset_metrics()
+            return {"ok": True}
+        if cmd == "stop":
+            self.stopping.set()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown cmd {cmd!r}"}
+
+
+class LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                resp = self.server.batcher.handle(json.loads(line))
+            except Exception as e:
+                resp = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(resp) + "\n").encode())
+
+
+class LineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class HttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so clients can reuse connections
+
+    def _reply(self, code, obj):
+        body = (json.dumps(obj) + "\n").encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(200, {"ok": True, "metrics": self.server.batcher.metrics()})
+        else:
+            self._reply(404, {"ok": False, "error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/predict", "/reset"):
+            self._reply(404, {"ok": False, "error": "not found"})
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            req = json.loads(body) if body else {}
+            req["cmd"] = self.path[1:]
+            self._reply(200, self.server.batcher.handle(req))
+        except Exception as e:
+            self._reply(400, {"ok": False, "error": str(e)})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bundle", default=None,
+                        help="model bundle (model_bundle.py); default rf_congctrl.bundle, .pkl for --engine sklearn")
+    parser.add_argument("--sock", default=DEFAULT_SOCK, help="Unix socket path ('' to disable)")
+    parser.add_argument("--http", type=int, default=None, help="also serve HTTP on this port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--max_batch", type=int, default=256, help="max rows per model call")
+    parser.add_argument("--max_wait_ms", type=float, default=2.0, help="max time a batch waits to fill")
+    parser.add_argument("--model_jobs", type=int, default=1, help="n_jobs of the forest at inference")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="flat",
+                        help="flat: array-backed evaluator (flat_forest.py), same predictions")
+    args = parser.parse_args()
+
+    # The bundle was fitted on a DataFrame; rows here are plain arrays
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = model_bundle.load_bundle(args.bundle, args.engine)
+    batcher = Batcher(bundle, args.max_batch, args.max_wait_ms, args.model_jobs)
+
+    servers = []
+    if args.sock:
+        if os.path.exists(args.sock):
+            os.unlink(args.sock)
+        srv = LineServer(args.sock, LineHandler)
+        srv.batcher = batcher
+        servers.append(srv)
+    if args.http is not None:
+        srv = ThreadingHTTPServer((args.host, args.http), HttpHandler)
+        srv.daemon_threads = True
+        srv.batcher = batcher
+        servers.append(srv)
+    if not servers:
+        raise SystemExit("nothing to serve: give --sock and/or --http")
+    for srv in servers:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: batcher.stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: batcher.stopping.set())
+    print(f"[infer_server] features={batcher.feature_cols} max_batch={args.max_batch} "
+          f"max_wait={args.max_wait_ms}ms sock={args.sock or '-'} http={args.http or '-'}",
+          file=sys.stderr)
+
+    try:
+        batcher.run()
+    finally:
+        for srv in servers:
+            srv.shutdown()
+            srv.server_close()
+        if args.sock and os.path.exists(args.sock):
+            os.unlink(args.sock)
+    print(f"[infer_server] {json.dumps(batcher.metrics())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Versioned model bundle: the flattened forest (flat_forest.py) as
+memory-mappable .npy arrays next to a small JSON header, instead of a
+joblib pickle of the sklearn object graph.
+
+  rf_congctrl.bundle/
+    bundle.json     format, schema_version, model kind, classes (label
+                    names), feature_cols, training_data (file digests, rows,
+                    runs), metrics, the dtype / shape / sha1 of every array,
+                    and the versions that wrote it
+    feature.npy threshold.npy children.npy value.npy roots.npy classes.npy
+
+load() reads the header and np.load(mmap_mode="r")s the arrays: no sklearn
+import and no unpickling, so a bundle opens in milliseconds, and processes
+that load the same bundle share its pages in the page cache instead of each
+holding a private copy. The arrays are only read, never written.
+
+The header is checked on load. Another format or a newer schema_version is
+refused, and so is an array whose dtype or shape differs from the header.
+verify=True also checks the sha1 of every array file. Within one
+schema_version, fields may only be added; readers ignore unknown fields.
+
+load_bundle() is what the scripts call: a bundle directory (or its
+bundle.json) goes through load(), anything else is taken as a joblib pickle
+from an older train_rf.py. The result is the same dict either way: model
+(predict / predict_proba), label_encoder (.classes_, transform,
+inverse_transform) and feature_cols.
+
+Example:
+  python3 model_bundle.py convert rf_congctrl.pkl --train_csv features_no_cond.csv
+  python3 model_bundle.py info rf_congctrl.bundle --verify
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import time
+
+import numpy as np
+
+import flat_forest
+
+FORMAT = "congctrl-bundle"
+SCHEMA_VERSION = 1
+HEADER = "bundle.json"
+MODEL_KIND = "flat_forest"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUNDLE = os.path.join(HERE, "rf_congctrl.bundle")
+DEFAULT_PICKLE = os.path.join(HERE, "rf_congctrl.pkl")
+
+
+class LabelNames:
+    """The part of a fitted LabelEncoder the scripts use, from the header's class names."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {c: i for i, c in enumerate(self.classes_.tolist())}
+
+    def transform(self, y):
+        return np.array([self._index[v] for v in y], dtype=np.int64)
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y, dtype=np.int64)]
+
+
+def _digest(path, block=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(block)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+
+def describe_data(paths, **extra):
+    """training_data entry of the header: sha1 of each file, plus e.g. rows= and runs=."""
+    files = [{"name": os.path.basename(p), "sha1": _digest(p), "bytes": os.path.getsize(p)} for p in paths if p]
+    return dict({"files": files}, **extra)
+
+
+def header_path(path):
+    return path if os.path.basename(path) == HEADER else os.path.join(path, HEADER)
+
+
+def is_bundle(path):
+    return os.path.isfile(header_path(path))
+
+
+def read_header(path):
+    with open(header_path(path)) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT:
+        raise ValueError(f"{path}: not a {FORMAT} (format {header.get('format')!r})")
+    if header.get("schema_version", 0) > SCHEMA_VERSION:
+        raise ValueError(f"{path}: schema_version {header['schema_version']} is newer than this "
+                         f"reader ({SCHEMA_VERSION})")
+    if header.get("model") != MODEL_KIND:
+        raise ValueError(f"{path}: unknown model kind {header.get('model')!r}")
+    return header
+
+
+def save(path, flat, classes, feature_cols, training_data=None, metrics=None):
+    """
+    Write a bundle directory. It is assembled next to `path` and renamed
+    into place, so readers never see a half-written bundle.
+    """
+    tmp = path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {}
+    for name in flat_forest.ARRAYS:
+        a = np.ascontiguousarray(flat[name])
+        file = name + ".npy"
+        np.save(os.path.join(tmp, file), a, allow_pickle=False)
+        arrays[name] = {"file": file, "dtype": a.dtype.str, "shape": list(a.shape),
+                        "sha1": _digest(os.path.join(tmp, file))}
+
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    header = {
+        "format": FORMAT,
+        "schema_version": SCHEMA_VERSION,
+        "model": MODEL_KIND,
+        "classes": [str(c) for c in classes],
+        "feature_cols": list(feature_cols),
+        "n_trees": len(flat["roots"]),
+        "n_nodes": len(flat["feature"]),
+        "training_data": training_data or {},
+        "metrics": metrics or {},
+        "arrays": arrays,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "written_by": {"numpy": np.__version__, "python": platform.python_version(),
+                       "sklearn": sklearn_version},
+    }
+    with open(os.path.join(tmp, HEADER), "w") as f:
+        json.dump(header, f, indent=2)
+        f.write("\n")
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+    return header
+
+
+def load(path, mmap=True, verify=False):
+    """Bundle dict (model, label_encoder, feature_cols, header) of a bundle directory."""
+    header = read_header(path)
+    root = os.path.dirname(header_path(path))
+    flat = {}
+    for name in flat_forest.ARRAYS:
+        spec = header["arrays"][name]
+        file = os.path.join(root, spec["file"])
+        if verify and _digest(file) != spec["sha1"]:
+            raise ValueError(f"{path}: {spec['file']} does not match its sha1 in the header")
+        a = np.load(file, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if a.dtype.str != spec["dtype"] or list(a.shape) != spec["shape"]:
+            raise ValueError(f"{path}: {spec['file']} is {a.dtype.str} {list(a.shape)}, "
+                             f"header says {spec['dtype']} {spec['shape']}")
+        # Plain ndarray views of the map: the evaluator's results stay ndarrays
+        flat[name] = np.asarray(a)
+    return {
+        "model": flat_forest.FlatModel(flat),
+        "label_encoder": LabelNames(header["classes"]),
+        "feature_cols": list(header["feature_cols"]),
+        "header": header,
+    }
+
+
+def default_path(engine="flat"):
+    """--bundle default of the scripts: the bundle directory, the pickle for the sklearn engine."""
+    return DEFAULT_PICKLE if engine == "sklearn" else DEFAULT_BUNDLE
+
+
+def load_bundle(path=None, engine="flat"):
+    """
+    Model bundle from either format. engine "flat" evaluates with
+    flat_forest (a pickled forest is flattened on load); "sklearn" needs
+    the pickle, since a bundle directory holds no sklearn objects.
+    """
+    path = path or default_path(engine)
+    if is_bundle(path):
+        if engine == "sklearn":
+            raise ValueError(f"{path}: the sklearn engine needs the pickled bundle (rf_congctrl.pkl)")
+        return load(path)
+    import joblib
+
+    bundle = joblib.load(path)
+    if engine == "flat":
+        bundle["model"] = flat_forest.FlatModel.from_sklearn(bundle["model"])
+    return bundle
+
+
+def convert(pkl_path, out_path, train_csv=None, check_csv=None):
+    """
+    Pickled bundle -> bundle directory. With check_csv, the predictions on
+    its rows must be identical to sklearn's, and its accuracy is recorded.
+    """
+    import joblib
+
+    bundle = joblib.load(pkl_path)
+    rf, le, cols = bundle["model"], bundle["label_encoder"], list(bundle["feature_cols"])
+    flat = flat_forest.flatten(rf)
+    metrics = {}
+    if check_csv:
+        import pandas as pd
+
+        df = pd.read_csv(check_csv)
+        X = df[cols].to_numpy(dtype=np.float64)
+        if not np.array_equal(rf.predict_proba(X), flat_forest.predict_proba(flat, X)):
+            raise AssertionError("flattened forest does not match sklearn")
+        y = le.transform(df["algo"])
+        acc = float(np.mean(flat_forest.predict(flat, X) == y))
+        metrics[os.path.splitext(os.path.basename(check_csv))[0] + "_accuracy"] = round(acc, 4)
+    training = describe_data([train_csv]) if train_csv else {}
+    training["converted_from"] = {"name": os.path.basename(pkl_path), "sha1": _digest(pkl_path)}
+    return save(out_path, flat, le.classes_, cols, training, metrics)
+
+
+def main():
+    import warnings
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("convert", help="pickled bundle (train_rf.py) -> bundle directory")
+    p.add_argument("pkl")
+    p.add_argument("--out", default=None, help="default: <pkl without .pkl>.bundle")
+    p.add_argument("--train_csv", default=None, help="training CSV to record the digest of")
+    p.add_argument("--check_csv", default=None, help="feature CSV: verify predictions, record accuracy")
+    p = sub.add_parser("info", help="print the header of a bundle")
+    p.add_argument("bundle")
+    p.add_argument("--verify", action="store_true", help="also check the array digests")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        out = args.out or os.path.splitext(args.pkl)[0] + ".bundle"
+        header = convert(args.pkl, out, args.train_csv, args.check_csv)
+        size = sum(os.path.getsize(os.path.join(out, f)) for f in os.listdir(out))
+        print(f"[OK] {header['n_trees']} trees, {header['n_nodes']} nodes, {size / 1024:.0f} KiB -> {out}")
+        if header["metrics"]:
+            print(f"[OK] identical to sklearn on --check_csv, {json.dumps(header['metrics'])}")
+    else:
+        t0 = time.perf_counter()
+        bundle = load(args.bundle, verify=args.verify)
+        dt = time.perf_counter() - t0
+        header = dict(bundle["header"])
+        header.pop("arrays")
+        print(json.dumps(header, indent=2))
+        print(f"[OK] loaded in {dt * 1e3:.1f} ms{' (digests verified)' if args.verify else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Online congestion-control classifier: label flows while they are running.
+
+Samples come from the same path as collect_ss.py (ss_sampler backends on a
+DeadlineTicker), or from existing ss logs with --replay. A flow is a peer
+(dst:port) live or a log on replay; each of its connections (iperf3 control
+and data sockets, stale ones) keeps its own state, keyed by the FlowTable id
+live and by the flow column or counter chaining (timeseries.ConnectionChain)
+on replay. Only the connection that sent the most since it was first seen,
+the data connection, is classified. Its state is constant-size and the
+bundle's feature_cols are estimated from it:
+
+  ss_rtt_ms / ss_rtt_var_ms / ss_cwnd_bytes / ss_pacing_mbps : last sample
+  ip_tp_mbps     : bytes_acked growth over the flow lifetime (iperf3 sender rate)
+  ip_mean_rtt_ms : running mean of the sampled rtt (iperf3 mean_rtt)
+
+Every --every seconds the undecided flows are classified in one batch; a flow
+is decided as soon as the top class probability reaches --threshold, and a
+JSON line is printed:
+
+  {"event": "decision", "flow": "10.0.0.2:5201", "label": "bbr",
+   "confidence": 0.93, "time_to_decision_s": 2.5, "samples": 6, "truth": "bbr"}
+
+Flows that end (or replay files that run out) undecided get an "end" event
+with the last prediction. On exit a summary with time-to-decision and the
+per-sample overhead (state update + amortized model time) goes to stderr.
+
+Example:
+  python3 online_classify.py --port 5201                    # live
+  python3 online_classify.py --replay ../collect_data_test/ss/*.log
+  python3 online_classify.py --replay_where algo=cubic "rtt>=100"   # runs from the catalog
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import model_bundle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The samplers live with the collector, the run catalog with build_features
+sys.path.insert(0, os.path.join(HERE, "..", "collect_data"))
+sys.path.insert(0, os.path.join(HERE, "..", "build_features"))
+
+
+class FlowState:
+    """Constant-memory per-flow state (no sample history is kept)."""
+
+    __slots__ = ("first_t", "last_t", "first_acked", "first_sent", "last", "n", "rtt_sum",
+                 "truth", "decided", "last_pred")
+
+    def __init__(self, t, s):
+        self.first_t = t
+        self.first_acked = s["bytes_acked"]
+        self.first_sent = s["bytes_sent"]
+        self.n = 0
+        self.rtt_sum = 0.0
+        self.truth = s.get("algo")
+        self.decided = False
+        self.last_pred = None
+        self.update(t, s)
+
+    def update(self, t, s):
+        self.last_t = t
+        self.last = s
+        self.n += 1
+        self.rtt_sum += s["rtt_ms"]
+
+    def restarted(self, s):
+        """Counters went backwards: the peer/port was reused by a new connection."""
+        return s["bytes_sent"] < self.last["bytes_sent"]
+
+    def sent(self):
+        """Bytes sent since the connection was first seen."""
+        return self.last["bytes_sent"] - self.first_sent
+
+
+# feature name -> estimator over a FlowState
+ONLINE_FEATURES = {
+    "ss_rtt_ms": lambda st: st.last["rtt_ms"],
+    "ss_rtt_var_ms": lambda st: st.last["rtt_var_ms"],
+    "ss_cwnd_bytes": lambda st: st.last["cwnd"] * st.last["mss"],
+    "ss_pacing_mbps": lambda st: st.last["pacing_mbps"],
+    "ip_tp_mbps": lambda st: ((st.last["bytes_acked"] - st.first_acked) * 8 / 1e6
+                              / max(st.last_t - st.first_t, 1e-9)),
+    "ip_mean_rtt_ms": lambda st: st.rtt_sum / st.n,
+}
+
+
+class OnlineClassifier:
+    def __init__(self, bundle, threshold=0.8, min_samples=4, emit=print):
+        self.model = bundle["model"]
+        self.classes = bundle["label_encoder"].classes_
+        self.feature_cols = list(bundle["feature_cols"])
+        missing = [c for c in self.feature_cols if c not in ONLINE_FEATURES]
+        if missing:
+            raise ValueError(f"no online estimator for features: {missing}")
+        self.estimators = [ONLINE_FEATURES[c] for c in self.feature_cols]
+        # One batch per schedule tick is small: thread fan-out only adds latency
+        if hasattr(self.model, "n_jobs"):
+            self.model.n_jobs = 1
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.emit = emit
+
+        self.flows = {}       # (flow, connection id) -> FlowState
+        self.n_samples = 0
+        self.update_s = 0.0
+        self.n_evals = 0
+        self.model_s = []
+        self.decisions = []   # (time_to_decision, correct or None)
+
+    def feed(self, t, records):
+        """One tick of ((flow, connection id), sample) pairs."""
+        t0 = time.perf_counter()
+        for key, s in records:
+            st = self.flows.get(key)
+            if st is None or st.restarted(s):
+                if st is not None:
+                    self.finish(key)
+                self.flows[key] = FlowState(t, s)
+            else:
+                st.update(t, s)
+        self.n_samples += len(records)
+        self.update_s += time.perf_counter() - t0
+
+    def data_connections(self):
+        """{flow: key of its connection that sent the most since first seen}."""
+        best = {}
+        for key, st in self.flows.items():
+            cur = best.get(key[0])
+            if cur is None or st.sent() > self.flows[cur].sent():
+                best[key[0]] = key
+        return best
+
+    def evaluate(self):
+        """Classify every undecided data connection with enough samples in one batch."""
+        keys = [k for k in self.data_connections().values()
+                if not self.flows[k].decided and self.flows[k].n >= self.min_samples]
+        if not keys:
+            return
+        X = np.array([[f(self.flows[k]) for f in self.estimators] for k in keys])
+        t0 = time.perf_counter()
+        proba = self.model.predict_proba(X)
+        self.model_s.append(time.perf_counter() - t0)
+        self.n_evals += 1
+
+        best = proba.argmax(axis=1)
+        for key, i, p in zip(keys, best, proba):
+            st = self.flows[key]
+            st.last_pred = (str(self.classes[i]), float(p[i]))
+            if p[i] >= self.threshold:
+                st.decided = True
+                self._emit("decision", key, st)
+
+    def finish(self, key):
+        """Connection is gone: report it if it is the data connection and never reached the threshold."""
+        is_data = self.data_connections().get(key[0]) == key
+        st = self.flows.pop(key)
+        if is_data and not st.decided:
+            self._emit("end", key, st)
+
+    def finish_all(self, flow=None):
+        """End every connection (of one flow)."""
+        data = set(self.data_connections().values())
+        for key in [k for k in self.flows if flow is None or k[0] == flow]:
+            st = self.flows.pop(key)
+            if key in data and not st.decided:
+                self._emit("end", key, st)
+
+    def _emit(self, event, key, st):
+        label, conf = st.last_pred or (None, 0.0)
+        ttd = st.last_t - st.first_t
+        correct = None if st.truth is None or label is None else label == st.truth
+        if event == "decision":
+            self.decisions.append((ttd, correct))
+        self.emit(json.dumps({
+            "event": event, "flow": key[0], "conn": key[1], "label": label, "confidence": round(conf, 4),
+            "time_to_decision_s" if event == "decision" else "duration_s": round(ttd, 3),
+            "samples": st.n, "truth": st.truth,
+        }))
+
+    def summary(self):
+        out = {"samples": self.n_samples, "evaluations": self.n_evals,
+               "decided": len(self.decisions)}
+        if self.n_samples:
+            out["update_us_per_sample"] = round(self.update_s / self.n_samples * 1e6, 2)
+            out["model_us_per_sample"] = round(sum(self.model_s) / self.n_samples * 1e6, 2)
+        if self.model_s:
+            ms = np.array(self.model_s) * 1e3
+            out["model_ms_p50"] = round(float(np.percentile(ms, 50)), 3)
+            out["model_ms_p99"] = round(float(np.percentile(ms, 99)), 3)
+        if self.decisions:
+            ttd = np.array([d[0] for d in self.decisions])
+            out["ttd_s_mean"] = round(float(ttd.mean()), 3)
+            out["ttd_s_p50"] = round(float(np.percentile(ttd, 50)), 3)
+            out["ttd_s_max"] = round(float(ttd.max()), 3)
+            judged = [d[1] for d in self.decisions if d[1] is not None]
+            if judged:
+                out["decision_accuracy"] = round(sum(judged) / len(judged), 4)
+        return out
+
+
+def iter_log_connections(path):
+    """
+    Yield (monotonic, [(connection id, sample)]) per tick of an ss log: the
+    flow column where the collector wrote one, else ConnectionChain ids.
+    """
+    from feature_pipeline.timeseries import ConnectionChain
+
+    chain = ConnectionChain()
+    for t, samples in iter_log_ticks(path):
+        if samples[0].get("flow"):
+            yield t, [(int(s["flow"]), s) for s in samples]
+        else:
+            yield t, list(zip(chain.assign(t, [s["bytes_sent"] for s in samples]), samples))
+
+
+def iter_log_ticks(path):
+    """Yield (monotonic, [sample]) from an ss log, one group per timestamp."""
+    if path.endswith((".ssb", ".ssz")):
+        import ss_binary
+
+        header, records = ss_binary.open_records(path)
+        algo = header.get("algo")
+        names = records.dtype.names
+        group, t_cur = [], None
+        for rec in records:
+            s = dict(zip(names, rec.tolist()))
+            s["algo"] = algo
+            if s["monotonic"] != t_cur and group:
+                yield t_cur, group
+                group = []
+            t_cur = s["monotonic"]
+            group.append(s)
+        if group:
+            yield t_cur, group
+        return
+
+    from ss_sampler import SAMPLE_FIELDS
+
+    cols = ["wall_time", "monotonic"] + SAMPLE_FIELDS
+    group, t_cur = [], None
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0] == "wall_time":
+                if parts:
+                    cols = parts
+                continue
+            if len(parts) != len(cols):
+                continue   # partial last line
+            s = {c: (v if c in ("wall_time", "algo") else float(v)) for c, v in zip(cols, parts)}
+            if s["monotonic"] != t_cur and group:
+                yield t_cur, group
+                group = []
+            t_cur = s["monotonic"]
+            group.append(s)
+    if group:
+        yield t_cur, group
+
+
+def replay(clf, paths, every):
+    """Feed logs through the classifier in trace time, as fast as possible."""
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        next_eval = None
+        for t, samples in iter_log_connections(path):
+            clf.feed(t, [((name, conn), s) for conn, s in samples])
+            if next_eval is None:
+                next_eval = t + every
+            if t >= next_eval:
+                clf.evaluate()
+                next_eval += every * (1 + int((t - next_eval) // every))
+            if clf.flows[clf.data_connections()[name]].decided:
+                break
+        clf.evaluate()
+        clf.finish_all(name)
+
+
+def live(clf, args):
+    from flow_table import FlowTable
+    from ss_sampler import make_sampler
+    from ticker import DeadlineTicker
+
+    sampler = make_sampler(args.backend, args.port, args.dst)
+    # Flow ids per socket, so the control and data connections to one peer
+    # stay apart (no .flows sidecar here, so retired flows are not kept)
+    table = FlowTable(expire=args.idle, max_retired=0)
+    ticker = DeadlineTicker(args.interval, spin=args.spin)
+    per_eval = max(1, round(args.every / args.interval))
+    print(f"[online] backend={sampler.name} interval={args.interval}s every={args.every}s "
+          f"threshold={args.threshold}", file=sys.stderr)
+    try:
+        while True:
+            k, _, _, _ = ticker.wait()
+            t = time.monotonic()
+            ticks = sampler.dump()
+            if args.port is not None:
+                ticks = [x for x in ticks if x[1] == args.port and (not args.dst or x[0] == args.dst)]
+            table.observe(t, [s for _, _, s in ticks])
+            records = [((f"{dst}:{dport}", s["flow"]), s) for dst, dport, s in ticks]
+            clf.feed(t, records)
+            seen = {key for key, _ in records}
+            for key in [k2 for k2, st in clf.flows.items()
+                        if k2 not in seen and t - st.last_t > args.idle]:
+                clf.finish(key)
+            if k % per_eval == 0:
+                clf.evaluate()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.close()
+        clf.finish_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bundle", default=None,
+                        help="model bundle (model_bundle.py); default rf_congctrl.bundle, .pkl for --engine sklearn")
+    parser.add_argument("--threshold", type=float, default=0.8, help="min top-class probability to decide")
+    parser.add_argument("--min_samples", type=int, default=4, help="samples before the first evaluation")
+    parser.add_argument("--every", type=float, default=1.0, help="evaluation period (s)")
+    parser.add_argument("--replay", nargs="+", default=None, help="ss logs to replay instead of live sampling")
+    parser.add_argument("--replay_where", nargs="+", default=None,
+                        help="replay the runs matching these run catalog conditions (e.g. algo=bbr rtt>=100)")
+    parser.add_argument("--log_root", default=os.path.join(HERE, "..", "collect_data_test"),
+                        help="--replay_where: log root of the catalog")
+    parser.add_argument("--port", type=int, default=None, help="live: only flows to this port")
+    parser.add_argument("--dst", default=None, help="live: only flows to this peer")
+    parser.add_argument("--interval", type=float, default=0.5, help="live: sampling interval (s)")
+    parser.add_argument("--backend", choices=["auto", "netlink", "ss"], default="auto")
+    parser.add_argument("--spin", type=float, default=0.0, help="live: busy-wait before each tick (s)")
+    parser.add_argument("--idle", type=float, default=2.0, help="live: drop flows unseen for this long (s)")
+    parser.add_argument("--out", default=None, help="write events here instead of stdout")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="flat",
+                        help="flat: array-backed evaluator (flat_forest.py), same predictions")
+    args = parser.parse_args()
+
+    if args.replay_where:
+        from feature_pipeline.catalog import Catalog
+
+        cat = Catalog.open(args.log_root, refresh=True)
+        args.replay = [r["ss_path"] for r in cat.query(*args.replay_where)]
+        cat.close()
+        if not args.replay:
+            raise SystemExit(f"no run in {args.log_root} matches {' '.join(args.replay_where)}")
+
+    # The bundle was fitted on a DataFrame; rows here are plain arrays
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = model_bundle.load_bundle(args.bundle, args.engine)
+
+    out = open(args.out, "w") if args.out else sys.stdout
+
+    def emit(line):
+        out.write(line + "\n")
+        out.flush()
+
+    clf = OnlineClassifier(bundle, args.threshold, args.min_samples, emit)
+    try:
+        if args.replay:
+            replay(clf, args.replay, args.every)
+        else:
+            live(clf, args)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        print(f"[online] {json.dumps(clf.summary())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Headless predict: label flows with the model bundle and print JSON lines.
+Nothing is plotted and nothing is reported; see report.py for that.
+
+Inputs (any mix):
+  CSV files          with the bundle's feature_cols as columns (e.g. the
+                     build_features.py output); "-" or no input reads stdin
+  JSON lines         on stdin, one {feature: value, ...} object per line
+  --ss LOG ...       sampler output (collect_ss.py logs, text / .ssb / .ssz):
+                     the features are computed by build_features.py's feature
+                     registry; with --json_dir the run's iperf3 JSON is read
+                     too, otherwise the ip_* columns are estimated from the ss
+                     samples of the data connection (online_classify.py)
+
+Every other column / key of an input row is passed through to its output
+line, so an `algo` column ends up next to the prediction:
+
+  {"algo": "bbr", "run": "5", "label": "bbr", "confidence": 0.9433}
+
+Rows are read and scored in batches of --batch, so input of any length
+streams through in constant memory. Startup is kept small: only numpy and
+the bundle arrays are loaded (model_bundle.py, memory-mapped), and pandas,
+sklearn and matplotlib are never imported. bench_predict_startup.py guards
+that budget.
+
+Example:
+  python3 predict.py ../build_features/features_no_cond_test.csv > preds.jsonl
+  python3 report.py preds.jsonl --prefix test
+  for f in logs/ss/*.log; do python3 predict.py --ss "$f"; done
+  python3 predict.py --ss ../collect_data/logs/ss/*.log --json_dir ../collect_data/logs/iperf
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+
+def iter_csv(f, cols, source):
+    """(passthrough dict, feature row) of each CSV row."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    missing = [c for c in cols if c not in header]
+    if missing:
+        raise SystemExit(f"{source}: missing feature columns {missing}")
+    idx = [header.index(c) for c in cols]
+    rest = [(i, h) for i, h in enumerate(header) if h not in cols]
+    for n, row in enumerate(reader, 2):
+        if not row:
+            continue
+        try:
+            x = [float(row[i]) for i in idx]
+        except (ValueError, IndexError) as e:
+            raise SystemExit(f"{source}:{n}: {e}")
+        yield {h: row[i] for i, h in rest if i < len(row)}, x
+
+
+def iter_jsonl(lines, cols, source):
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        d = json.loads(line)
+        try:
+            x = [float(d.pop(c)) for c in cols]
+        except (KeyError, TypeError, ValueError) as e:
+            raise SystemExit(f"{source}:{n}: bad or missing feature {e}")
+        yield d, x
+
+
+def iter_stdin(cols):
+    first = sys.stdin.readline()
+    if not first:
+        return
+    if first.lstrip().startswith("{"):
+        yield from iter_jsonl(_chain(first, sys.stdin), cols, "<stdin>")
+    else:
+        yield from iter_csv(_chain(first, sys.stdin), cols, "<stdin>")
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def data_flow_state(path):
+    """FlowState (online_classify.py) over the samples of the log's data connection, or None."""
+    from online_classify import FlowState
+    from feature_pipeline.timeseries import load_trace, select_data_flow
+
+    # Old logs mix the control connection and stale sockets into every tick;
+    # select_data_flow keeps the one connection that sent the most
+    tr = select_data_flow(load_trace(path))
+    st = None
+    for i, t in enumerate(tr["monotonic"].tolist()):
+        s = {c: v[i] for c, v in tr.items()}
+        if st is None:
+            st = FlowState(t, s)
+        else:
+            st.update(t, s)
+    return st
+
+
+def iter_ss(paths, cols, json_dir=None):
+    """One row per ss log, with the features build_features.py computes for that run."""
+    from online_classify import ONLINE_FEATURES   # also puts build_features on sys.path
+    from feature_pipeline import FEATURES, Run, compute, parse_name
+
+    unknown = [c for c in cols if c not in FEATURES]
+    if unknown:
+        raise SystemExit(f"--ss: unknown features {unknown}")
+    iperf_cols = [c for c in cols if FEATURES[c].source == "iperf_end"]
+    if json_dir is None:
+        unknown = [c for c in iperf_cols if c not in ONLINE_FEATURES]
+        if unknown:
+            raise SystemExit(f"--ss: cannot estimate {unknown} from ss samples, give --json_dir")
+    for path in paths:
+        name = os.path.basename(path)
+        key = os.path.splitext(name)[0]
+        json_path = None if json_dir is None else os.path.join(json_dir, key + ".json")
+        estimated = iperf_cols if json_path is None else []
+        feats = compute(Run(key, path, json_path), [c for c in cols if c not in estimated])
+        if feats is None:
+            print(f"[warn] {path}: no features (empty log or missing iperf3 JSON)", file=sys.stderr)
+            continue
+        if estimated:
+            st = data_flow_state(path)
+            if st is None:
+                print(f"[warn] {path}: no samples", file=sys.stderr)
+                continue
+            feats.update((c, ONLINE_FEATURES[c](st)) for c in estimated)
+        meta = {"log": name}
+        parsed = parse_name(name)
+        if parsed:
+            meta["algo"] = parsed[0]
+        yield meta, [feats[c] for c in cols]
+
+
+def iter_rows(args, cols):
+    for path in args.inputs:
+        if path == "-":
+            yield from iter_stdin(cols)
+        else:
+            with open(path, newline="") as f:
+                yield from iter_csv(f, cols, path)
+    if args.ss:
+        yield from iter_ss(args.ss, cols, args.json_dir)
+    if not args.inputs and not args.ss:
+        yield from iter_stdin(cols)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="*", help="feature CSVs; - for stdin (CSV or JSON lines)")
+    parser.add_argument("--ss", nargs="+", default=None, help="ss logs to compute the features from")
+    parser.add_argument("--json_dir", default=None,
+                        help="iperf3 JSON directory of the --ss logs (<log name>.json); default: estimate ip_*")
+    parser.add_argument("--bundle", default=None,
+                        help="model bundle (model_bundle.py); default rf_congctrl.bundle, .pkl for --engine sklearn")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="flat",
+                        help="flat: array-backed evaluator (flat_forest.py), same predictions")
+    parser.add_argument("--proba", action="store_true", help="also print every class probability")
+    parser.add_argument("--batch", type=int, default=4096, help="rows per model call")
+    args = parser.parse_args()
+
+    import numpy as np
+
+    import model_bundle
+
+    if args.engine == "sklearn":
+        import warnings
+
+        # The bundle was fitted on a DataFrame; rows here are plain arrays
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = model_bundle.load_bundle(args.bundle, args.engine)
+    model = bundle["model"]
+    cols = list(bundle["feature_cols"])
+    classes = [str(c) for c in bundle["label_encoder"].classes_]
+
+    out = sys.stdout
+    meta, rows = [], []
+
+    def flush():
+        proba = model.predict_proba(np.array(rows, dtype=np.float64))
+        best = proba.argmax(axis=1)
+        lines = []
+        for m, p, k in zip(meta, proba.tolist(), best.tolist()):
+            m["label"] = classes[k]
+            m["confidence"] = round(p[k], 4)
+            if args.proba:
+                m["proba"] = {c: round(v, 4) for c, v in zip(classes, p)}
+            lines.append(json.dumps(m))
+        out.write("\n".join(lines) + "\n")
+        out.flush()
+        meta.clear()
+        rows.clear()
+
+    try:
+        for m, x in iter_rows(args, cols):
+            meta.append(m)
+            rows.append(x)
+            if len(rows) >= args.batch:
+                flush()
+        if rows:
+            flush()
+    except BrokenPipeError:
+        # Output piped into head & co.: stop quietly (and keep the exit flush from failing again)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Reports and figures of predictions, kept apart from predict.py so that
+scoring never pays for sklearn.metrics, pandas or matplotlib (imported here
+only when a function needs them).
+
+As a command it reads the JSON lines of predict.py (files or stdin) and
+compares `label` with the --truth key:
+
+  - classification report and confusion matrix on stdout
+  - <prefix>_cm.png, <prefix>_report.png and <prefix>_report.csv, unless
+    --no_plots
+
+train_rf.py and predict_on_test.py use the same functions.
+
+Example:
+  python3 predict.py ../build_features/features_no_cond_test.csv | python3 report.py --prefix test
+"""
+import argparse
+import json
+import sys
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+# ====== Utility: plot and save confusion matrix ======
+def plot_confusion(cm, classes, title, filename):
+    import numpy as np
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(4.5, 4))
+    im = ax.imshow(cm, interpolation='nearest', cmap='Blues')
+    ax.figure.colorbar(im, ax=ax)
+
+    ax.set(
+        xticks=np.arange(len(classes)),
+        yticks=np.arange(len(classes)),
+        xticklabels=classes,
+        yticklabels=classes,
+        title=title,
+        ylabel='True label',
+        xlabel='Predicted label',
+    )
+
+    plt.setp(
+        ax.get_xticklabels(),
+        rotation=45,
+        ha="right",
+        rotation_mode="anchor"
+    )
+
+    thresh = cm.max() / 2.0
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            ax.text(
+                j, i, format(cm[i, j], 'd'),
+                ha="center", va="center",
+                color="white" if cm[i, j] > thresh else "black"
+            )
+
+    fig.tight_layout()
+    plt.savefig(filename, dpi=250)
+    plt.close()
+    print(f"Saved confusion matrix: {filename}")
+
+
+# ====== Utility: plot classification report table ======
+def plot_classification_report(report_dict, title, filename_png, filename_csv=None):
+    """
+    report_dict: output from classification_report(..., output_dict=True)
+    This function renders it as a table image and optionally saves it as CSV.
+    """
+    import pandas as pd
+
+    plt = _pyplot()
+    df_rep = pd.DataFrame(report_dict).T
+
+    # Save CSV (optional)
+    if filename_csv is not None:
+        df_rep.to_csv(filename_csv)
+        print(f"Saved classification report table: {filename_csv}")
+
+    # Render table as an image
+    fig, ax = plt.subplots(figsize=(6, 0.5 * len(df_rep) + 1.5))
+    ax.axis('off')
+
+    display_df = df_rep.copy()
+    for col in display_df.columns:
+        display_df[col] = display_df[col].map(
+            lambda x: f"{x:.2f}" if isinstance(x, (int, float)) else x
+        )
+
+    table = ax.table(
+        cellText=display_df.values,
+        rowLabels=display_df.index,
+        colLabels=display_df.columns,
+        loc='center'
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    table.scale(1, 1.3)
+
+    ax.set_title(title, pad=10)
+    plt.tight_layout()
+    plt.savefig(filename_png, dpi=250)
+    plt.close()
+    print(f"Saved classification report figure: {filename_png}")
+
+
+def plot_feature_importance(names, scores, filename):
+    """Horizontal bars, most important feature on top."""
+    import numpy as np
+
+    plt = _pyplot()
+    pairs = sorted(zip(names, scores), key=lambda x: x[1], reverse=True)
+    plt.figure(figsize=(7, 4.5))
+    y_pos = np.arange(len(pairs))
+    plt.barh(y_pos, [s for _, s in pairs])
+    plt.yticks(y_pos, [n for n, _ in pairs])
+    plt.gca().invert_yaxis()  # Most important features on top
+    plt.xlabel("Feature importance")
+    plt.title("Random Forest Feature Importance")
+    plt.tight_layout()
+    plt.savefig(filename, dpi=250)
+    plt.close()
+    print(f"Saved feature importance: {filename}")
+
+
+def evaluate(name, y_true, y_pred, classes, prefix=None):
+    """
+    Print the classification report and confusion matrix of label strings
+    y_true / y_pred over `classes`; with prefix, also save the figures and
+    the report CSV. Returns (classification_report(..., output_dict=True),
+    confusion matrix).
+    """
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    classes = [str(c) for c in classes]
+    print(f"\n=== {name} Result ===")
+    print(classification_report(y_true, y_pred, labels=classes, target_names=classes, zero_division=0))
+    report_dict = classification_report(y_true, y_pred, labels=classes, target_names=classes,
+                                        zero_division=0, output_dict=True)
+    cm = confusion_matrix(y_true, y_pred, labels=classes)
+    print("Confusion matrix:\n", cm)
+
+    if prefix:
+        plot_confusion(cm, classes, f"{name} Confusion Matrix", f"{prefix}_cm.png")
+        plot_classification_report(report_dict, f"{name} Classification Report",
+                                   f"{prefix}_report.png", f"{prefix}_report.csv")
+    return report_dict, cm
+
+
+def read_predictions(paths):
+    """Lines of predict.py from files (- for stdin)."""
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path)
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("predictions", nargs="*", help="predict.py output (JSON lines); default stdin")
+    parser.add_argument("--truth", default="algo", help="key of the true label")
+    parser.add_argument("--name", default="PREDICTIONS", help="title of the report")
+    parser.add_argument("--prefix", default="report", help="file prefix of the figures and CSV")
+    parser.add_argument("--no_plots", action="store_true", help="only print the report")
+    args = parser.parse_args()
+
+    y_true, y_pred = [], []
+    for p in read_predictions(args.predictions):
+        if args.truth in p:
+            y_true.append(str(p[args.truth]))
+            y_pred.append(p["label"])
+    if not y_true:
+        raise SystemExit(f"no prediction has a '{args.truth}' key to compare with")
+    classes = sorted(set(y_true) | set(y_pred))
+    report_dict, _ = evaluate(args.name, y_true, y_pred, classes, None if args.no_plots else args.prefix)
+    print(f"[OK] {len(y_true)} predictions, accuracy {report_dict['accuracy']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
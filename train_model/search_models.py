@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Parallel hyperparameter / model-family search for the congestion-control
+classifier.
+
+Candidates come from a built-in grid over several families:
+
+  rf   RandomForestClassifier        (what train_rf.py trains)
+  et   ExtraTreesClassifier
+  gb   HistGradientBoostingClassifier
+  knn  StandardScaler + KNeighborsClassifier, on the time-series features
+       when the CSV has them (build_features.py --ts), else on the base ones
+
+Each candidate is scored by leave-one-run-out over --cv_runs (default runs
+1-4; run 5 stays the untouched test split, as in train_rf.py). Every
+(candidate, fold) fit runs in a process pool and is cached on disk under
+--cache_dir, keyed by the CSV content, the candidate and the fold, so
+re-running, widening the grid or moving to the next halving round only fits
+what is new.
+
+--mode grid     : every candidate on every fold
+--mode random   : --n_iter candidates sampled from the grid
+--mode halving  : successive halving, with folds as the budget: all
+                  candidates on 1 fold, keep the best 1/--eta, add folds...
+
+The report puts accuracy next to fit time, pickled model size and per-row
+inference latency (1-row call and amortized over a 64-row batch; for tree
+ensembles also with flat_forest.py), then refits the top --top candidates on
+all CV runs and scores them on the test run.
+
+Example:
+  python3 search_models.py --mode halving --jobs 8
+  python3 search_models.py --families rf et --mode random --n_iter 12
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import random
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# feature_pipeline (dataset cache) lives with build_features
+sys.path.insert(0, os.path.join(HERE, "..", "build_features"))
+from feature_pipeline import dataset  # noqa: E402
+
+BASE_FEATURES = [
+    "ss_rtt_ms", "ss_rtt_var_ms", "ss_cwnd_bytes", "ss_pacing_mbps",
+    "ip_tp_mbps", "ip_mean_rtt_ms",
+]
+
+GRID = {
+    "rf": {"n_estimators": [50, 100, 300], "max_depth": [None, 8, 16], "min_samples_leaf": [1, 3]},
+    "et": {"n_estimators": [100, 300], "max_depth": [None, 16], "min_samples_leaf": [1, 3]},
+    "gb": {"learning_rate": [0.05, 0.1], "max_iter": [100, 300], "max_leaf_nodes": [15, 31]},
+    "knn": {"n_neighbors": [3, 5, 9], "weights": ["uniform", "distance"]},
+}
+
+
+def make_model(family, params):
+    if family == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=1, random_state=42, **params)
+    if family == "et":
+        from sklearn.ensemble import ExtraTreesClassifier
+        return ExtraTreesClassifier(n_jobs=1, random_state=42, **params)
+    if family == "gb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(random_state=42, **params)
+    if family == "knn":
+        from sklearn.neighbors import KNeighborsClassifier
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        return make_pipeline(StandardScaler(), KNeighborsClassifier(**params))
+    raise ValueError(f"unknown family {family!r}")
+
+
+def candidates(families, columns):
+    """All (family, params, feature set) of the grid that the CSV can feed."""
+    ts_cols = [c for c in columns if c.startswith("ts_")]
+    out = []
+    for family in families:
+        grid = GRID[family]
+        feats = "ts" if family == "knn" and ts_cols else "base"
+        for values in itertools.product(*grid.values()):
+            out.append({"family": family, "params": dict(zip(grid, values)), "features": feats})
+    return out
+
+
+def feature_cols(cand, columns):
+    if cand["features"] == "ts":
+        return [c for c in columns if c.startswith("ts_")]
+    return BASE_FEATURES
+
+
+def cand_name(cand):
+    params = ",".join(f"{k}={v}" for k, v in cand["params"].items())
+    return f"{cand['family']}[{params}]/{cand['features']}"
+
+
+def cache_key(data_hash, cand, train_runs, val_runs):
+    blob = json.dumps([data_hash, cand, sorted(train_runs), sorted(val_runs)], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+
+def row_latency(predict, X, calls=30):
+    """(median seconds for a 1-row call, seconds per row in a 64-row call)."""
+    X1 = X[:1]
+    X64 = X[np.arange(64) % len(X)]
+    predict(X1)
+    one = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        predict(X1)
+        one.append(time.perf_counter() - t0)
+    batch = []
+    for _ in range(max(3, calls // 5)):
+        t0 = time.perf_counter()
+        predict(X64)
+        batch.append(time.perf_counter() - t0)
+    return float(np.median(one)), float(np.median(batch)) / 64
+
+
+def fit_fold(task):
+    """Worker: fit one candidate on one fold, or load it from the cache."""
+    csv_path, data_hash, cand, train_runs, val_runs, cache_dir = task
+    key = cache_key(data_hash, cand, train_runs, val_runs)
+    meta_path = os.path.join(cache_dir, key + ".json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            res = json.load(f)
+        res["cached"] = True
+        return res
+
+    df = dataset.load_table(csv_path)
+    cols = feature_cols(cand, df.columns)
+    train = df[df["run"].isin(train_runs)]
+    val = df[df["run"].isin(val_runs)]
+    X_tr = train[cols].to_numpy(dtype=np.float64)
+    X_va = val[cols].to_numpy(dtype=np.float64)
+
+    model = make_model(cand["family"], cand["params"])
+    with warnings.catch_warnings():
+        # Constant or extreme ts_* columns in a fold (scaler, distances):
+        # numpy's invalid-value / overflow warnings, once per fit and call
+        warnings.simplefilter("ignore", RuntimeWarning)
+        t0 = time.perf_counter()
+        model.fit(X_tr, train["algo"].to_numpy())
+        fit_s = time.perf_counter() - t0
+        acc = float(np.mean(model.predict(X_va) == val["algo"].to_numpy()))
+        lat1, lat64 = row_latency(model.predict, X_va)
+
+    blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    res = {"key": key, "name": cand_name(cand), "cand": cand, "val_runs": list(val_runs),
+           "acc": acc, "fit_s": fit_s, "size_bytes": len(blob),
+           "lat1_us": lat1 * 1e6, "lat64_us": lat64 * 1e6}
+
+    if cand["family"] in ("rf", "et"):
+        import flat_forest
+
+        fm = flat_forest.FlatModel.from_sklearn(model)
+        lat1, lat64 = row_latency(fm.predict, X_va)
+        res.update({"flat_lat1_us": lat1 * 1e6, "flat_lat64_us": lat64 * 1e6})
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, key + ".pkl"), "wb") as f:
+        f.write(blob)
+    # Metadata last: its presence marks a complete cache entry
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(res, f)
+    os.replace(tmp, meta_path)
+    res["cached"] = False
+    return res
+
+
+def run_tasks(tasks, jobs):
+    if jobs == 1 or len(tasks) == 1:
+        return list(map(fit_fold, tasks))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(fit_fold, tasks))
+
+
+def evaluate(cands, folds, args, data_hash):
+    """{name: [fold results]} for every candidate on the given folds."""
+    tasks = [(args.csv, data_hash, c, train, val, args.cache_dir) for c in cands for train, val in folds]
+    results = run_tasks(tasks, args.jobs)
+    out = {}
+    for r in results:
+        out.setdefault(r["name"], []).append(r)
+    n_cached = sum(r["cached"] for r in results)
+    print(f"[search] {len(results)} fits ({n_cached} from cache) for {len(cands)} candidates "
+          f"x {len(folds)} folds")
+    return out
+
+
+def summarize(name, fold_results):
+    def mean(k):
+        vals = [r[k] for r in fold_results if k in r]
+        return float(np.mean(vals)) if vals else float("nan")
+    return {
+        "name": name, "family": fold_results[0]["cand"]["family"], "folds": len(fold_results),
+        "cv_acc": mean("acc"), "fit_s": mean("fit_s"), "size_kib": mean("size_bytes") / 1024,
+        "lat1_us": mean("lat1_us"), "lat64_us": mean("lat64_us"),
+        "flat_lat1_us": mean("flat_lat1_us"), "flat_lat64_us": mean("flat_lat64_us"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.path.join(HERE, "..", "build_features", "features_no_cond.csv"))
+    parser.add_argument("--families", nargs="+", choices=list(GRID), default=list(GRID))
+    parser.add_argument("--mode", choices=["grid", "random", "halving"], default="grid")
+    parser.add_argument("--n_iter", type=int, default=16, help="random: candidates to sample")
+    parser.add_argument("--eta", type=int, default=3, help="halving: keep 1/eta per round")
+    parser.add_argument("--cv_runs", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--test_run", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="refit and test the best N")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache_dir", default=os.path.join(HERE, ".search_cache"))
+    parser.add_argument("--out", default="search_results.csv")
+    args = parser.parse_args()
+
+    # Parse once here so the workers only memory-map the cached columns
+    _, meta = dataset.load_table_columns(args.csv)
+    data_hash = meta["digest"]
+    columns = meta["columns"]
+    cands = candidates(args.families, columns)
+    if args.mode == "random":
+        cands = random.Random(args.seed).sample(cands, min(args.n_iter, len(cands)))
+
+    runs = list(args.cv_runs)
+    folds = [([r for r in runs if r != v], [v]) for v in runs]
+
+    t0 = time.perf_counter()
+    if args.mode == "halving":
+        # Budget = folds: survivors get more folds each round, earlier ones come from the cache
+        n_folds = 1
+        while True:
+            res = evaluate(cands, folds[:n_folds], args, data_hash)
+            ranked = sorted(cands, key=lambda c: -summarize(cand_name(c), res[cand_name(c)])["cv_acc"])
+            print(f"[halving] {len(cands)} candidates on {n_folds} fold(s), "
+                  f"best {cand_name(ranked[0])}")
+            if n_folds >= len(folds) or len(cands) <= 1:
+                break
+            cands = ranked[:max(1, len(cands) // args.eta)]
+            n_folds = min(len(folds), n_folds * args.eta)
+    else:
+        res = evaluate(cands, folds, args, data_hash)
+    print(f"[search] done in {time.perf_counter() - t0:.1f} s")
+
+    table = pd.DataFrame([summarize(cand_name(c), res[cand_name(c)]) for c in cands])
+    table = table.sort_values(["cv_acc", "lat1_us"], ascending=[False, True]).reset_index(drop=True)
+
+    # Final check of the best few: fit on all CV runs, score on the test run
+    top = table.head(args.top)
+    by_name = {cand_name(c): c for c in cands}
+    final = run_tasks([(args.csv, data_hash, by_name[n], runs, [args.test_run], args.cache_dir)
+                       for n in top["name"]], args.jobs)
+    test_acc = {r["name"]: r["acc"] for r in final}
+    table["test_acc"] = table["name"].map(test_acc)
+
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_colwidth", 60)
+    print(table.to_string(float_format=lambda x: f"{x:.3f}" if abs(x) < 10 else f"{x:.0f}"))
+    table.to_csv(args.out, index=False)
+    print(f"[OK] saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
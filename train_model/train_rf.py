@@ -1,17 +1,30 @@
 #!/usr/bin/env python3
+import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.ensemble import RandomForestClassifier
-import matplotlib.pyplot as plt
 import joblib
 
+import flat_forest
+import model_bundle
+import report
+
+# feature_pipeline (dataset cache) lives with build_features
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build_features"))
+from feature_pipeline import dataset
+
 # ====== Configuration: set this to the CSV generated by build_features.py ======
 CSV_PATH = "features_no_cond.csv"   # Expected columns: algo, run, ss_*, ip_*
+# Optional extra training rows, e.g. fluid-model runs (../collect_data/fluid_sim.py)
+# put through build_features.py. Added to the training split only.
+SYNTH_CSV = os.environ.get("SYNTH_CSV")
+# PLOTS=0 skips the confusion-matrix, report and feature-importance figures
+PLOTS = os.environ.get("PLOTS", "1") != "0"
 
-# ====== Load dataset ======
-df = pd.read_csv(CSV_PATH)
+# ====== Load dataset (parsed once, then memory-mapped from the dataset cache) ======
+df = dataset.load_table(CSV_PATH)
 
 print(f"Total samples: {len(df)}")
 print(df.head())
@@ -21,6 +34,11 @@ train_df = df[df["run"].isin([1, 2, 3])].reset_index(drop=True)
 val_df   = df[df["run"] == 4].reset_index(drop=True)
 test_df  = df[df["run"] == 5].reset_index(drop=True)
 
+if SYNTH_CSV:
+    synth_df = dataset.load_table(SYNTH_CSV)
+    train_df = pd.concat([train_df, synth_df[df.columns]], ignore_index=True)
+    print(f"Train: + {len(synth_df)} synthetic rows from {SYNTH_CSV}")
+
 print(f"Train: {len(train_df)}, Val: {len(val_df)}, Test: {len(test_df)}")
 
 # ====== Feature selection (exclude rtt_setting / bw_setting) ======
@@ -54,117 +72,11 @@ rf = RandomForestClassifier(
 )
 rf.fit(X_train, y_train)
 
-# ====== Utility: plot and save confusion matrix ======
-def plot_confusion(cm, classes, title, filename):
-    fig, ax = plt.subplots(figsize=(4.5, 4))
-    im = ax.imshow(cm, interpolation='nearest', cmap='Blues')
-    ax.figure.colorbar(im, ax=ax)
-
-    ax.set(
-        xticks=np.arange(len(classes)),
-        yticks=np.arange(len(classes)),
-        xticklabels=classes,
-        yticklabels=classes,
-        title=title,
-        ylabel='True label',
-        xlabel='Predicted label',
-    )
-
-    plt.setp(
-        ax.get_xticklabels(),
-        rotation=45,
-        ha="right",
-        rotation_mode="anchor"
-    )
-
-    thresh = cm.max() / 2.0
-    for i in range(cm.shape[0]):
-        for j in range(cm.shape[1]):
-            ax.text(
-                j, i, format(cm[i, j], 'd'),
-                ha="center", va="center",
-                color="white" if cm[i, j] > thresh else "black"
-            )
-
-    fig.tight_layout()
-    plt.savefig(filename, dpi=250)
-    plt.close()
-    print(f"Saved confusion matrix: {filename}")
-
-# ====== Utility: plot classification report table ======
-def plot_classification_report(report_dict, title, filename_png, filename_csv=None):
-    """
-    report_dict: output from classification_report(..., output_dict=True)
-    This function renders it as a table image and optionally saves it as CSV.
-    """
-    df_rep = pd.DataFrame(report_dict).T
-
-    # Save CSV (optional)
-    if filename_csv is not None:
-        df_rep.to_csv(filename_csv)
-        print(f"Saved classification report table: {filename_csv}")
-
-    # Render table as an image
-    fig, ax = plt.subplots(figsize=(6, 0.5 * len(df_rep) + 1.5))
-    ax.axis('off')
-
-    display_df = df_rep.copy()
-    for col in display_df.columns:
-        display_df[col] = display_df[col].map(
-            lambda x: f"{x:.2f}" if isinstance(x, (int, float)) else x
-        )
-
-    table = ax.table(
-        cellText=display_df.values,
-        rowLabels=display_df.index,
-        colLabels=display_df.columns,
-        loc='center'
-    )
-    table.auto_set_font_size(False)
-    table.set_fontsize(8)
-    table.scale(1, 1.3)
-
-    ax.set_title(title, pad=10)
-    plt.tight_layout()
-    plt.savefig(filename_png, dpi=250)
-    plt.close()
-    print(f"Saved classification report figure: {filename_png}")
-
+# ====== Evaluate one split (report.py prints the report, saves the figures) ======
 def evaluate_split(name, X, y_true, filename_prefix):
     y_pred = rf.predict(X)
-    print(f"\n=== {name} Result ===")
-
-    # Text-based report
-    report_text = classification_report(
-        y_true, y_pred, target_names=le.classes_
-    )
-    print(report_text)
-
-    # Dictionary-based report (used for plots and tables)
-    report_dict = classification_report(
-        y_true, y_pred,
-        target_names=le.classes_,
-        output_dict=True
-    )
-
-    cm = confusion_matrix(y_true, y_pred)
-    print("Confusion matrix:\n", cm)
-
-    # Plot confusion matrix
-    plot_confusion(
-        cm, le.classes_,
-        f"{name} Confusion Matrix",
-        f"{filename_prefix}_cm.png"
-    )
-
-    # Plot classification report table and save CSV
-    plot_classification_report(
-        report_dict,
-        f"{name} Classification Report",
-        f"{filename_prefix}_report.png",
-        f"{filename_prefix}_report.csv"
-    )
-
+    report.evaluate(name, le.inverse_transform(y_true), le.inverse_transform(y_pred), le.classes_,
+                    filename_prefix if PLOTS else None)
     return y_pred
 
 # ====== Evaluation: Run 4 (validation) & Run 5 (test) ======
@@ -197,20 +109,8 @@ print("\n=== Feature Importance ===")
 for name, score in fi_pairs:
     print(f"{name:20s} : {score:.4f}")
 
-sorted_features = [x[0] for x in fi_pairs]
-sorted_scores   = [x[1] for x in fi_pairs]
-
-plt.figure(figsize=(7, 4.5))
-y_pos = np.arange(len(sorted_features))
-plt.barh(y_pos, sorted_scores)
-plt.yticks(y_pos, sorted_features)
-plt.gca().invert_yaxis()  # Most important features on top
-plt.xlabel("Feature importance")
-plt.title("Random Forest Feature Importance")
-plt.tight_layout()
-plt.savefig("rf_feature_importance.png", dpi=250)
-plt.close()
-print("Saved feature importance: rf_feature_importance.png")
+if PLOTS:
+    report.plot_feature_importance(feature_cols, importances, "rf_feature_importance.png")
 
 # ====== Save model bundle ======
 bundle = {
@@ -220,3 +120,16 @@ bundle = {
 }
 joblib.dump(bundle, "rf_congctrl.pkl")
 print("Saved model to rf_congctrl.pkl")
+
+# ====== Export flattened forest (array-backed evaluator, see flat_forest.py) ======
+flat, identical, _ = flat_forest.export_bundle(bundle, "rf_congctrl_flat.npz", X_check=X_test)
+print(f"Saved flattened forest to rf_congctrl_flat.npz (identical on test split: {identical})")
+
+# ====== Save versioned bundle (memory-mapped arrays + JSON header, see model_bundle.py) ======
+training_data = model_bundle.describe_data([CSV_PATH, SYNTH_CSV], rows=len(train_df), runs=[1, 2, 3])
+metrics = {
+    "val_accuracy": round(float(np.mean(y_val_pred == y_val)), 4),
+    "test_accuracy": round(float(np.mean(y_test_pred == y_test)), 4),
+}
+model_bundle.save("rf_congctrl.bundle", flat, le.classes_, feature_cols, training_data, metrics)
+print("Saved bundle to rf_congctrl.bundle")